@@ -0,0 +1,63 @@
+"""Per-part cost of the avoided-sites constraints of Golden Gate domesticators.
+
+Compares one ``AvoidPattern(EnzymeSitePattern(enzyme))`` constraint per
+avoided enzyme, created for each part (as done before), with the single
+constraint over a ``SitesPattern`` compiled once by the domesticator: time to
+create the part's constraints, and to evaluate them on the part's problem.
+"""
+
+import time
+
+from dnachisel import AvoidPattern, DnaOptimizationProblem, EnzymeSitePattern, Location
+
+from genedom import GoldenGateDomesticator, random_dna_sequence
+
+ENZYMES = ["BsmBI", "BsaI", "BbsI", "SapI", "NotI", "EcoRI"]
+domesticator = GoldenGateDomesticator(
+    "ATTC", "GCTA", enzyme=ENZYMES[0], extra_avoided_sites=ENZYMES[1:]
+)
+insert_start = len(domesticator.left_flank)
+
+
+def per_enzyme_constraints(sequence):
+    """Create the constraints as done before (one per enzyme, per part)."""
+    location = Location(insert_start, insert_start + len(sequence))
+    return [
+        AvoidPattern(EnzymeSitePattern(enzyme), location=location)
+        for enzyme in ENZYMES
+    ]
+
+
+def combined_constraints(sequence):
+    return [c(sequence) for c in domesticator.constraints if callable(c)]
+
+
+def timed(function, sequences):
+    start = time.perf_counter()
+    for sequence in sequences:
+        function(sequence)
+    return 1000 * (time.perf_counter() - start) / len(sequences)
+
+
+for length in [300, 1000, 3000, 10000]:
+    sequences = [random_dna_sequence(length, seed=i) for i in range(50)]
+    extended = [
+        domesticator.left_flank + s + domesticator.right_flank for s in sequences
+    ]
+    line = "%5d bp parts:" % length
+    for name, constraints_function in [
+        ("per enzyme", per_enzyme_constraints),
+        ("combined", combined_constraints),
+    ]:
+        creation = timed(constraints_function, sequences)
+        problems = [
+            DnaOptimizationProblem(str(e.seq), constraints=constraints_function(s))
+            for s, e in zip(sequences, extended)
+        ]
+        evaluation = timed(lambda p: p.constraints_evaluations(), problems)
+        line += " %s: %.3f ms creation, %.3f ms evaluation;" % (
+            name,
+            creation,
+            evaluation,
+        )
+    print(line)
@@ -0,0 +1,65 @@
+"""Time of BarcodesCollection.from_specs vs. the number of barcodes.
+
+Compares the block-wise design (default blocks of 24 barcodes) with the
+design of all barcodes in a single DnaChisel problem (``block_size`` equal to
+the number of barcodes), and checks that no two barcodes share a 10-mer.
+
+Then times the vectorized screening of random barcode candidates (melting
+temperatures, heterodimers with a panel of primers) used before the design.
+"""
+
+import time
+
+import numpy
+from Bio.SeqUtils.MeltingTemp import Tm_NN
+
+from genedom import BarcodesCollection, random_dna_sequence
+from genedom.thermodynamics import melting_temperatures, screen_primers
+
+
+def design_time(n_barcodes, block_size):
+    start = time.perf_counter()
+    barcodes = BarcodesCollection.from_specs(
+        n_barcodes, block_size=block_size, seed=123
+    )
+    duration = time.perf_counter() - start
+    assert len(barcodes) == n_barcodes
+    assert barcodes.check_compatibility() == []
+    return duration
+
+
+for n_barcodes in [24, 96, 384, 1536]:
+    line = "%4d barcodes: %6.1fs by blocks" % (n_barcodes, design_time(n_barcodes, 24))
+    if n_barcodes <= 96:
+        line += ", %6.1fs in one problem" % design_time(n_barcodes, n_barcodes)
+    print(line)
+
+rng = numpy.random.default_rng(123)
+candidates = [random_dna_sequence(20, seed=rng) for i in range(10000)]
+primers_panel = [random_dna_sequence(22, seed=rng) for i in range(24)]
+
+start = time.perf_counter()
+[Tm_NN(candidate) for candidate in candidates]
+loop_duration = time.perf_counter() - start
+start = time.perf_counter()
+melting_temperatures(candidates)
+vectorized_duration = time.perf_counter() - start
+print(
+    "Tm of 10,000 candidates: %.3fs with Tm_NN, %.3fs vectorized"
+    % (loop_duration, vectorized_duration)
+)
+
+start = time.perf_counter()
+passing = screen_primers(
+    candidates,
+    tmin=55,
+    tmax=70,
+    gc_min=0.4,
+    gc_max=0.6,
+    other_primer_sequences=primers_panel,
+    heterodim_tmax=5,
+)
+print(
+    "Screening of 10,000 candidates against 24 primers: %.2fs (%d pass)"
+    % (time.perf_counter() - start, passing.sum())
+)
@@ -0,0 +1,55 @@
+"""Time of ``import genedom``, and of the first use of lazily loaded objects.
+
+Each measure is made in a new Python process (best of 5 runs). The script
+fails (exit code 1) if ``import genedom`` loads modules which should only be
+loaded on first use, or if it takes longer than the maximal time given as
+argument, e.g. ``python benchmark_import_time.py 3.0``.
+"""
+
+import subprocess
+import sys
+
+LAZY_MODULES = [
+    "genedom.builtin_standards",
+    "genedom.async_domestication",
+    "genedom.records_loader",
+    "box",
+    "asyncio",
+]
+
+
+def measure(statement, setup="import genedom"):
+    """Return the time (best of 5 new processes) of the statement."""
+    code = (
+        "import time\nt0 = time.perf_counter()\n%s\nt1 = time.perf_counter()\n"
+        "%s\nprint(t1 - t0, time.perf_counter() - t1)" % (setup, statement)
+    )
+    times = []
+    for _ in range(5):
+        output = subprocess.check_output([sys.executable, "-c", code])
+        times.append([float(t) for t in output.split()])
+    return min(times)
+
+
+import_time, _ = measure("pass")
+print("import genedom: %.0f ms" % (1000 * import_time))
+dnachisel_time, _ = measure("pass", setup="import dnachisel")
+print("(of which import dnachisel: %.0f ms)" % (1000 * dnachisel_time))
+for name in ["BUILTIN_STANDARDS", "abatch_domestication"]:
+    _, first_use_time = measure("genedom.%s" % name)
+    print("first use of genedom.%s: %.0f ms" % (name, 1000 * first_use_time))
+
+output = subprocess.check_output(
+    [
+        sys.executable,
+        "-c",
+        "import sys, genedom; print(' '.join(sorted(sys.modules)))",
+    ]
+)
+loaded = [m for m in LAZY_MODULES if m in output.decode().split()]
+if len(loaded):
+    print("FAILED: import genedom loaded %s" % ", ".join(loaded))
+    sys.exit(1)
+if (len(sys.argv) > 1) and (import_time > float(sys.argv[1])):
+    print("FAILED: import genedom took more than %s s" % sys.argv[1])
+    sys.exit(1)
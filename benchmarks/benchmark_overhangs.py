@@ -0,0 +1,73 @@
+"""Evaluation of the overhangs of standards, and search of overhang sets.
+
+The distances between all 256 4-bp overhangs are computed once, then sets of
+overhangs are evaluated (and searched) with array operations. This is
+compared with a naive evaluation computing the mismatches of each pair of
+overhangs (and reverse-complements) in pure Python.
+"""
+
+import itertools
+import time
+
+from Bio.Seq import reverse_complement
+
+from genedom import BUILTIN_STANDARDS, OverhangsCompatibility
+
+
+def naive_conflicts(overhangs, min_mismatches=2):
+    conflicts = []
+    for o1, o2 in itertools.combinations(overhangs, 2):
+        distance = min(
+            sum(a != b for a, b in zip(o1, other))
+            for other in [o2, reverse_complement(o2)]
+        )
+        if distance < min_mismatches:
+            conflicts.append((o1, o2, distance))
+    return conflicts
+
+
+start = time.perf_counter()
+compatibility = OverhangsCompatibility()
+print("Matrices computed in %.1f ms" % (1000 * (time.perf_counter() - start)))
+
+for name, standard in BUILTIN_STANDARDS.items():
+    overhangs = standard.list_overhangs()
+    start = time.perf_counter()
+    for i in range(100):
+        evaluation = compatibility.evaluate(overhangs)
+    duration = 10 * (time.perf_counter() - start)
+    start = time.perf_counter()
+    for i in range(100):
+        conflicts = naive_conflicts(overhangs)
+    naive_duration = 10 * (time.perf_counter() - start)
+    assert conflicts == evaluation["conflicts"]
+    print(
+        "%s (%d overhangs, %d conflicts): evaluated in %.3f ms (naive: %.3f ms)"
+        % (name, len(overhangs), len(conflicts), duration, naive_duration)
+    )
+
+for n_overhangs in [10, 20, 30]:
+    start = time.perf_counter()
+    overhangs = compatibility.find_overhangs_set(n_overhangs)
+    duration = time.perf_counter() - start
+    evaluation = compatibility.evaluate(overhangs)
+    print(
+        "Set of %d overhangs found in %.3fs (min distance %d)"
+        % (n_overhangs, duration, evaluation["min_distance"])
+    )
+
+for n_overhangs in [12, 20, 27]:
+    overhangs = BUILTIN_STANDARDS.EMMA.list_overhangs()[:n_overhangs]
+    start = time.perf_counter()
+    substitutes = compatibility.find_substitutes(overhangs)
+    duration = time.perf_counter() - start
+    print(
+        "First %d EMMA overhangs: %s in %.3fs"
+        % (
+            n_overhangs,
+            "no substitutes found"
+            if substitutes is None
+            else "%d substitutes found" % len(substitutes),
+            duration,
+        )
+    )
@@ -0,0 +1,38 @@
+"""Per-part latency of the domestication of parts which need no edits.
+
+Compares the fast pre-screening path with a full DnaChisel problem creation
+and evaluation (``prescreen_sequences = False``).
+"""
+
+import time
+
+from genedom import BUILTIN_STANDARDS, random_dna_sequence
+
+domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+
+
+def clean_random_sequence(length, seed):
+    """Return a random sequence with no site avoided by the domesticator."""
+    sequence = list(random_dna_sequence(length, seed=seed))
+    sites = domesticator.sites_index.find_sites("".join(sequence))
+    while len(sites):
+        for enzyme, start, strand in sites:
+            sequence[start + 1] = "A" if sequence[start + 1] != "A" else "T"
+        sites = domesticator.sites_index.find_sites("".join(sequence))
+    return "".join(sequence)
+
+
+for length in [300, 1000, 3000, 10000]:
+    sequences = [clean_random_sequence(length, seed=i) for i in range(50)]
+    timings = {}
+    for prescreen in (False, True):
+        domesticator.prescreen_sequences = prescreen
+        start = time.perf_counter()
+        for sequence in sequences:
+            domesticator.domesticate(sequence, edit=True)
+        timings[prescreen] = 1000 * (time.perf_counter() - start) / len(sequences)
+    print(
+        "%5d bp clean parts: %6.2f ms/part with DnaChisel, "
+        "%6.2f ms/part pre-screened (x%.0f)"
+        % (length, timings[False], timings[True], timings[False] / timings[True])
+    )
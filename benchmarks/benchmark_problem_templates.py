@@ -0,0 +1,49 @@
+"""Per-part overhead of the creation of domestication problems.
+
+Compares the creation of a DnaOptimizationProblem from scratch (flank records
+concatenation, specifications and mutation space created for each part) with
+the creation from the domesticator's memoized ProblemTemplate.
+"""
+
+import time
+
+from dnachisel import AvoidChanges, DnaOptimizationProblem
+
+from genedom import BUILTIN_STANDARDS, random_dna_sequence
+
+domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+
+
+def problem_from_scratch(sequence):
+    """Create the problem as done before templates (non-CDS part, edits)."""
+    constraints = [c(sequence) if callable(c) else c for c in domesticator.constraints]
+    extended_sequence = domesticator.left_flank + sequence + domesticator.right_flank
+    return DnaOptimizationProblem(
+        extended_sequence,
+        constraints=constraints,
+        objectives=[AvoidChanges()],
+        logger=None,
+    )
+
+
+for length in [300, 1000, 3000, 10000]:
+    sequences = [random_dna_sequence(length, seed=i) for i in range(50)]
+    start = time.perf_counter()
+    for sequence in sequences:
+        problem_from_scratch(sequence)
+    scratch_duration = 1000 * (time.perf_counter() - start) / len(sequences)
+    domesticator.build_problem(sequences[0], edit=True)  # compiles the template
+    start = time.perf_counter()
+    for sequence in sequences:
+        domesticator.build_problem(sequence, edit=True)
+    template_duration = 1000 * (time.perf_counter() - start) / len(sequences)
+    print(
+        "%5d bp parts: %6.2f ms/part from scratch, %6.2f ms/part from template"
+        " (x%.1f)"
+        % (
+            length,
+            scratch_duration,
+            template_duration,
+            scratch_duration / template_duration,
+        )
+    )
@@ -0,0 +1,64 @@
+"""Time and memory spent per part outside of the sequence optimization.
+
+Domesticates 10 kb records with many features (which need a few edits) with
+the per-record function of batch domestications (domestication, Genbank
+formatting, sequenticons) and reports, per part, the time and the peak
+memory allocated (measured by tracemalloc, in a second run).
+"""
+
+import time
+import tracemalloc
+
+from dnachisel import annotate_record
+
+from genedom import BUILTIN_STANDARDS, random_dna_sequence
+from genedom.batch_domestication import _domesticate_record
+from genedom.biotools import sequence_to_record
+
+domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+
+
+def record_with_features(length, n_features, seed):
+    record = sequence_to_record(random_dna_sequence(length, seed=seed))
+    record.id = "part_%d" % seed
+    for i in range(n_features):
+        start = (i * 97) % (length - 100)
+        annotate_record(
+            record, location=(start, start + 50), label="feature %d" % i, note="x"
+        )
+    return record
+
+
+def domesticate(record):
+    return _domesticate_record(
+        record,
+        domesticator,
+        barcode=None,
+        report_target=None,
+        allow_edits=True,
+        domesticated_suffix="",
+        barcode_spacer="AA",
+        include_original_records=True,
+    )
+
+
+records = [record_with_features(10000, 300, seed=i) for i in range(10)]
+domesticate(records[0])  # warms up caches and templates
+for measure_memory in (False, True):
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    peaks = 0
+    for record in records:
+        if measure_memory:
+            current_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        domesticate(record)
+        if measure_memory:
+            peaks += tracemalloc.get_traced_memory()[1] - current_memory
+    duration = time.perf_counter() - start
+    if not measure_memory:
+        print("10 kb parts with 300 features: %.1f ms/part" % (1000 * duration / 10))
+    else:
+        tracemalloc.stop()
+        print("Peak memory allocated: %.0f kB/part" % (peaks / 10 / 1024))
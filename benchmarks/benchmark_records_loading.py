@@ -0,0 +1,54 @@
+"""Loading of a large archive of parts files.
+
+Compares ``load_records`` on the list of files with ``bulk_load_records`` on
+the folder (sequentially and in parallel) and on a zip archive, and measures
+how long a lazy loader takes to deliver its first record.
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from genedom import bulk_load_records, load_records
+
+PARTS_DIR = os.path.join("tests", "data", "example_parts")
+N_FILES = 3000
+
+folder = tempfile.mkdtemp()
+parts_folder = os.path.join(folder, "parts")
+os.mkdir(parts_folder)
+parts = sorted(os.listdir(PARTS_DIR))
+paths = []
+for i in range(N_FILES):
+    path = os.path.join(parts_folder, "part_%05d.gb" % i)
+    shutil.copy(os.path.join(PARTS_DIR, parts[i % len(parts)]), path)
+    paths.append(path)
+zip_path = os.path.join(folder, "parts.zip")
+with zipfile.ZipFile(zip_path, "w") as archive:
+    for path in paths:
+        archive.write(path, os.path.basename(path))
+
+for name, load in [
+    ("load_records(list of files)", lambda: load_records(paths)),
+    ("bulk_load_records(folder)", lambda: bulk_load_records(parts_folder)),
+    ("bulk_load_records(zip)", lambda: bulk_load_records(zip_path)),
+    (
+        "bulk_load_records(folder, n_jobs=-1)",
+        lambda: bulk_load_records(parts_folder, n_jobs=-1, chunk_size=50),
+    ),
+]:
+    start = time.perf_counter()
+    records = load()
+    duration = time.perf_counter() - start
+    assert len(records) == N_FILES
+    print("%-40s %d records in %.2fs" % (name, len(records), duration))
+
+records = None
+gc.collect()
+start = time.perf_counter()
+next(bulk_load_records(zip_path, lazy=True))
+print("First record of a lazy loader in %.4fs" % (time.perf_counter() - start))
+shutil.rmtree(folder)
@@ -0,0 +1,59 @@
+"""Memory footprint and serialization speed of domestication results.
+
+Domesticates 200 parts of 2 kb (which need a few edits), then reports the
+memory held by the results (measured by tracemalloc), and the time to write
+and read them as one pickle file, and as one columnar results file.
+"""
+
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+
+from genedom import BUILTIN_STANDARDS, DomesticationResult, random_dna_sequence
+
+domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+sequences = [
+    "ATGCGTCTCAAAT" + random_dna_sequence(2000, seed=i) + "GAGACGTTA"
+    for i in range(200)
+]
+domesticator.domesticate(sequences[0], edit=True)  # warms up the templates
+
+tracemalloc.start()
+results = [domesticator.domesticate(s, edit=True) for s in sequences]
+for result in results:
+    result.report_data = None  # only the results themselves are measured
+memory = tracemalloc.get_traced_memory()[0]
+tracemalloc.stop()
+print("Memory held by the results: %.1f kB/part" % (memory / len(results) / 1024))
+
+start = time.perf_counter()
+edits = sum([r.number_of_edits() for r in results])
+duration = time.perf_counter() - start
+print("number_of_edits() for all results: %.1f ms" % (1000 * duration))
+
+with tempfile.TemporaryDirectory() as folder:
+    pickle_path = os.path.join(folder, "results.pkl")
+    results_file_path = os.path.join(folder, "results.npz")
+    for name, write, read in [
+        (
+            "pickle",
+            lambda: pickle.dump(results, open(pickle_path, "wb")),
+            lambda: pickle.load(open(pickle_path, "rb")),
+        ),
+        (
+            "results file",
+            lambda: DomesticationResult.write_results_file(results, results_file_path),
+            lambda: DomesticationResult.read_results_file(results_file_path),
+        ),
+    ]:
+        start = time.perf_counter()
+        write()
+        written = time.perf_counter()
+        read()
+        read_time = time.perf_counter() - written
+        print(
+            "%s: write %.1f ms, read %.1f ms"
+            % (name, 1000 * (written - start), 1000 * read_time)
+        )
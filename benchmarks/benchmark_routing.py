@@ -0,0 +1,59 @@
+"""Time to attribute domesticators to large batches of records.
+
+The records are routed by a standard with several rules (ID prefix, regular
+expressions, feature labels, overhangs), whose tables are compiled once into
+a single lookup dictionary. This is compared with a naive routing trying,
+for each record, each regular expression in turn.
+"""
+
+import re
+import time
+
+from dnachisel import sequence_to_biopython_record
+
+from genedom import (
+    FeatureRule,
+    IdPrefixRule,
+    OverhangsRule,
+    RegexRule,
+)
+from genedom.builtin_standards import load_builtin_standards
+from genedom.StandardDomesticatorsSet import StandardDomesticatorsSet
+
+emma = load_builtin_standards().EMMA
+slots = list(emma.domesticators)
+patterns = {".*_part%d_" % i: slot for i, slot in enumerate(slots)}
+standard = StandardDomesticatorsSet(
+    emma.domesticators,
+    routing_rules=[IdPrefixRule(), RegexRule(patterns), FeatureRule(), OverhangsRule()],
+)
+
+
+def naive_route(record):
+    prefix = record.id.split("_")[0]
+    if prefix in emma.domesticators:
+        return emma.domesticators[prefix]
+    for pattern, slot in patterns.items():
+        if re.match(pattern, record.id):
+            return emma.domesticators[slot]
+    return None
+
+
+for n_records in [1000, 10000, 50000]:
+    records = [
+        sequence_to_biopython_record(
+            "ATGC" * 50, id="lab_%d_part%d_x" % (i, i % len(slots))
+        )
+        for i in range(n_records)
+    ]
+    start = time.perf_counter()
+    routes = standard.route(records)
+    routing_duration = time.perf_counter() - start
+    start = time.perf_counter()
+    naive_routes = [naive_route(record) for record in records]
+    naive_duration = time.perf_counter() - start
+    assert routes == naive_routes
+    print(
+        "%6d records: %.3fs routed with compiled rules, %.3fs with naive routing"
+        % (n_records, routing_duration, naive_duration)
+    )
@@ -0,0 +1,55 @@
+"""Domestication time of long CDS parts with two sites, with and without
+``windowed=True``, with and without codon optimization.
+
+The windowed domestication only optimizes windows around the two BsmBI
+sites, so its duration barely depends on the length of the part.
+"""
+
+import time
+
+import numpy as np
+from genedom import BUILTIN_STANDARDS, random_dna_sequence
+
+domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+
+
+def cds_with_two_sites(length, seed):
+    """Return a random CDS with two BsmBI sites (and no other site)."""
+    sequence = random_dna_sequence(length, seed=seed)
+    codons = [sequence[i : i + 3] for i in range(3, length - 3, 3)]
+    codons = ["ATG"] + [c for c in codons if c not in ("TAA", "TAG", "TGA")]
+    cds = "".join(codons) + "TAA"
+    for _, start, _ in domesticator.sites_index.find_sites(cds):
+        codon = start // 3 + 1  # first full codon of the site
+        codons[codon] = "GCT" if codons[codon] != "GCT" else "GCC"
+    n_codons = len(codons)
+    codons[n_codons // 3 : n_codons // 3 + 2] = ["CGT", "CTC"]
+    codons[2 * n_codons // 3 : 2 * n_codons // 3 + 2] = ["GAG", "ACG"]
+    return "".join(codons) + "TAA"
+
+
+for codon_optimization in [None, "e_coli"]:
+    print("Codon optimization: %s" % codon_optimization)
+    for length in [1000, 3000, 10000, 30000]:
+        sequence = cds_with_two_sites(length, seed=length)
+        durations = {}
+        for windowed in (False, True):
+            np.random.seed(123)
+            start = time.perf_counter()
+            result = domesticator.domesticate(
+                sequence,
+                is_cds=True,
+                codon_optimization=codon_optimization,
+                windowed=windowed,
+            )
+            durations[windowed] = time.perf_counter() - start
+            assert result.success
+        print(
+            "%6d bp: whole sequence %.3fs, windowed %.3fs (x%.1f)"
+            % (
+                len(sequence),
+                durations[False],
+                durations[True],
+                durations[False] / durations[True],
+            )
+        )
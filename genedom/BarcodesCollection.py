@@ -1,4 +1,5 @@
 import os
+import numpy as np
 from dnachisel import (
     AllowPrimer,
     DnaOptimizationProblem,
@@ -6,10 +7,157 @@ from dnachisel import (
     EnforceSequence,
     EnforceGCContent,
     AvoidPattern,
-    random_dna_sequence,
+    NoSolutionError,
 )
 from collections import OrderedDict
-from .biotools import sequence_to_record, annotate_record, write_record
+from .biotools import (
+    sequence_to_record,
+    annotate_record,
+    write_record,
+    random_dna_sequence,
+    seeded_numpy_random_state,
+)
+from .KmerIndex import KmerIndex, AvoidIndexedKmers
+from .SitesIndex import SitesIndex
+from .thermodynamics import screen_primers
+
+
+def _screen_barcodes_candidates(
+    n_barcodes,
+    barcode_length,
+    forbidden_enzymes,
+    barcode_tmin,
+    barcode_tmax,
+    other_primer_sequences,
+    heterodim_tmax,
+    index,
+    rng,
+    candidates_per_barcode=20,
+    max_rounds=5,
+):
+    """Return up to n_barcodes random barcodes pre-screened for the specs.
+
+    Random candidates are filtered in batches (melting temperature, GC
+    content and heterodimers with the other primers computed in vectorized
+    form, enzyme sites found in a single scan), then the survivors are
+    greedily selected if they have no homologies with the index, with each
+    other, or within themselves. Fewer barcodes are returned if not enough
+    candidates pass the screening.
+    """
+    sites_index = SitesIndex(forbidden_enzymes)
+    block_index = KmerIndex(index.k)
+    selected = []
+    for _round in range(max_rounds):
+        n_candidates = candidates_per_barcode * (n_barcodes - len(selected))
+        codes = rng.integers(0, 4, (n_candidates, barcode_length))
+        letters = np.frombuffer(b"ACGT", dtype=np.uint8)[codes].tobytes().decode()
+        candidates = [
+            letters[i : i + barcode_length]
+            for i in range(0, len(letters), barcode_length)
+        ]
+        passing = screen_primers(
+            candidates,
+            tmin=barcode_tmin,
+            tmax=barcode_tmax,
+            gc_min=0.4,
+            gc_max=0.6,
+            other_primer_sequences=other_primer_sequences,
+            heterodim_tmax=heterodim_tmax,
+        )
+        candidates = [c for c, ok in zip(candidates, passing) if ok]
+        sites = sites_index.find_sites_in_sequences(candidates)
+        for candidate, candidate_sites in zip(candidates, sites):
+            if len(candidate_sites):
+                continue
+            kmers, _ = block_index.encode(candidate)
+            if len(np.unique(kmers)) < len(kmers):
+                continue
+            if index.find_homologies(candidate):
+                continue
+            if block_index.find_homologies(candidate):
+                continue
+            block_index.add(candidate)
+            selected.append(candidate)
+            if len(selected) == n_barcodes:
+                return selected
+    return selected
+
+
+def _design_barcodes_block(
+    n_barcodes,
+    barcode_length,
+    spacer,
+    forbidden_enzymes,
+    barcode_tmin,
+    barcode_tmax,
+    other_primer_sequences,
+    heterodim_tmax,
+    max_homology_length,
+    index,
+    rng,
+    max_attempts=3,
+):
+    """Return a list of compatible barcodes (each followed by the spacer).
+
+    The barcodes have no homologies with the sequences of the k-mer index.
+    The solver starts from pre-screened random barcodes, so it generally
+    only has a few junctions to fix. All randomness comes from ``rng`` (a
+    numpy Generator), so the result is determined by the Generator's state.
+    """
+    unit_length = barcode_length + len(spacer)
+    seq_len = n_barcodes * unit_length
+    units_coordinates = [(i, i + unit_length) for i in range(0, seq_len, unit_length)]
+    constraints = [
+        AvoidPattern(EnzymeSitePattern(enzyme)) for enzyme in forbidden_enzymes
+    ]
+    for start, end in units_coordinates:
+        constraints += [
+            AllowPrimer(
+                tmin=barcode_tmin,
+                tmax=barcode_tmax,
+                max_homology_length=max_homology_length,
+                avoid_heterodim_with=list(other_primer_sequences) or None,
+                max_heterodim_tm=heterodim_tmax,
+                location=(start, end - len(spacer)),
+            ),
+            EnforceSequence(spacer, location=(end - len(spacer), end)),
+            EnforceGCContent(mini=0.4, maxi=0.6, location=(start, end - len(spacer))),
+        ]
+    if len(index):
+        # These constraints are solved first, the others are then solved
+        # without creating new homologies with the index.
+        constraints = [
+            AvoidIndexedKmers(index, location=(start, end - len(spacer)))
+            for (start, end) in units_coordinates
+        ] + constraints
+    # The resolution occasionally fails on homologies spanning two units. As
+    # a collection can have many blocks, failed blocks are retried.
+    for attempt in range(max_attempts):
+        candidates = _screen_barcodes_candidates(
+            n_barcodes=n_barcodes,
+            barcode_length=barcode_length,
+            forbidden_enzymes=forbidden_enzymes,
+            barcode_tmin=barcode_tmin,
+            barcode_tmax=barcode_tmax,
+            other_primer_sequences=other_primer_sequences,
+            heterodim_tmax=heterodim_tmax,
+            index=index,
+            rng=rng,
+        )
+        while len(candidates) < n_barcodes:
+            candidates.append(random_dna_sequence(barcode_length, seed=rng))
+        sequence = "".join([candidate + spacer for candidate in candidates])
+        problem = DnaOptimizationProblem(sequence=sequence, constraints=constraints)
+        problem.logger.ignored_bars.add("location")
+        try:
+            # DnaChisel's solver draws its random mutations from np.random.
+            with seeded_numpy_random_state(rng):
+                problem.resolve_constraints()
+            break
+        except NoSolutionError:
+            if attempt == max_attempts - 1:
+                raise
+    return [problem.sequence[start:end] for (start, end) in units_coordinates]
 
 
 class BarcodesCollection(OrderedDict):
@@ -21,11 +169,24 @@ class BarcodesCollection(OrderedDict):
     The constructor taked a list [(name, barcode), ...] as an input.
 
     Use ``BarcodesCollection.from_specs(n_barcodes=25)`` to generate an
-    instance with 25 compatible barcodes.
+    instance with 25 compatible barcodes, and ``collection.extend(10)`` to add
+    10 new barcodes compatible with the existing ones.
+
+    Parameters
+    ----------
+
+    barcodes
+      A list [(name, barcode), ...].
+
+    spacer
+      Sequence ending each barcode (if any), which is not part of the primer
+      annealing site, e.g. "AA" for collections generated by ``from_specs``
+      with ``include_spacers=True``.
     """
 
-    def __init__(self, barcodes):
+    def __init__(self, barcodes=(), spacer=""):
         OrderedDict.__init__(self, barcodes)
+        self.spacer = spacer
 
     @staticmethod
     def from_specs(
@@ -40,9 +201,17 @@ class BarcodesCollection(OrderedDict):
         max_homology_length=10,
         include_spacers=True,
         names_template="B_%03d",
+        block_size=24,
+        seed=None,
     ):
         """Return a BarcodesCollection object with compatible barcodes.
 
+        The barcodes are designed by blocks of ``block_size`` barcodes: each
+        block is a DnaChisel problem where the barcodes are separated by the
+        spacer, and where homologies with the barcodes of previous blocks are
+        forbidden via a k-mer index. This way the computing time grows
+        linearly with the number of barcodes.
+
         Parameters
         ----------
 
@@ -70,6 +239,10 @@ class BarcodesCollection(OrderedDict):
 
         other_primer_sequences
           External sequences with which the primers should not anneal.
+          Random barcode candidates are first screened against these
+          sequences with a fast, approximate heterodimer model (see
+          ``thermodynamics.screen_primers``), then the solver checks the
+          barcodes with primer3, which must be installed.
 
         heterodim_tmax
           Max acceptable melting temperature for the annealing of a barcode
@@ -80,41 +253,134 @@ class BarcodesCollection(OrderedDict):
 
         names_template
           The template used to name barcode number "i".
+
+        block_size
+          Number of barcodes designed together in a same DnaChisel problem.
+          Larger blocks make for larger problems, whose resolution time grows
+          faster than linearly.
+
+        seed
+          Integer seed or ``numpy.random.Generator`` from which all the random
+          choices of the design are drawn. With a same seed and same
+          parameters, the same barcodes are produced, in any process, which
+          enables to reproduce (or memoize) a design. If None, the design is
+          not reproducible. As DnaChisel's solver draws from the global
+          ``np.random`` state, this state is seeded during each resolution,
+          then restored. Seeded designs running in threads of a same process
+          are resolved one at a time, and other threads drawing from
+          ``np.random`` meanwhile can make a design irreproducible.
         """
-        unit_length = barcode_length + len(spacer)
-        seq_len = n_barcodes * unit_length
-        units_coordinates = [
-            (i, i + unit_length) for i in range(0, seq_len, unit_length)
-        ]
-        constraints = [
-            AvoidPattern(EnzymeSitePattern(enzyme)) for enzyme in forbidden_enzymes
-        ]
-        for start, end in units_coordinates:
-            constraints += [
-                AllowPrimer(
-                    tmin=barcode_tmin,
-                    tmax=barcode_tmax,
-                    max_homology_length=max_homology_length,
-                    avoid_heterodim_with=None,
-                    max_heterodim_tm=5,
-                    location=(start, end - len(spacer)),
-                ),
-                EnforceSequence(spacer, location=(end - len(spacer), end)),
-                EnforceGCContent(
-                    mini=0.4, maxi=0.6, location=(start, end - len(spacer))
-                ),
-            ]
-        problem = DnaOptimizationProblem(
-            sequence=random_dna_sequence(seq_len), constraints=constraints
+        collection = BarcodesCollection(spacer=spacer if include_spacers else "")
+        collection.extend(
+            n_barcodes,
+            barcode_length=barcode_length,
+            spacer=spacer,
+            forbidden_enzymes=forbidden_enzymes,
+            barcode_tmin=barcode_tmin,
+            barcode_tmax=barcode_tmax,
+            other_primer_sequences=other_primer_sequences,
+            heterodim_tmax=heterodim_tmax,
+            max_homology_length=max_homology_length,
+            include_spacers=include_spacers,
+            names_template=names_template,
+            block_size=block_size,
+            seed=seed,
         )
-        problem.logger.ignored_bars.add("location")
-        problem.resolve_constraints()
+        return collection
 
-        barcodes = [problem.sequence[start:end] for (start, end) in units_coordinates]
+    def extend(
+        self,
+        n_barcodes,
+        barcode_length=20,
+        spacer=None,
+        forbidden_enzymes=("BsaI", "BsmBI", "BbsI"),
+        barcode_tmin=55,
+        barcode_tmax=70,
+        other_primer_sequences=(),
+        heterodim_tmax=5,
+        max_homology_length=10,
+        include_spacers=None,
+        names_template="B_%03d",
+        block_size=24,
+        seed=None,
+    ):
+        """Add new barcodes, compatible with the barcodes already present.
+
+        The existing barcodes are not changed: the new barcodes are designed
+        to have no homology with them (see ``from_specs``). The new barcodes
+        are named after their number in the collection, e.g. "B_097" for the
+        first barcode added to a collection of 96 barcodes.
+
+        The parameters are the same as for ``from_specs``, except for
+        ``spacer`` whose default, None, means the collection's spacer, and
+        ``include_spacers`` whose default, None, means that spacers are
+        included if the collection's barcodes have a spacer. See ``from_specs``
+        for the limitations of ``seed`` in multi-threaded programs.
+        """
+        if spacer is None:
+            spacer = self.spacer
+        if include_spacers is None:
+            include_spacers = self.spacer != ""
+        rng = np.random.default_rng(seed)
+        index = KmerIndex(max_homology_length)
+        for name, barcode in self.items():
+            index.add(self._annealing_sequence(barcode), label=name)
+        barcodes = []
+        while len(barcodes) < n_barcodes:
+            n_block_barcodes = min(block_size, n_barcodes - len(barcodes))
+            block = _design_barcodes_block(
+                n_barcodes=n_block_barcodes,
+                barcode_length=barcode_length,
+                spacer=spacer,
+                forbidden_enzymes=forbidden_enzymes,
+                barcode_tmin=barcode_tmin,
+                barcode_tmax=barcode_tmax,
+                other_primer_sequences=other_primer_sequences,
+                heterodim_tmax=heterodim_tmax,
+                max_homology_length=max_homology_length,
+                index=index,
+                rng=rng,
+            )
+            for barcode in block:
+                index.add(barcode[: len(barcode) - len(spacer)])
+            barcodes += block
         if not include_spacers:
-            barcodes = [b[: -len(spacer)] for b in barcodes]
-        names = [(names_template % (i + 1)) for i in range(len(barcodes))]
-        return BarcodesCollection(zip(names, barcodes))
+            barcodes = [b[: len(b) - len(spacer)] for b in barcodes]
+        for barcode in barcodes:
+            self[names_template % (len(self) + 1)] = barcode
+
+    def _annealing_sequence(self, barcode):
+        """Return the barcode without its spacer."""
+        if self.spacer and barcode.endswith(self.spacer):
+            return barcode[: -len(self.spacer)]
+        return barcode
+
+    def check_compatibility(self, max_homology_length=10):
+        """Return the pairs of barcodes with homologies.
+
+        Two barcodes are incompatible if they share a segment of at least
+        ``max_homology_length`` nucleotides (on either strand), as this could
+        lead one barcode's primer to anneal on the other barcode. The check
+        uses a k-mer index and runs in a time proportional to the total length
+        of the barcodes.
+
+        Returns
+        -------
+
+        incompatibilities
+          A list [(name_1, name_2), ...] of the pairs of barcodes sharing a
+          homology, where barcode "name_1" comes before "name_2" in the
+          collection. Pairs (name, name) indicate a repeated segment within a
+          barcode. An empty list means all barcodes are compatible.
+        """
+        index = KmerIndex(max_homology_length)
+        for name, barcode in self.items():
+            index.add(self._annealing_sequence(barcode), label=name)
+        order = {name: i for i, name in enumerate(self)}
+        return sorted(
+            index.shared_kmers_labels(),
+            key=lambda pair: (order[pair[0]], order[pair[1]]),
+        )
 
     def to_sequences_list(self):
         """Return a list of sequences ["ATTG...", "TTCTGT..."]"""
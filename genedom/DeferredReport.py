@@ -0,0 +1,101 @@
+"""Defines DeferredReport, to render optimization reports after the fact."""
+
+from dnachisel import NoSolutionError
+from dnachisel.reports import write_no_solution_report, write_optimization_report
+
+from .StageTimer import StageTimer
+
+
+class DeferredReport:
+    """Raw data of a sequence optimization, from which a report can be made.
+
+    Rendering an optimization report (plots, PDF) often takes longer than the
+    optimization itself. A DeferredReport keeps the optimized DnaChisel
+    problem (and the error, in case of failure) so that the report can be
+    rendered later, only if needed, possibly in another process (deferred
+    reports can be pickled).
+
+    Examples
+    --------
+
+    >>> success, message, report = DeferredReport.optimize(problem, "my_part")
+    >>> if not success:
+    >>>     report.render("report_folder/")
+
+    Parameters
+    ----------
+
+    problem
+      The DnaOptimizationProblem, after the optimization.
+
+    project_name
+      Project name to write on the PDF report.
+
+    error
+      None if the optimization succeeded, else a tuple (message, problem,
+      constraint, location) with the attributes of the NoSolutionError raised
+      by DnaChisel (the error itself can't be pickled).
+    """
+
+    # Message of DnaChisel's optimize_with_report for successful optimizations.
+    SUCCESS_MESSAGE = "Optimization successful."
+
+    def __init__(self, problem, project_name, error=None):
+        self.problem = problem
+        self.project_name = project_name
+        self.error = error
+
+    @staticmethod
+    def optimize(problem, project_name, timer=None):
+        """Resolve and optimize the problem, without rendering any report.
+
+        This is the equivalent of DnaChisel's ``optimize_with_report``. If a
+        StageTimer is provided, the "resolve_constraints" and "optimize"
+        stages are timed.
+
+        Returns
+        -------
+
+        (success, message, deferred_report)
+        """
+        if timer is None:
+            timer = StageTimer()
+        try:
+            with timer.stage("resolve_constraints"):
+                problem.resolve_constraints()
+        except NoSolutionError as error:
+            start, end, _ = error.location.to_tuple()
+            message = "No solution found in zone [%d, %d]: %s." % (
+                start,
+                end,
+                str(error),
+            )
+            error = (error.message, error.problem, error.constraint, error.location)
+            return False, message, DeferredReport(problem, project_name, error)
+        with timer.stage("optimize"):
+            problem.optimize()
+        report = DeferredReport(problem, project_name)
+        return True, DeferredReport.SUCCESS_MESSAGE, report
+
+    @property
+    def success(self):
+        return self.error is None
+
+    def render(self, target="@memory"):
+        """Write the report to the target.
+
+        The target is a folder path, a zip path, a flametree directory, or
+        "@memory" to return the raw data of a zip archive.
+        """
+        if self.error is None:
+            return write_optimization_report(
+                target, self.problem, project_name=self.project_name
+            )
+        error = NoSolutionError(*self.error)
+        return write_no_solution_report(target, self.problem, error)
+
+    def __repr__(self):
+        return "DeferredReport(%s, %s)" % (
+            self.project_name,
+            "success" if self.success else "failure",
+        )
@@ -0,0 +1,182 @@
+"""Defines DomesticationCache, an on-disk cache of domestication results."""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import types
+import warnings
+
+from Bio.SeqRecord import SeqRecord
+import dnachisel
+
+from .version import __version__
+
+
+def fingerprint(obj):
+    """Return a string representing the content of an object, for cache keys.
+
+    Biopython records are represented by their sequence and features, and
+    functions (for instance constraint factories) by their code and the values
+    of the variables they use from their enclosing scope. Other objects are
+    represented by their ``cache_fingerprint()`` method if they have one, else
+    by their ``repr`` (which is the case of DnaChisel specifications). A
+    warning is issued for reprs with a memory address (such as default reprs
+    "<... at 0x...>"), as they would produce keys which change from one
+    session to the next, i.e. cache misses.
+    """
+    if isinstance(obj, SeqRecord):
+        features = [
+            (f.type, str(f.location), sorted(f.qualifiers.items()))
+            for f in obj.features
+        ]
+        return "SeqRecord(%s, %s)" % (str(obj.seq), fingerprint(features))
+    if isinstance(obj, (list, tuple)):
+        return "[%s]" % ", ".join([fingerprint(e) for e in obj])
+    if isinstance(obj, dict):
+        items = sorted(obj.items(), key=lambda item: str(item[0]))
+        return "{%s}" % ", ".join(
+            ["%s: %s" % (fingerprint(k), fingerprint(v)) for k, v in items]
+        )
+    if isinstance(obj, types.FunctionType):
+        closure = [cell.cell_contents for cell in (obj.__closure__ or ())]
+        return "Function(%s.%s, %s, %s, %s)" % (
+            obj.__module__,
+            obj.__qualname__,
+            obj.__code__.co_code.hex(),
+            fingerprint(list(obj.__defaults__ or ())),
+            fingerprint(closure),
+        )
+    if hasattr(obj, "cache_fingerprint"):
+        return obj.cache_fingerprint()
+    representation = repr(obj)
+    if " at 0x" in representation:
+        warnings.warn(
+            "The repr of %s has a memory address, so cache keys using it will "
+            "differ in other sessions. Give it a content-based __repr__ or "
+            "cache_fingerprint() method." % representation
+        )
+    return representation
+
+
+class DomesticationCache:
+    """On-disk cache of domestication results, one pickle file per result.
+
+    Results are stored under a hash of everything that can influence the
+    domestication (see ``PartDomesticator.domesticate``), including the
+    versions of Genedom and DnaChisel, so that the cache never returns results
+    computed with other parameters or other versions.
+
+    Examples
+    --------
+
+    >>> cache = DomesticationCache("domestication_cache", max_size=1e9)
+    >>> result = domesticator.domesticate(record, edit=True, cache=cache)
+    >>> print(cache.hits, cache.misses)
+
+    Parameters
+    ----------
+
+    path
+      Path to the cache's directory (created if it doesn't exist). Several
+      processes can share the same directory.
+
+    max_size
+      Maximal total size of the cache files, in bytes. When this size is
+      exceeded, the least recently used results are removed. Default None
+      means no size limit.
+
+    Attributes
+    ----------
+
+    hits, misses
+      Number of times a result was found (or not found) in the cache by this
+      instance, including by the processes of a parallel
+      ``batch_domestication`` (whose counts are reported to the cache of the
+      main process).
+    """
+
+    extension = ".pickle"
+
+    def __init__(self, path, max_size=None):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def compute_key(*elements):
+        """Return a hash of the elements, and of Genedom/DnaChisel versions."""
+        versions = ("genedom " + __version__, "dnachisel " + dnachisel.__version__)
+        data = fingerprint(versions + elements)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _file_path(self, key):
+        return os.path.join(self.path, key + self.extension)
+
+    def get(self, key):
+        """Return the result stored under the given key (None if no result)."""
+        file_path = self._file_path(key)
+        try:
+            with open(file_path, "rb") as f:
+                result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        os.utime(file_path)  # marks the result as recently used
+        return result
+
+    def set(self, key, result):
+        """Store a result under the given key, then evict results if needed."""
+        # Writing to a temporary file first means that other processes never
+        # read a half-written file.
+        fd, temp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self._file_path(key))
+        if self.max_size is not None:
+            self.evict(self.max_size)
+
+    def _list_entries(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(self.extension):
+                try:
+                    stat = entry.stat()
+                except OSError:  # file removed by another process
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, max_size):
+        """Remove the least recently used results until size <= max_size."""
+        entries = sorted(self._list_entries())
+        total_size = sum([size for (_, size, _) in entries])
+        for _, size, path in entries:
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def size(self):
+        """Return the total size of the cached results, in bytes."""
+        return sum([size for (_, size, _) in self._list_entries()])
+
+    def clear(self):
+        """Remove all results from the cache."""
+        self.evict(0)
+
+    def __len__(self):
+        return len(self._list_entries())
+
+    def __repr__(self):
+        return "DomesticationCache(%s, %d hits, %d misses)" % (
+            self.path,
+            self.hits,
+            self.misses,
+        )
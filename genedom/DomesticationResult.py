@@ -1,20 +1,90 @@
+"""Defines DomesticationResult, and the batch results files."""
+
+import json
+
+import numpy as np
+from Bio.SeqFeature import SeqFeature, FeatureLocation, CompoundLocation
+from dnachisel import Location, sequence_to_biopython_record
+
+from .biotools import write_zip_data
+
+
+def edit_intervals(sequence_after, sequence_before):
+    """Return an array [[start, end], ...] of the segments which differ."""
+    after = np.frombuffer(sequence_after.encode(), dtype=np.uint8)
+    before = np.frombuffer(sequence_before.encode(), dtype=np.uint8)
+    differs = np.zeros(len(after) + 2, dtype=np.int8)
+    differs[1:-1] = after != before
+    # The boundaries of the edited segments alternate (start, end, ...).
+    boundaries = np.flatnonzero(differs[1:] != differs[:-1])
+    return boundaries.astype(np.int64).reshape((-1, 2))
+
+
+def features_to_data(features):
+    """Return a JSON-compatible representation of Biopython features."""
+    return [
+        [
+            f.type,
+            [[int(p.start), int(p.end), p.strand] for p in f.location.parts],
+            getattr(f.location, "operator", None),
+            f.qualifiers,
+        ]
+        for f in features
+    ]
+
+
+def features_from_data(data):
+    """Return the Biopython features represented by ``features_to_data``."""
+    features = []
+    for feature_type, parts, operator, qualifiers in data:
+        locations = [FeatureLocation(*part) for part in parts]
+        if operator is not None:
+            location = CompoundLocation(locations, operator=operator)
+        else:
+            location = locations[0]
+        features.append(
+            SeqFeature(location, type=feature_type, qualifiers=dict(qualifiers))
+        )
+    return features
+
+
 class DomesticationResult:
     """Class to contain and represent one result of a part domestication.
 
+    The result is compact: it stores the sequences and the features of the
+    domesticated sequence, and the Biopython records are only created when
+    the ``record_after`` or ``edits_record`` attributes are first accessed.
+    The intervals of the edits (``edit_intervals``) and their total length
+    are computed once and cached.
+
+    A list of results can be written to (and read from) a single, columnar
+    results file, see ``write_results_file``.
+
     Parameters
     ----------
     record_before
-      Biopython record of the sequence before it is domesticated.
+      Sequence (string) before it is domesticated.
 
     record_after
-      Biopython record of the sequence after it was domesticated.
+      Biopython record of the sequence after it was domesticated, or the
+      sequence only (a string), whose features are then given by
+      ``features``.
 
     edits_record
       Biopython record annotated with every mutation introduced by the
-      domestication.
+      domestication, or None, in which case it is derived from record_after
+      (before any later change of ``record_after``) and record_before, only
+      when the ``edits_record`` attribute is first accessed.
+
+    When ``record_after`` is replaced (e.g. by a record with a barcode),
+    ``sequence_after`` and ``features`` become those of the new record, while
+    the edits (``edit_intervals``, ``edits_record``) remain those of the
+    domestication.
 
     report_data
-      Raw binary data of a PDF report.
+      Raw binary data of a zip archive containing the optimization report, or
+      a DeferredReport if the report was not rendered yet (see
+      ``write_report``), or None if there is no report.
 
     success
       Boolean indicating whether the domestication was possible or some
@@ -22,17 +92,150 @@ class DomesticationResult:
 
     message
       String containing some information on the reason for failure.
+
+    timings
+      Dictionary ``{stage: (wall_time, cpu_time)}`` of the times spent in the
+      different stages of the domestication, in seconds.
+
+    features
+      Features of the domesticated sequence, when ``record_after`` is a
+      sequence string.
     """
 
+    __slots__ = (
+        "record_before",
+        "sequence_after",
+        "features",
+        "report_data",
+        "success",
+        "message",
+        "timings",
+        "_record_after",
+        "_edits_record",
+        "_edit_intervals",
+        "_number_of_edits",
+        "_domesticated",
+    )
+
     def __init__(
-        self, record_before, record_after, edits_record, report_data, success, message
+        self,
+        record_before,
+        record_after,
+        edits_record,
+        report_data,
+        success,
+        message,
+        timings=None,
+        features=None,
     ):
         self.record_before = record_before
-        self.record_after = record_after
-        self.edits_record = edits_record
+        if isinstance(record_after, str):
+            self.sequence_after = record_after
+            self.features = [] if features is None else features
+            self._record_after = None
+        else:
+            self.sequence_after = str(record_after.seq)
+            self.features = record_after.features
+            self._record_after = record_after
+        self._edits_record = edits_record
         self.report_data = report_data
         self.success = success
         self.message = message
+        self.timings = {} if timings is None else timings
+        self._edit_intervals = None
+        self._number_of_edits = None
+        # (sequence, features) of the domestication, if record_after changed.
+        self._domesticated = None
+
+    @property
+    def record_after(self):
+        """Record of the domesticated sequence (created on first access)."""
+        if self._record_after is None:
+            record = sequence_to_biopython_record(self.sequence_after)
+            record.features = list(self.features)
+            self._record_after = record
+        return self._record_after
+
+    @record_after.setter
+    def record_after(self, record):
+        if self._domesticated is None:
+            self._domesticated = (self.sequence_after, self.features)
+        self._record_after = record
+        self.sequence_after = str(record.seq)
+        self.features = record.features
+
+    def _domesticated_sequence_and_features(self):
+        if self._domesticated is not None:
+            return self._domesticated
+        return self.sequence_after, self.features
+
+    def _sequence_before(self):
+        return str(getattr(self.record_before, "seq", self.record_before))
+
+    @property
+    def edit_intervals(self):
+        """Array [[start, end], ...] of the segments edited by the
+        domestication (computed on first access)."""
+        if self._edit_intervals is None:
+            sequence_after, _ = self._domesticated_sequence_and_features()
+            self._edit_intervals = edit_intervals(
+                sequence_after, self._sequence_before()
+            )
+        return self._edit_intervals
+
+    @property
+    def edits_record(self):
+        """Record of the domesticated sequence, with features for each edit.
+
+        The record has the same features as the domesticated record, plus one
+        feature for each segment of edited nucleotides, as in DnaChisel's
+        ``problem.to_record(with_sequence_edits=True)``. It is computed on
+        first access, as batch domestications never need it.
+        """
+        if self._edits_record is None:
+            sequence_after, features = self._domesticated_sequence_and_features()
+            sequence_before = self._sequence_before()
+            edits_record = sequence_to_biopython_record(sequence_after)
+            edits_record.features = list(features) + [
+                Location(start, end).to_biopython_feature(
+                    label="%s=>%s"
+                    % (sequence_before[start:end], sequence_after[start:end]),
+                    is_edit="true",
+                    ApEinfo_fwdcolor="#ff0000",
+                    color="#ff0000",
+                )
+                for start, end in self.edit_intervals.tolist()
+            ]
+            self._edits_record = edits_record
+        return self._edits_record
+
+    @edits_record.setter
+    def edits_record(self, record):
+        self._edits_record = record
+        self._number_of_edits = None
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        if "_number_of_edits" not in state:
+            # Result pickled by a version of Genedom without __slots__.
+            record_after = state.get("_domesticated_record", state["record_after"])
+            edits_record = state.get("_edits_record", state.get("edits_record"))
+            self.__init__(
+                state["record_before"],
+                record_after,
+                edits_record,
+                state["report_data"],
+                state["success"],
+                state["message"],
+                timings=state.get("timings"),
+            )
+            self._record_after = state["record_after"]
+            return
+        self._domesticated = None  # not in the results of previous versions.
+        for name, value in state.items():
+            setattr(self, name, value)
 
     def summary(self):
         """Return a string summarizing how the domestication went.
@@ -44,11 +247,157 @@ class DomesticationResult:
         else:
             return "FAILURE - %s" % self.message
 
+    def write_report(self, target):
+        """Write the optimization report (if any) to the target.
+
+        The target is a folder path, a zip path, a flametree directory or
+        "@memory" (in which case the raw data of a zip archive is returned).
+        Deferred reports are rendered at this point.
+        """
+        if self.report_data is None:
+            return None
+        if hasattr(self.report_data, "render"):
+            return self.report_data.render(target)
+        if target == "@memory":
+            return self.report_data
+        return write_zip_data(self.report_data, target)
+
     def number_of_edits(self):
-        return sum(
-            [
-                len(f)
-                for f in self.edits_record.features
-                if f.qualifiers.get("is_edit", False)
-            ]
+        """Return the number of nucleotides edited by the domestication."""
+        if self._number_of_edits is None:
+            if self._edits_record is not None:
+                # The edits record was provided: count its edit features.
+                self._number_of_edits = sum(
+                    [
+                        len(f)
+                        for f in self._edits_record.features
+                        if f.qualifiers.get("is_edit", False)
+                    ]
+                )
+            else:
+                intervals = self.edit_intervals
+                self._number_of_edits = int((intervals[:, 1] - intervals[:, 0]).sum())
+        return self._number_of_edits
+
+    def __repr__(self):
+        return "DomesticationResult(%s, %d bp)" % (
+            "success" if self.success else "failure",
+            len(self.sequence_after),
+        )
+
+    @staticmethod
+    def write_results_file(results, path):
+        """Write a list of results to a single columnar file (.npz).
+
+        Each attribute of the results is stored as one column: the sequences
+        are concatenated into one array with an array of offsets, the edit
+        intervals are stored as one array of integers, etc. which makes for
+        fast writing and reading (and no pickling is involved). The records
+        after domestication are stored via their sequence and features
+        (including changes made to ``record_after``, such as adding a
+        barcode, in which case the domesticated sequence and features are
+        also stored, for the edits). Deferred reports (not rendered yet) are
+        not saved.
+
+        Read the file with ``DomesticationResult.read_results_file(path)``.
+        """
+
+        def concatenated(values):
+            """Return (concatenation, offsets) for a list of bytes."""
+            offsets = np.cumsum([0] + [len(v) for v in values], dtype=np.int64)
+            data = np.frombuffer(b"".join(values), dtype=np.uint8)
+            return data, offsets
+
+        columns = {}
+        for name, values in [
+            ("sequences_before", [str(r.record_before) for r in results]),
+            ("sequences_after", [r.sequence_after for r in results]),
+            ("messages", [r.message for r in results]),
+            (
+                "features",
+                [
+                    json.dumps(features_to_data(r.features), default=str)
+                    for r in results
+                ],
+            ),
+            ("timings", [json.dumps(r.timings) for r in results]),
+            (
+                "domesticated",
+                [
+                    ""
+                    if r._domesticated is None
+                    else json.dumps(
+                        [r._domesticated[0], features_to_data(r._domesticated[1])],
+                        default=str,
+                    )
+                    for r in results
+                ],
+            ),
+        ]:
+            values = [v.encode() for v in values]
+            columns[name], columns[name + "_offsets"] = concatenated(values)
+        reports = [
+            r.report_data if isinstance(r.report_data, bytes) else b""
+            for r in results
+        ]
+        columns["reports"], columns["reports_offsets"] = concatenated(reports)
+        columns["success"] = np.array([r.success for r in results], dtype=bool)
+        intervals = [r.edit_intervals for r in results]
+        columns["edit_intervals"] = np.concatenate(
+            [np.zeros((0, 2), dtype=np.int64)] + intervals
+        )
+        columns["edit_intervals_offsets"] = np.cumsum(
+            [0] + [len(i) for i in intervals], dtype=np.int64
+        )
+        with open(path, "wb") as f:
+            np.savez(f, **columns)
+
+    @staticmethod
+    def read_results_file(path):
+        """Return the list of results written by ``write_results_file``."""
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in data.files}
+
+        def split(name, decode=True):
+            values, offsets = columns[name].tobytes(), columns[name + "_offsets"]
+            values = [values[s:e] for s, e in zip(offsets[:-1], offsets[1:])]
+            return [v.decode() for v in values] if decode else values
+
+        intervals, intervals_offsets = (
+            columns["edit_intervals"],
+            columns["edit_intervals_offsets"],
         )
+        results = []
+        if "domesticated" in columns:
+            domesticated = split("domesticated")
+        else:  # file written by a previous version
+            domesticated = [""] * len(columns["success"])
+        for i, (before, after, message, features, timings, report) in enumerate(
+            zip(
+                split("sequences_before"),
+                split("sequences_after"),
+                split("messages"),
+                split("features"),
+                split("timings"),
+                split("reports", decode=False),
+            )
+        ):
+            result = DomesticationResult(
+                before,
+                after,
+                None,
+                report if len(report) else None,
+                bool(columns["success"][i]),
+                message,
+                timings={
+                    stage: tuple(times) for stage, times in json.loads(timings).items()
+                },
+                features=features_from_data(json.loads(features)),
+            )
+            start, end = intervals_offsets[i], intervals_offsets[i + 1]
+            result._edit_intervals = intervals[start:end]
+            if domesticated[i]:
+                sequence, features_data = json.loads(domesticated[i])
+                result._domesticated = (sequence, features_from_data(features_data))
+            results.append(result)
+        return results
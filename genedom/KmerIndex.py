@@ -0,0 +1,196 @@
+"""Defines KmerIndex, to find homologies between sequences quickly."""
+
+import numpy as np
+from dnachisel import Location, Specification, SpecEvaluation
+
+NUCLEOTIDE_CODES = np.full(256, -1, dtype=np.int64)
+for _code, _nucleotides in enumerate(["Aa", "Cc", "Gg", "Tt"]):
+    for _nucleotide in _nucleotides:
+        NUCLEOTIDE_CODES[ord(_nucleotide)] = _code
+
+
+class KmerIndex:
+    """Index of all the k-mers of a set of sequences.
+
+    The k-mers are packed as 2-bit-per-nucleotide integers (so k can be at
+    most 32) and stored in a sorted NumPy array, so that adding sequences and
+    looking up all k-mers of a sequence are vectorized operations. If
+    ``include_reverse_complement`` is True, each k-mer is indexed under its
+    canonical form (the smallest of the k-mer and its reverse-complement) so
+    that homologies are found on both strands.
+
+    K-mers with non-ATGC characters are ignored.
+
+    Examples
+    --------
+
+    >>> index = KmerIndex(k=10)
+    >>> index.add("ATGCTGCATGCTAGTCGTAGC", label="B_001")
+    >>> index.find_homologies("TTGCTAGCATGCAGC")
+    >>> # [(3, 13, "B_001"), (4, 14, "B_001"), (5, 15, "B_001")]
+
+    Parameters
+    ----------
+
+    k
+      Size of the k-mers, i.e. the length of the shortest homology detected.
+
+    include_reverse_complement
+      Whether homologies with the reverse-complement of the indexed sequences
+      should also be detected.
+    """
+
+    def __init__(self, k, include_reverse_complement=True):
+        if not (1 <= k <= 32):
+            raise ValueError("KmerIndex only supports 1 <= k <= 32, not %s" % k)
+        self.k = k
+        self.include_reverse_complement = include_reverse_complement
+        self.labels = []
+        self._weights = (4 ** np.arange(k - 1, -1, -1)).astype(np.uint64)
+        self._kmers = np.zeros(0, dtype=np.uint64)  # sorted
+        self._label_ids = np.zeros(0, dtype=np.int64)
+        self._pending = []  # (kmers, label_ids) added but not merged yet
+
+    def encode(self, sequence):
+        """Return (kmers, positions): the packed k-mers of the sequence and
+        their start positions (k-mers with non-ATGC characters are skipped)."""
+        codes = NUCLEOTIDE_CODES[np.frombuffer(sequence.encode(), dtype=np.uint8)]
+        if len(codes) < self.k:
+            return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+        windows = np.lib.stride_tricks.sliding_window_view(codes, self.k)
+        positions = np.flatnonzero((windows >= 0).all(axis=1))
+        windows = windows[positions].astype(np.uint64)
+        kmers = (windows * self._weights).sum(axis=1, dtype=np.uint64)
+        if self.include_reverse_complement:
+            reverse_windows = np.uint64(3) - windows[:, ::-1]
+            reverse_kmers = (reverse_windows * self._weights).sum(
+                axis=1, dtype=np.uint64
+            )
+            kmers = np.minimum(kmers, reverse_kmers)
+        return kmers, positions
+
+    def add(self, sequence, label=None):
+        """Add the k-mers of the sequence to the index."""
+        kmers, _ = self.encode(sequence)
+        label_ids = np.full(len(kmers), len(self.labels), dtype=np.int64)
+        self.labels.append(label)
+        self._pending.append((kmers, label_ids))
+
+    def _merge_pending(self):
+        if not len(self._pending):
+            return
+        kmers = np.concatenate([self._kmers] + [k for (k, _) in self._pending])
+        label_ids = np.concatenate(
+            [self._label_ids] + [ids for (_, ids) in self._pending]
+        )
+        # A stable sort keeps the k-mers of the first-added sequences first.
+        order = np.argsort(kmers, kind="stable")
+        self._kmers, self._label_ids = kmers[order], label_ids[order]
+        self._pending = []
+
+    def _lookup(self, kmers):
+        """Return (found, indices) for an array of packed k-mers."""
+        self._merge_pending()
+        indices = np.searchsorted(self._kmers, kmers)
+        indices = np.minimum(indices, max(0, len(self._kmers) - 1))
+        if not len(self._kmers):
+            return np.zeros(len(kmers), dtype=bool), indices
+        return self._kmers[indices] == kmers, indices
+
+    def find_homologies(self, sequence):
+        """Return the list [(start, end, label), ...] of indexed k-mers found in
+        the sequence. Label is the label of the first indexed sequence with that
+        k-mer.
+        """
+        kmers, positions = self.encode(sequence)
+        found, indices = self._lookup(kmers)
+        return [
+            (int(start), int(start) + self.k, self.labels[label_id])
+            for start, label_id in zip(
+                positions[found], self._label_ids[indices[found]]
+            )
+        ]
+
+    def shared_kmers_labels(self):
+        """Return the set of pairs (label_1, label_2) of indexed sequences
+        sharing at least one k-mer, with label_1 added before label_2. Pairs
+        (label, label) indicate k-mers repeated in a same sequence."""
+        self._merge_pending()
+        repeated = np.flatnonzero(self._kmers[1:] == self._kmers[:-1])
+        # Thanks to the stable sort, the first occurrence comes first.
+        run_starts = np.searchsorted(self._kmers, self._kmers[repeated + 1])
+        first_ids = self._label_ids[run_starts]
+        other_ids = self._label_ids[repeated + 1]
+        pairs = set(zip(first_ids.tolist(), other_ids.tolist()))
+        return set([(self.labels[i], self.labels[j]) for (i, j) in pairs])
+
+    def __contains__(self, kmer):
+        kmers, _ = self.encode(kmer)
+        return (len(kmers) == 1) and bool(self._lookup(kmers)[0][0])
+
+    def __len__(self):
+        """Return the number of indexed k-mers (with repetitions)."""
+        return len(self._kmers) + sum([len(k) for (k, _) in self._pending])
+
+    def __repr__(self):
+        return "KmerIndex(k=%d, %d sequences, %d kmers)" % (
+            self.k,
+            len(self.labels),
+            len(self),
+        )
+
+
+class AvoidIndexedKmers(Specification):
+    """DnaChisel specification to avoid homologies with indexed sequences.
+
+    The specification fails at every k-mer of the location which is present
+    in the KmerIndex. This enables to design a sequence against many existing
+    sequences without including them in the optimized sequence.
+
+    Parameters
+    ----------
+
+    index
+      A KmerIndex.
+
+    location
+      Location of the sequence where the k-mers are checked.
+    """
+
+    def __init__(self, index, location=None, boost=1.0):
+        self.index = index
+        self.location = Location.from_data(location)
+        self.boost = boost
+
+    def initialized_on_problem(self, problem, role="constraint"):
+        return self._copy_with_full_span_if_no_location(problem)
+
+    def evaluate(self, problem):
+        """Return score=-number_of_indexed_kmers, and their locations."""
+        start, end = self.location.start, self.location.end
+        locations = [
+            Location(start + homology_start, start + homology_end)
+            for homology_start, homology_end, _ in self.index.find_homologies(
+                problem.sequence[start:end]
+            )
+        ]
+        return SpecEvaluation(
+            self,
+            problem,
+            score=-len(locations),
+            locations=locations,
+            message="Indexed k-mers found at %s" % locations,
+        )
+
+    def localized(self, location, problem=None, with_righthand=True):
+        """Only check the k-mers overlapping the given location."""
+        if self.location.overlap_region(location) is None:
+            return None
+        extended_location = location.extended(
+            self.index.k - 1, right=with_righthand
+        )
+        new_location = self.location.overlap_region(extended_location)
+        return self.copy_with_changes(location=new_location)
+
+    def label_parameters(self):
+        return [("k", str(self.index.k)), ("kmers", str(len(self.index)))]
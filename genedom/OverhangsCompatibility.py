@@ -0,0 +1,315 @@
+"""Defines OverhangsCompatibility, to assess and design sets of overhangs."""
+
+import itertools
+
+import numpy as np
+import pandas
+from Bio.Seq import reverse_complement
+
+
+class OverhangsCompatibility:
+    """Precomputed compatibility matrices of all the overhangs of a size.
+
+    The mismatches between all pairs of overhangs (e.g. the 256 4-bp
+    overhangs) are computed once, so that sets of overhangs (such as those of
+    a standard) are evaluated, and new sets searched, with array operations.
+
+    Two overhangs can cross-ligate if one is similar to the other or to its
+    reverse-complement: the "distance" between two overhangs is the smallest
+    number of mismatches between the first overhang and either the second
+    overhang or its reverse-complement. Palindromic overhangs (equal to their
+    reverse-complement) can ligate with themselves and should be avoided.
+
+    Ligation frequencies between all overhangs, such as measured in Potapov
+    et al. (ACS Synth. Biol. 2018), can also be provided, to compute the
+    expected fidelity of the ligations of a set of overhangs.
+
+    Examples
+    --------
+
+    >>> compatibility = OverhangsCompatibility()
+    >>> compatibility.evaluate(BUILTIN_STANDARDS.EMMA.list_overhangs())
+    >>> compatibility.find_overhangs_set(12, fixed=["ATGG", "GCTT"])
+    >>> compatibility.find_substitutes(["ATGG", "ATGC", "GATC", "TTAC"])
+
+    Parameters
+    ----------
+
+    ligation_frequencies
+      Optional matrix (array or pandas dataframe with overhangs as index and
+      columns) where the entry ``[o1, o2]`` is the frequency (or count) of
+      the ligations between a fragment with overhang ``o1`` and a fragment
+      whose overhang, read 5'-3' on the other strand, is ``o2`` (so the
+      expected ligation of ``o1`` is with ``reverse_complement(o1)``). See
+      also ``from_ligation_frequencies_file``.
+
+    overhang_size
+      Size of the overhangs (4 for most Golden Gate enzymes).
+    """
+
+    def __init__(self, ligation_frequencies=None, overhang_size=4):
+        self.overhang_size = overhang_size
+        self.overhangs = [
+            "".join(nucleotides)
+            for nucleotides in itertools.product("ACGT", repeat=overhang_size)
+        ]
+        self.indices = {overhang: i for i, overhang in enumerate(self.overhangs)}
+        self.reverse_complements = np.array(
+            [self.indices[reverse_complement(o)] for o in self.overhangs]
+        )
+        self.palindromic = self.reverse_complements == np.arange(len(self.overhangs))
+        nucleotides = np.array([list(o) for o in self.overhangs])
+        self.mismatches = np.zeros((len(self.overhangs),) * 2, dtype=np.int8)
+        for column in nucleotides.T:
+            self.mismatches += column[:, None] != column[None, :]
+        self.distances = np.minimum(
+            self.mismatches, self.mismatches[:, self.reverse_complements]
+        )
+        if isinstance(ligation_frequencies, pandas.DataFrame):
+            frame = ligation_frequencies.reindex(
+                index=self.overhangs, columns=self.overhangs
+            )
+            ligation_frequencies = frame.fillna(0).values
+        if ligation_frequencies is not None:
+            ligation_frequencies = np.asarray(ligation_frequencies, dtype=float)
+            # Ligations are counted in both directions.
+            ligation_frequencies = ligation_frequencies + ligation_frequencies.T
+        self.ligation_frequencies = ligation_frequencies
+
+    @staticmethod
+    def from_ligation_frequencies_file(path, overhang_size=4):
+        """Return an OverhangsCompatibility with frequencies from a file.
+
+        The file is a CSV or XLS(X) table whose first column and first row
+        are overhangs, and whose cells are the ligation frequencies (or
+        counts) of the row's overhang with the column's overhang (see the
+        ``ligation_frequencies`` parameter).
+        """
+        if path.lower().endswith(".csv"):
+            dataframe = pandas.read_csv(path, index_col=0)
+        else:
+            dataframe = pandas.read_excel(path, index_col=0)
+        dataframe.index = [str(o).upper() for o in dataframe.index]
+        dataframe.columns = [str(o).upper() for o in dataframe.columns]
+        return OverhangsCompatibility(
+            ligation_frequencies=dataframe, overhang_size=overhang_size
+        )
+
+    def encode(self, overhangs):
+        """Return the array of the indices of the overhangs in the matrices."""
+        try:
+            return np.array([self.indices[o.upper()] for o in overhangs], dtype=int)
+        except KeyError as error:
+            raise ValueError(
+                "%s is not a %d-bp ATGC overhang" % (error, self.overhang_size)
+            )
+
+    def distance_matrix(self, overhangs):
+        """Return the matrix of the distances between the overhangs."""
+        codes = self.encode(overhangs)
+        return self.distances[codes][:, codes]
+
+    def conflicts(self, overhangs, min_mismatches=2):
+        """Return the pairs of overhangs which could cross-ligate.
+
+        Returns a list ``[(overhang_1, overhang_2, distance), ...]`` of the
+        pairs with fewer than ``min_mismatches`` mismatches (see
+        ``distances``).
+        """
+        overhangs = list(overhangs)
+        distances = self.distance_matrix(overhangs)
+        rows, columns = np.nonzero(np.triu(distances < min_mismatches, k=1))
+        return [
+            (overhangs[i], overhangs[j], int(distances[i, j]))
+            for i, j in zip(rows, columns)
+        ]
+
+    def fidelity(self, overhangs):
+        """Return the expected fidelity of the ligations of the overhangs.
+
+        This is the probability that all overhangs (and their
+        reverse-complements) ligate with their expected partner rather than
+        with another overhang of the set, computed from the ligation
+        frequencies as in Potapov et al. 2018. Returns None if no ligation
+        frequencies were provided.
+        """
+        if self.ligation_frequencies is None:
+            return None
+        codes = self.encode(overhangs)
+        codes = np.unique(np.concatenate([codes, self.reverse_complements[codes]]))
+        frequencies = self.ligation_frequencies[codes][:, codes]
+        correct = self.ligation_frequencies[codes, self.reverse_complements[codes]]
+        totals = frequencies.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.where(totals > 0, correct / totals, 0)
+        return float(np.prod(ratios))
+
+    def evaluate(self, overhangs, min_mismatches=2):
+        """Return a dictionary summarizing the quality of a set of overhangs.
+
+        The dictionary has keys ``overhangs``, ``palindromic`` (list of the
+        palindromic overhangs), ``conflicts`` (see ``conflicts``),
+        ``min_distance`` (smallest distance between two overhangs) and
+        ``fidelity`` (see ``fidelity``).
+        """
+        overhangs = list(overhangs)
+        codes = self.encode(overhangs)
+        distances = self.distance_matrix(overhangs)
+        np.fill_diagonal(distances, self.overhang_size)
+        return {
+            "overhangs": overhangs,
+            "palindromic": [
+                o for o, code in zip(overhangs, codes) if self.palindromic[code]
+            ],
+            "conflicts": self.conflicts(overhangs, min_mismatches=min_mismatches),
+            "min_distance": int(distances.min()) if len(overhangs) > 1 else None,
+            "fidelity": self.fidelity(overhangs),
+        }
+
+    def _set_score(self, codes):
+        """Return a score (the higher the better) of a compatible set."""
+        if self.ligation_frequencies is not None:
+            return self.fidelity([self.overhangs[c] for c in codes])
+        distances = self.distances[codes][:, codes]
+        np.fill_diagonal(distances, self.overhang_size)
+        return (int(distances.min()), float(distances.mean()))
+
+    def find_overhangs_set(
+        self,
+        n_overhangs,
+        fixed=(),
+        forbidden=(),
+        min_mismatches=2,
+        n_trials=50,
+        seed=123,
+    ):
+        """Return a set of compatible overhangs, or None if none is found.
+
+        The set is built by adding overhangs one at a time among the
+        candidates compatible with all overhangs already selected (no
+        palindromes, at least ``min_mismatches`` with the other overhangs and
+        their reverse-complements). The next overhang is the candidate which
+        keeps the most candidates available or, if ligation frequencies were
+        provided, the one with the least cross-ligations with the selected
+        overhangs. This is repeated ``n_trials`` times with random
+        tie-breaking, and the best set found is returned: the most faithful
+        one if ligation frequencies were provided, else the one with the
+        largest (minimal, then average) distance between overhangs.
+
+        Parameters
+        ----------
+
+        n_overhangs
+          Number of overhangs in the set (including the fixed overhangs).
+
+        fixed
+          Overhangs which must be part of the set. A ValueError is raised if
+          some are palindromic or could cross-ligate with each other.
+
+        forbidden
+          Overhangs (and their reverse-complements) which can't be part of
+          the set.
+
+        min_mismatches
+          Minimal distance between two overhangs of the set.
+
+        n_trials
+          Number of sets built (the search is faster with fewer trials, and
+          better with more).
+
+        seed
+          Seed of the random tie-breaking, for reproducible results.
+        """
+        fixed = list(fixed)
+        codes = self.encode(fixed)
+        palindromic = [o for o, code in zip(fixed, codes) if self.palindromic[code]]
+        if len(palindromic):
+            raise ValueError("Palindromic fixed overhangs: %s" % palindromic)
+        conflicts = self.conflicts(fixed, min_mismatches=min_mismatches)
+        if len(conflicts):
+            raise ValueError(
+                "Fixed overhangs could cross-ligate: %s"
+                % ", ".join(["%s-%s" % (o1, o2) for (o1, o2, _) in conflicts])
+            )
+        rng = np.random.RandomState(seed)
+        compatible = self.distances >= min_mismatches
+        fixed = list(codes)
+        forbidden = self.encode(forbidden)
+        available = ~self.palindromic
+        available[forbidden] = False
+        available[self.reverse_complements[forbidden]] = False
+        for code in fixed:
+            available &= compatible[code]
+        frequencies = self.ligation_frequencies
+        best_codes, best_score = None, None
+        for trial in range(n_trials):
+            codes = list(fixed)
+            candidates = available.copy()
+            while len(codes) < n_overhangs:
+                indices = np.flatnonzero(candidates)
+                if not len(indices):
+                    break
+                if frequencies is None:
+                    scores = compatible[indices][:, candidates].sum(axis=1)
+                else:
+                    both_strands = codes + list(self.reverse_complements[codes])
+                    indices_rc = self.reverse_complements[indices]
+                    correct = frequencies[indices, indices_rc]
+                    crosstalk = frequencies[indices][:, both_strands].sum(axis=1)
+                    crosstalk += frequencies[indices_rc][:, both_strands].sum(axis=1)
+                    scores = correct / (correct + crosstalk + 1e-12)
+                # Random tie-breaking (and exploration of near-ties).
+                scores = scores * (1 + 1e-3 * rng.rand(len(indices)))
+                selected = indices[np.argmax(scores)]
+                codes.append(selected)
+                candidates &= compatible[selected]
+            if len(codes) < n_overhangs:
+                continue
+            score = self._set_score(codes)
+            if (best_score is None) or (score > best_score):
+                best_codes, best_score = codes, score
+        if best_codes is None:
+            return None
+        return [self.overhangs[code] for code in best_codes]
+
+    def find_substitutes(self, overhangs, min_mismatches=2, **search_parameters):
+        """Return substitutes for the overhangs which could cross-ligate.
+
+        Overhangs are removed from the set, starting with palindromic
+        overhangs then the overhangs involved in the most conflicts, until
+        the remaining overhangs are compatible. New overhangs compatible with
+        the remaining ones are then searched (see ``find_overhangs_set``, whose
+        other parameters can be provided).
+
+        Returns a dictionary ``{old_overhang: new_overhang}`` (empty if the
+        set was already compatible), or None if no substitutes were found.
+        """
+        overhangs = list(dict.fromkeys(overhangs))
+        codes = self.encode(overhangs)
+        conflicting = self.distances[codes][:, codes] < min_mismatches
+        np.fill_diagonal(conflicting, False)
+        kept = np.ones(len(codes), dtype=bool)
+        while True:
+            n_conflicts = (conflicting & kept[None, :]).sum(axis=1) * kept
+            n_conflicts += len(codes) * (self.palindromic[codes] & kept)
+            if n_conflicts.max(initial=0) == 0:
+                break
+            kept[np.argmax(n_conflicts)] = False
+        if kept.all():
+            return {}
+        new_set = self.find_overhangs_set(
+            len(overhangs),
+            fixed=[o for o, keep in zip(overhangs, kept) if keep],
+            min_mismatches=min_mismatches,
+            **search_parameters
+        )
+        if new_set is None:
+            return None
+        removed = [o for o, keep in zip(overhangs, kept) if not keep]
+        return dict(zip(removed, new_set[int(kept.sum()) :]))
+
+    def __repr__(self):
+        return "OverhangsCompatibility(%d-bp overhangs%s)" % (
+            self.overhang_size,
+            "" if self.ligation_frequencies is None else ", ligation frequencies",
+        )
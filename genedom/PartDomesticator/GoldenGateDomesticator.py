@@ -10,10 +10,10 @@ from dnachisel import (
     annotate_record,
     Location,
     sequence_to_biopython_record,
-    EnzymeSitePattern,
 )
 
 from ..StandardDomesticatorsSet import StandardDomesticatorsSet
+from ..SitesIndex import SitesIndex, SitesPattern
 from .PartDomesticator import PartDomesticator
 
 
@@ -98,15 +98,10 @@ class GoldenGateDomesticator(PartDomesticator):
             + (self.enzyme_seq + "A").reverse_complement()
         )
         self.extra_avoided_sites = extra_avoided_sites
-        constraints = list(constraints) + [
-            (
-                lambda seq: AvoidPattern(
-                    EnzymeSitePattern(enzyme),
-                    location=Location(len(left_flank), len(left_flank) + len(seq)),
-                )
-            )
-            for enz in ([enzyme] + list(extra_avoided_sites))
-        ]
+        self.avoided_enzymes = [enzyme] + list(extra_avoided_sites)
+        self.sites_index = SitesIndex(self.avoided_enzymes)
+        # Not self.sites_index, which can be replaced by a standard's index.
+        self._sites_pattern = SitesPattern(self.sites_index)
         PartDomesticator.__init__(
             self,
             left_flank=left_flank,
@@ -117,6 +112,21 @@ class GoldenGateDomesticator(PartDomesticator):
             name=name,
             cds_by_default=cds_by_default,
         )
+        self._sites_constraint = self._avoided_sites_constraint()
+        self.constraints.append(self._sites_constraint)
+
+    def _avoided_sites_constraint(self):
+        """Return a function (sequence => constraint) avoiding all the sites.
+
+        A single constraint avoids the sites of all the avoided enzymes. This
+        function is a closure which can't be pickled, so it is rebuilt when
+        the domesticator is unpickled.
+        """
+        sites_pattern = self._sites_pattern
+        insert_start = len(self.left_flank)
+        return lambda seq: AvoidPattern(
+            sites_pattern, location=Location(insert_start, insert_start + len(seq))
+        )
 
     def __repr__(self):
         return "GgDomesticator[%s](%s-%s)" % (
@@ -132,6 +142,43 @@ class GoldenGateDomesticator(PartDomesticator):
             self.right_overhang,
         )
 
+    def count_breaches(self, sequence, sites=None):
+        """Return the number of avoided sites in the sequence (either strand),
+        or None if the domesticator has custom constraints or objectives.
+
+        The ``sites`` found in the sequence by the domesticator's sites index
+        can be provided if they were already computed.
+        """
+        custom_constraints = [
+            c for c in self.constraints if c is not self._sites_constraint
+        ]
+        if len(custom_constraints) or len(self.objectives):
+            return None
+        if sites is None:
+            if not self.sites_index.has_sites(sequence, self.avoided_enzymes):
+                return 0
+            sites = self.sites_index.find_sites(sequence)
+        return len([site for site in sites if site[0] in self.avoided_enzymes])
+
+    def __getstate__(self):
+        # All attributes are pickled (including those changed after the
+        # domesticator's creation), except the avoided sites constraint.
+        state = PartDomesticator.__getstate__(self)
+        sites_constraint = state.pop("_sites_constraint")
+        # The position of the constraint is kept, as other constraints can be
+        # added (or removed) after the domesticator's creation.
+        state["constraints"] = [
+            None if c is sites_constraint else c for c in state["constraints"]
+        ]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._sites_constraint = self._avoided_sites_constraint()
+        self.constraints = [
+            self._sites_constraint if c is None else c for c in self.constraints
+        ]
+
     def details_list(self):
         result = PartDomesticator.details_list(self) + [
             ("Enzyme", "%s (%s)" % (self.enzyme, str(self.enzyme_seq.seq))),
@@ -1,5 +1,7 @@
 """Defines central class PartDomesticator."""
 
+import functools
+
 from Bio import SeqIO
 from Bio.SeqRecord import SeqRecord
 
@@ -13,9 +15,26 @@ from dnachisel import (
     sequence_to_biopython_record,
     AvoidChanges,
 )
+from dnachisel.biotools import find_specification_label_in_feature
 
 from dnachisel.reports import SpecAnnotationsTranslator
 from ..DomesticationResult import DomesticationResult
+from ..DomesticationCache import fingerprint
+from ..DeferredReport import DeferredReport
+from ..StageTimer import StageTimer
+from .ProblemTemplate import ProblemTemplate
+from .windowed_optimization import breach_windows, optimize_in_windows
+
+
+def has_specification_features(record):
+    """Return True if the record has DnaChisel specification annotations."""
+    return any(
+        [
+            (feature.type == "misc_feature")
+            and (find_specification_label_in_feature(feature) is not None)
+            for feature in record.features
+        ]
+    )
 
 
 class PartDomesticator:
@@ -56,8 +75,26 @@ class PartDomesticator:
 
     logger
       A proglog logger or 'bar' or None for no logger at all.
+
+    Attributes
+    ----------
+
+    prescreen_sequences
+      If True (default), sequences which are found to already satisfy the
+      domesticator's constraints by ``sequence_satisfies_constraints`` are
+      domesticated without creating an optimization problem (when there is no
+      other specification or objective to consider). Set to False to always
+      go through DnaChisel.
+
+    window_padding
+      Number of nucleotides (default 60) added on each side of the breaches
+      to form the windows of ``domesticate(..., windowed=True)``, and of
+      (unmodified) context around each window.
     """
 
+    prescreen_sequences = True
+    window_padding = 60
+
     def __init__(
         self,
         name="unnamed domesticator",
@@ -102,6 +139,9 @@ class PartDomesticator:
         barcode="",
         barcode_spacer="AA",
         report_target=None,
+        cache=None,
+        timing_hook=None,
+        windowed=False,
     ):
         """Domesticate a sequence.
 
@@ -142,7 +182,10 @@ class PartDomesticator:
 
         report_target
           Target for the sequence optimization report (a folder path, or a zip
-          path).
+          path, or "@memory" for raw zip data in the result's
+          ``report_data``). With "@deferred", no report is rendered, and the
+          result's ``report_data`` is a DeferredReport which can be rendered
+          later with ``result.write_report(target)``.
 
         barcode
           A sequence of DNA that will be added to the left of the sequence once
@@ -153,6 +196,31 @@ class PartDomesticator:
           the idea here is that they will make sure to avoid the creation of
           unwanted cutting sites).
 
+        cache
+          A DomesticationCache (or any object with the same ``compute_key``,
+          ``get`` and ``set`` methods). If the same sequence was already
+          domesticated with the same domesticator and parameters, the stored
+          result is returned (and its report written to ``report_target``)
+          without running the optimization again.
+
+        timing_hook
+          Optional function ``hook(record_id, stage, wall_time, cpu_time)``
+          called at the end of each stage of the domestication
+          ("build_problem", "resolve_constraints", "optimize", "report",
+          "to_record", etc.), for instance to forward the timings to a metrics
+          system. The timings are also available in the result's ``timings``.
+
+        windowed
+          If True, the breaches of the constraints (e.g. enzyme sites) are
+          located first, and only windows of the sequence around the breaches
+          (``window_padding`` nucleotides on each side, in the codon frame
+          for CDS) are optimized, as separate small problems. The results are
+          stitched back and all constraints are checked on the whole
+          sequence. This is much faster for long parts with few breaches, but
+          the objectives (codon optimization, etc.) are only optimized in the
+          windows. If the windows can't be solved, or if the constraints
+          already pass (no windows), the whole sequence is optimized as usual.
+
         Returns
         -------
 
@@ -160,6 +228,243 @@ class PartDomesticator:
         """
         if is_cds == "default":
             is_cds = self.cds_by_default
+        timer = StageTimer(timing_hook, getattr(dna_sequence, "id", None))
+        if cache is not None:
+            with timer.stage("cache_lookup"):
+                key = cache.compute_key(
+                    self,
+                    dna_sequence,
+                    protein_sequence,
+                    is_cds,
+                    codon_optimization,
+                    list(extra_constraints),
+                    list(extra_objectives),
+                    edit,
+                    report_target is not None,
+                    report_target == "@deferred",
+                    windowed,
+                )
+                result = cache.get(key)
+            if result is None:
+                # The report is generated as zip data, so it can be cached.
+                if report_target not in (None, "@deferred"):
+                    cached_report_target = "@memory"
+                else:
+                    cached_report_target = report_target
+                result = self.domesticate(
+                    dna_sequence=dna_sequence,
+                    protein_sequence=protein_sequence,
+                    is_cds=is_cds,
+                    codon_optimization=codon_optimization,
+                    extra_constraints=extra_constraints,
+                    extra_objectives=extra_objectives,
+                    edit=edit,
+                    report_target=cached_report_target,
+                    timing_hook=timing_hook,
+                    windowed=windowed,
+                )
+                with timer.stage("cache_store"):
+                    cache.set(key, result)
+                result.timings.update(timer.timings)
+            else:
+                # Timings of the original domestication are irrelevant.
+                result.timings = timer.timings
+            if report_target not in (None, "@memory", "@deferred"):
+                with timer.stage("report"):
+                    result.write_report(report_target)
+            if final_record_target is not None:
+                with timer.stage("write_genbank"):
+                    SeqIO.write(result.record_after, final_record_target, "genbank")
+            return result
+        with timer.stage("prescreen"):
+            can_skip_optimization = self._can_skip_optimization(
+                dna_sequence,
+                protein_sequence,
+                is_cds,
+                codon_optimization,
+                extra_constraints,
+                extra_objectives,
+            )
+        if can_skip_optimization:
+            with timer.stage("to_record"):
+                result = self._domesticate_without_optimization(dna_sequence)
+            if final_record_target is not None:
+                with timer.stage("write_genbank"):
+                    SeqIO.write(result.record_after, final_record_target, "genbank")
+            result.timings = timer.timings
+            return result
+        with timer.stage("build_problem"):
+            problem = self.build_problem(
+                dna_sequence=dna_sequence,
+                protein_sequence=protein_sequence,
+                is_cds=is_cds,
+                codon_optimization=codon_optimization,
+                extra_constraints=extra_constraints,
+                extra_objectives=extra_objectives,
+                edit=edit,
+                # The windows' problems compute their own mutation spaces.
+                constrain_mutation_space=not windowed,
+            )
+        with timer.stage("evaluate"):
+            all_constraints_pass = problem.all_constraints_pass()
+        no_objectives = (len(problem.objectives) - self.minimize_edits) == 0
+        report_data = None
+        optimization_successful = True
+        message = ""
+        # print (all_constraints_pass, no_objectives)
+        optimized_in_windows = False
+        problem.n_mutations = self.simultaneous_mutations
+        # Windows are only formed around breaches: if the constraints already
+        # pass, the objectives are optimized on the whole sequence.
+        if windowed and not all_constraints_pass:
+            with timer.stage("optimize_windows"):
+                optimized_in_windows = self._optimize_in_windows(problem, is_cds)
+            if optimized_in_windows and (report_target is not None):
+                # Same message as an optimization of the whole sequence.
+                message = DeferredReport.SUCCESS_MESSAGE
+                report_data = DeferredReport(problem, project_name=self.name)
+                if report_target != "@deferred":
+                    with timer.stage("report"):
+                        report_data = report_data.render(report_target)
+        if not ((all_constraints_pass and no_objectives) or optimized_in_windows):
+            if windowed:
+                with timer.stage("build_problem"):
+                    ProblemTemplate.constrain_mutation_space(problem)
+            if report_target is not None:
+                (success, message, report_data) = DeferredReport.optimize(
+                    problem, project_name=self.name, timer=timer
+                )
+                optimization_successful = success
+                if report_target != "@deferred":
+                    with timer.stage("report"):
+                        report_data = report_data.render(report_target)
+            else:
+                report_data = None
+                try:
+                    with timer.stage("resolve_constraints"):
+                        problem.resolve_constraints()
+                    with timer.stage("optimize"):
+                        problem.optimize()
+                except Exception as err:
+                    message = str(err)
+                    optimization_successful = False
+                    report_data = None
+        with timer.stage("to_record"):
+            # Same features as problem.to_record(with_original_features=True),
+            # the records are only created when accessed.
+            features = [
+                f
+                for f in problem.record.features
+                if not find_specification_label_in_feature(f)
+            ]
+            result = DomesticationResult(
+                problem.sequence_before,
+                problem.sequence,
+                None,
+                report_data,
+                optimization_successful,
+                message,
+                timings=timer.timings,
+                features=features,
+            )
+        if final_record_target is not None:
+            with timer.stage("write_genbank"):
+                SeqIO.write(result.record_after, final_record_target, "genbank")
+        return result
+
+    async def adomesticate(self, dna_sequence=None, executor=None, **parameters):
+        """Domesticate a sequence without blocking the asyncio event loop.
+
+        The domestication (``domesticate(dna_sequence, **parameters)``) runs
+        in the executor, so that for instance a web service can keep serving
+        requests meanwhile, and many concurrent requests can share a same
+        pool of worker processes.
+
+        Examples
+        --------
+
+        >>> executor = ProcessPoolExecutor(max_workers=8)  # shared
+        >>> result = await domesticator.adomesticate(sequence, executor=executor)
+
+        Parameters
+        ----------
+
+        dna_sequence
+          The DNA sequence (string or record) to domesticate.
+
+        executor
+          A ``concurrent.futures`` executor, or None for the event loop's
+          default executor (a thread pool). With a process pool, the
+          domesticator and the parameters must be picklable, and reports
+          should be returned with ``report_target="@memory"`` (or
+          "@deferred").
+
+        parameters
+          Other parameters of ``domesticate``.
+
+        Cancelling the task cancels the domestication if it hasn't started
+        yet in the executor (a running domestication is completed and its
+        result discarded).
+        """
+        import asyncio  # not imported with genedom, as it takes some time
+
+        loop = asyncio.get_running_loop()
+        domesticate = functools.partial(self.domesticate, dna_sequence, **parameters)
+        return await loop.run_in_executor(executor, domesticate)
+
+    def _optimize_in_windows(self, problem, is_cds):
+        """Optimize the problem in windows around its breaches, see
+        ``domesticate(..., windowed=True)``. Return True if successful."""
+        start = len(self.left_flank)
+        location = Location(start, len(problem.sequence) - len(self.right_flank))
+        windows = breach_windows(
+            problem, location, self.window_padding, codon_frame=is_cds
+        )
+        if windows is None:
+            return False
+        return optimize_in_windows(problem, windows, margin=self.window_padding)
+
+    def build_problem(
+        self,
+        dna_sequence=None,
+        protein_sequence=None,
+        is_cds="default",
+        codon_optimization=None,
+        extra_constraints=(),
+        extra_objectives=(),
+        edit=False,
+        constrain_mutation_space=True,
+    ):
+        """Return the DnaOptimizationProblem used to domesticate a sequence.
+
+        The parameters are the same as for ``domesticate``. The problem can be
+        used to evaluate the constraints on the sequence without optimizing.
+        Problems for sequence strings, and records without specification
+        features, are created from a memoized ProblemTemplate (see
+        ``problem_template``). For these problems, ``constrain_mutation_space``
+        can be set to False to skip the computation of the mutation space
+        (see ``ProblemTemplate.build_problem``).
+        """
+        if is_cds == "default":
+            is_cds = self.cds_by_default
+        is_plain_record = (
+            isinstance(dna_sequence, SeqRecord)
+            and not has_specification_features(dna_sequence)
+            and not (len(extra_constraints) or len(extra_objectives))
+        )
+        if (isinstance(dna_sequence, str) or is_plain_record) and (
+            protein_sequence is None
+        ):
+            template = self.problem_template(
+                is_cds=is_cds,
+                codon_optimization=codon_optimization,
+                extra_constraints=extra_constraints,
+                extra_objectives=extra_objectives,
+                edit=edit,
+            )
+            return template.build_problem(
+                dna_sequence, constrain_mutation_space=constrain_mutation_space
+            )
         if isinstance(dna_sequence, SeqRecord):
             problem = DnaOptimizationProblem.from_record(dna_sequence)
             for spec in problem.constraints + problem.objectives:
@@ -194,58 +499,144 @@ class PartDomesticator:
 
         if (not is_cds) and (not edit):
             constraints.append(AvoidChanges())
-        problem = DnaOptimizationProblem(
+        return DnaOptimizationProblem(
             extended_sequence,
             constraints=constraints,
             objectives=objectives,
             logger=self.logger,
         )
-        all_constraints_pass = problem.all_constraints_pass()
-        no_objectives = (len(problem.objectives) - self.minimize_edits) == 0
-        report_data = None
-        optimization_successful = True
-        message = ""
-        # print (all_constraints_pass, no_objectives)
-        if not (all_constraints_pass and no_objectives):
-            problem.n_mutations = self.simultaneous_mutations
 
-            if report_target is not None:
-                (success, message, report_data) = problem.optimize_with_report(
-                    target=report_target, project_name=self.name
-                )
-                optimization_successful = success
-            else:
-                report_data = None
-                try:
-                    problem.resolve_constraints()
-                    problem.optimize()
-                except Exception as err:
-                    message = str(err)
-                    optimization_successful = False
-                    report_data = None
-        final_record = problem.to_record(
-            with_original_features=True,
-            with_original_spec_features=False,
-            with_constraints=False,
-            with_objectives=False,
-        )
-        edits_record = problem.to_record(
-            with_original_features=True,
-            with_original_spec_features=False,
-            with_constraints=False,
-            with_objectives=False,
-            with_sequence_edits=True,
-        )
-        if final_record_target is not None:
-            SeqIO.write(final_record, final_record_target, "genbank")
+    def problem_template(
+        self,
+        is_cds="default",
+        codon_optimization=None,
+        extra_constraints=(),
+        extra_objectives=(),
+        edit=False,
+    ):
+        """Return a ProblemTemplate to create domestication problems quickly.
+
+        Templates without extra specifications are memoized, so that all the
+        sequences domesticated with the same parameters share a template.
+        """
+        if is_cds == "default":
+            is_cds = self.cds_by_default
+        if len(extra_constraints) or len(extra_objectives):
+            return ProblemTemplate(
+                self,
+                is_cds=is_cds,
+                codon_optimization=codon_optimization,
+                extra_constraints=extra_constraints,
+                extra_objectives=extra_objectives,
+                edit=edit,
+            )
+        if "_templates" not in self.__dict__:
+            self._templates = {}
+        key = (bool(is_cds), codon_optimization, bool(edit))
+        if key not in self._templates:
+            self._templates[key] = ProblemTemplate(
+                self, is_cds=key[0], codon_optimization=key[1], edit=key[2]
+            )
+        return self._templates[key]
 
+    def count_breaches(self, sequence, sites=None):
+        """Return the number of breaches of the domesticator's constraints in
+        the sequence, if it can be computed without creating an optimization
+        problem, else None.
+
+        The generic domesticator can't tell and always returns None, subclasses
+        can implement fast checks (possibly using the precomputed enzyme
+        ``sites`` of the sequence, see ``StandardDomesticatorsSet``).
+        """
+        return None
+
+    def sequence_satisfies_constraints(self, sequence, sites=None):
+        """Return True if the sequence is known to satisfy all the
+        domesticator's constraints, without creating an optimization problem.
+
+        This enables a fast path for parts which need no edits, see
+        ``count_breaches``.
+        """
+        return self.count_breaches(sequence, sites=sites) == 0
+
+    def _can_skip_optimization(
+        self,
+        dna_sequence,
+        protein_sequence,
+        is_cds,
+        codon_optimization,
+        extra_constraints,
+        extra_objectives,
+    ):
+        """Return True if the sequence needs no optimization at all.
+
+        This is the case when the only specifications are the domesticator's
+        constraints, which the sequence already satisfies.
+        """
+        if (
+            (not self.prescreen_sequences)
+            or (protein_sequence is not None)
+            or codon_optimization
+            or len(extra_constraints)
+            or len(extra_objectives)
+            or len(self.objectives)
+        ):
+            return False
+        if isinstance(dna_sequence, SeqRecord):
+            if has_specification_features(dna_sequence):
+                return False
+            sequence = str(dna_sequence.seq).upper()
+        else:
+            sequence = dna_sequence.upper()
+        if is_cds and (len(sequence) % 3 != 0):
+            return False  # let DnaChisel raise the error on the CDS location
+        if not set(sequence) <= set("ATGC"):
+            return False
+        return self.sequence_satisfies_constraints(sequence)
+
+    def _domesticate_without_optimization(self, dna_sequence):
+        """Return the result of domesticating a sequence needing no edits.
+
+        The records and message are the same as DnaChisel would produce
+        without edits (no optimization is run, so the message is empty).
+        """
+        extended_sequence = self.problem_template().build_record(dna_sequence)
+        # Upper case, as DnaChisel problems (hence the full path's results).
+        sequence = str(extended_sequence.seq).upper()
+        features = [
+            f
+            for f in extended_sequence.features
+            if not find_specification_label_in_feature(f)
+        ]
         return DomesticationResult(
-            problem.sequence_before,
-            final_record,
-            edits_record,
-            report_data,
-            optimization_successful,
-            message,
+            sequence, sequence, None, None, True, "", features=features
+        )
+
+    def __getstate__(self):
+        # Templates are recomputed on demand rather than pickled.
+        state = dict(self.__dict__)
+        state.pop("_templates", None)
+        return state
+
+    def cache_fingerprint(self):
+        """Return a string representing the domesticator's configuration.
+
+        The name is included, as it is written in the optimization reports.
+        """
+        return "%s(%s)" % (
+            self.__class__.__name__,
+            fingerprint(
+                [
+                    self.name,
+                    self.left_flank,
+                    self.right_flank,
+                    self.constraints,
+                    self.objectives,
+                    self.cds_by_default,
+                    self.simultaneous_mutations,
+                    self.minimize_edits,
+                ]
+            ),
         )
 
     def details_list(self):
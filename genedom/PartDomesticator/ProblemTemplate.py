@@ -0,0 +1,222 @@
+"""Defines ProblemTemplate, to create many domestication problems quickly."""
+
+from Bio.Seq import Seq
+from Bio.SeqFeature import SeqFeature
+from Bio.SeqRecord import SeqRecord
+
+from dnachisel import (
+    DnaOptimizationProblem,
+    EnforceTranslation,
+    CodonOptimize,
+    Location,
+    AvoidChanges,
+)
+from dnachisel.MutationSpace import MutationSpace, MutationChoice
+
+VARIANTS = {"A": "ATGC", "T": "TACG", "G": "GCAT", "C": "CGTA"}
+
+# Mutation spaces are built faster by setting their attributes directly, when
+# these are the attributes set by MutationSpace's constructor (DnaChisel 3.2).
+# Other versions of DnaChisel use the constructor.
+_MUTATION_SPACE_ATTRIBUTES = [
+    "choices_index",
+    "choices_list",
+    "determined_segments",
+    "multichoices",
+    "unsolvable_segments",
+]
+_FAST_MUTATION_SPACE = sorted(vars(MutationSpace([]))) == _MUTATION_SPACE_ATTRIBUTES
+
+
+def _shifted_feature(feature, offset):
+    """Return a copy of a Biopython feature, shifted by ``offset``."""
+    return SeqFeature(
+        location=feature.location + offset,
+        type=feature.type,
+        id=feature.id,
+        qualifiers=dict(feature.qualifiers),
+    )
+
+
+class ProblemTemplate:
+    """Precompiled part of a domesticator's problems, stamped per sequence.
+
+    When many sequences are domesticated with a same domesticator and the
+    same parameters, most of the problem creation is identical from one
+    sequence to the next. The template computes once:
+
+    - The sequences and features of the flanks.
+    - The domesticator's constraints and objectives which are not functions
+      of the sequence, and the codon optimization and minimal-edits
+      objectives (functions ``sequence => specification`` are still called
+      for each sequence).
+    - The positions' choices of the mutation space, which are shared by all
+      problems (DnaChisel otherwise creates a new mutation choice for every
+      nucleotide of every problem).
+
+    Use ``domesticator.problem_template(...)`` to get a template (templates
+    are memoized by the domesticator) rather than creating one directly.
+
+    Examples
+    --------
+
+    >>> template = domesticator.problem_template(is_cds=False, edit=True)
+    >>> for sequence in sequences:
+    >>>     problem = template.build_problem(sequence)
+
+    Parameters
+    ----------
+
+    domesticator
+      The PartDomesticator whose problems are created.
+
+    is_cds, codon_optimization, extra_constraints, extra_objectives, edit
+      Same as in ``PartDomesticator.build_problem`` (``is_cds`` must be a
+      boolean, not "default").
+    """
+
+    def __init__(
+        self,
+        domesticator,
+        is_cds=False,
+        codon_optimization=None,
+        extra_constraints=(),
+        extra_objectives=(),
+        edit=False,
+    ):
+        self.domesticator = domesticator
+        self.is_cds = is_cds
+        self.edit = edit
+        left_flank, right_flank = domesticator.left_flank, domesticator.right_flank
+        self.left_sequence = str(left_flank.seq)
+        self.right_sequence = str(right_flank.seq)
+        self.left_features = list(left_flank.features)
+        self.right_features = list(right_flank.features)
+        self.extra_constraints = list(extra_constraints)
+        self.extra_objectives = list(extra_objectives)
+        self.codon_optimization = None
+        if codon_optimization:
+            self.codon_optimization = CodonOptimize(species=codon_optimization)
+        self.avoid_changes = AvoidChanges()
+        self._any_nucleotide_choices = {nucleotide: [] for nucleotide in VARIANTS}
+
+    def build_record(self, dna_sequence):
+        """Return the record of the sequence with the flanks.
+
+        The record is the same as ``left_flank + dna_sequence + right_flank``
+        with the domesticator's flank records.
+        """
+        if isinstance(dna_sequence, SeqRecord):
+            domesticator = self.domesticator
+            return domesticator.left_flank + dna_sequence + domesticator.right_flank
+        sequence = self.left_sequence + dna_sequence + self.right_sequence
+        offset = len(self.left_sequence) + len(dna_sequence)
+        features = [_shifted_feature(f, 0) for f in self.left_features] + [
+            _shifted_feature(f, offset) for f in self.right_features
+        ]
+        return SeqRecord(Seq(sequence), features=features)
+
+    def build_problem(self, dna_sequence, constrain_mutation_space=True):
+        """Return the DnaOptimizationProblem to domesticate the sequence.
+
+        The problem is the same as returned by the domesticator's
+        ``build_problem`` with the template's parameters. If
+        ``constrain_mutation_space`` is False, the mutation space allows any
+        nucleotide at any position (which is faster to create, for problems
+        which are only evaluated, see ``constrain_mutation_space``).
+        """
+        domesticator = self.domesticator
+        constraints = [
+            c(dna_sequence) if hasattr(c, "__call__") else c
+            for c in self.extra_constraints + domesticator.constraints
+        ]
+        start = len(self.left_sequence)
+        location = Location(start, start + len(dna_sequence))
+        if self.is_cds:
+            constraints.append(EnforceTranslation(location=location))
+        objectives = [
+            o(dna_sequence) if hasattr(o, "__call__") else o
+            for o in self.extra_objectives + domesticator.objectives
+        ]
+        if self.codon_optimization is not None:
+            codon_optimization = self.codon_optimization
+            objectives.append(codon_optimization.copy_with_changes(location=location))
+        # Each problem gets its own copies of the template's specifications.
+        if domesticator.minimize_edits:
+            objectives.append(self.avoid_changes.copy_with_changes())
+        if (not self.is_cds) and (not self.edit):
+            constraints.append(self.avoid_changes.copy_with_changes())
+        record = self.build_record(dna_sequence)
+        sequence = str(record.seq).upper()
+        if not set(sequence) <= set(VARIANTS):
+            # Let DnaChisel build (and constrain) the mutation space.
+            return DnaOptimizationProblem(
+                record,
+                constraints=constraints,
+                objectives=objectives,
+                logger=domesticator.logger,
+            )
+        # The mutation space is computed below, after the specifications are
+        # initialized on the problem (which needs a mutation space to skip
+        # DnaChisel's own computation).
+        problem = DnaOptimizationProblem(
+            record,
+            constraints=constraints,
+            objectives=objectives,
+            logger=domesticator.logger,
+            mutation_space=self._unconstrained_mutation_space(sequence),
+        )
+        if constrain_mutation_space:
+            self.constrain_mutation_space(problem)
+        return problem
+
+    @staticmethod
+    def constrain_mutation_space(problem):
+        """Restrict the mutation space of the problem as DnaChisel would, from
+        the nucleotide restrictions of the problem's constraints."""
+        restrictions = [
+            restriction
+            for constraint in problem.constraints
+            for restriction in constraint.restrict_nucleotides(problem.sequence)
+        ]
+        if len(restrictions):
+            problem.mutation_space = MutationSpace.from_optimization_problem(
+                problem, new_constraints=problem.constraints
+            )
+            problem.sequence = problem.mutation_space.constrain_sequence(
+                problem.sequence
+            )
+
+    def _unconstrained_mutation_space(self, sequence):
+        """Return the mutation space allowing any nucleotide at any position.
+
+        The mutation choices of each (position, nucleotide) are created once
+        and shared by all problems (DnaChisel never modifies them, and
+        replaces them when the mutation space is constrained).
+        """
+        choices = self._any_nucleotide_choices
+        for nucleotide, nucleotide_choices in choices.items():
+            for i in range(len(nucleotide_choices), len(sequence)):
+                choice = MutationChoice(
+                    (i, i + 1), variants=VARIANTS[nucleotide], is_any_nucleotide=True
+                )
+                nucleotide_choices.append(choice)
+        choices_index = [choices[n][i] for i, n in enumerate(sequence)]
+        if not _FAST_MUTATION_SPACE:
+            return MutationSpace(choices_index)
+        # Equivalent to MutationSpace(choices_index), without the checks of
+        # each choice (all have 4 variants).
+        mutation_space = MutationSpace.__new__(MutationSpace)
+        mutation_space.choices_index = choices_index
+        mutation_space.choices_list = choices_index
+        mutation_space.unsolvable_segments = []
+        mutation_space.determined_segments = []
+        mutation_space.multichoices = list(choices_index)
+        return mutation_space
+
+    def __repr__(self):
+        return "ProblemTemplate(%s, is_cds=%s, edit=%s)" % (
+            self.domesticator.name,
+            self.is_cds,
+            self.edit,
+        )
@@ -1,2 +1,3 @@
 from .PartDomesticator import PartDomesticator
 from .GoldenGateDomesticator import GoldenGateDomesticator
+from .ProblemTemplate import ProblemTemplate
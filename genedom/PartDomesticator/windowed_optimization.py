@@ -0,0 +1,131 @@
+"""Functions to domesticate long sequences by only optimizing some windows.
+
+For a long part with only a few breaches of the constraints (e.g. two
+enzyme sites in a 10 kb CDS), resolving and optimizing the whole problem
+means evaluating specifications spanning the whole sequence after every
+mutation. Instead, the problem can be optimized in windows around the
+breaches: a small problem is created for each window (with the surrounding
+nucleotides as context), and the results are stitched back in the sequence.
+"""
+
+from dnachisel import AvoidChanges, DnaOptimizationProblem, Location, NoSolutionError
+
+
+def breach_windows(problem, location, padding, codon_frame=False):
+    """Return the windows [(start, end), ...] around the problem's breaches.
+
+    Each breach of the problem's constraints is extended by ``padding``
+    nucleotides on both sides, clipped to the ``location`` (the part of the
+    sequence which can be edited) and, if ``codon_frame`` is True, extended
+    to full codons of the location. Overlapping windows are merged.
+
+    Returns None if a breach has no location (e.g. a global GC content
+    constraint), in which case the problem can't be optimized in windows.
+    """
+    breaches = []
+    for evaluation in problem.constraints_evaluations().filter("failing"):
+        if not len(evaluation.locations):
+            return None
+        breaches += evaluation.locations
+    windows = []
+    for breach in sorted(breaches, key=lambda breach: breach.start):
+        start = max(location.start, breach.start - padding)
+        end = min(location.end, breach.end + padding)
+        if codon_frame:
+            start = location.start + 3 * ((start - location.start) // 3)
+            end = min(location.end, location.start + 3 * -((location.start - end) // 3))
+        if start >= end:
+            continue
+        if len(windows) and (start <= windows[-1][1]):
+            windows[-1] = (windows[-1][0], max(end, windows[-1][1]))
+        else:
+            windows.append((start, end))
+    return windows
+
+
+def _window_problem(problem, start, end, margin):
+    """Return (local_problem, context_start, context_end) for one window.
+
+    The local problem's sequence is the window plus ``margin`` nucleotides of
+    context on each side (which can't be changed), and its specifications are
+    the problem's specifications localized on the window. Returns None if a
+    specification can't be localized within the context.
+    """
+    sequence = problem.sequence
+    context_start = max(0, start - margin)
+    context_end = min(len(sequence), end + margin)
+    window = Location(start, end)
+    specifications = []
+    for problem_specifications in [problem.constraints, problem.objectives]:
+        localized = []
+        for specification in problem_specifications:
+            specification = specification.localized(window, problem=problem)
+            if specification is None:
+                continue
+            location = specification.location
+            if (
+                (location is None)
+                or (getattr(specification, "indices", None) is not None)
+                or (location.start < context_start)
+                or (location.end > context_end)
+            ):
+                return None
+            localized.append(specification.shifted(-context_start))
+        specifications.append(localized)
+    constraints, objectives = specifications
+    for frozen_start, frozen_end in [(context_start, start), (end, context_end)]:
+        if frozen_end > frozen_start:
+            location = Location(frozen_start, frozen_end) + (-context_start)
+            constraints.append(AvoidChanges(location=location))
+    local_problem = DnaOptimizationProblem(
+        sequence[context_start:context_end],
+        constraints=constraints,
+        objectives=objectives,
+        logger=problem.logger,
+    )
+    for parameter in [
+        "randomization_threshold",
+        "max_random_iters",
+        "optimization_stagnation_tolerance",
+        "mutations_per_iteration",
+        "n_mutations",  # set by the domesticator (simultaneous_mutations)
+    ]:
+        if hasattr(problem, parameter):
+            setattr(local_problem, parameter, getattr(problem, parameter))
+    return local_problem, context_start, context_end
+
+
+def optimize_in_windows(problem, windows, margin):
+    """Resolve the constraints and optimize the objectives in windows only.
+
+    Each window is optimized as a separate, small problem (see
+    ``_window_problem``) and its sequence is written back into the problem's
+    sequence. Finally, all the constraints are checked once on the whole
+    sequence.
+
+    Returns True if the optimization succeeded. Else (a window could not be
+    solved or localized, or the final check failed) the problem's sequence
+    is left unchanged and False is returned, so that the problem can be
+    optimized as a whole instead.
+    """
+    original_sequence = problem.sequence
+    for start, end in windows:
+        window_problem = _window_problem(problem, start, end, margin)
+        if window_problem is None:
+            problem.sequence = original_sequence
+            return False
+        local_problem, context_start, context_end = window_problem
+        try:
+            local_problem.resolve_constraints()
+        except NoSolutionError:
+            problem.sequence = original_sequence
+            return False
+        local_problem.optimize()
+        sequence = problem.sequence
+        problem.sequence = (
+            sequence[:context_start] + local_problem.sequence + sequence[context_end:]
+        )
+    if not problem.all_constraints_pass():
+        problem.sequence = original_sequence
+        return False
+    return True
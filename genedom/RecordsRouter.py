@@ -0,0 +1,290 @@
+"""Defines RecordsRouter, and the rules attributing domesticators to records.
+
+A rule gives "keys" for each record (e.g. the prefix of the record's ID, the
+labels of its features) and the table ``{key: slot_name}`` of the keys it
+recognizes for a given set of domesticators. The tables of all the rules of a
+router are compiled into a single dictionary, so that routing a record only
+takes a few dictionary lookups, whatever the number of slots.
+"""
+
+from abc import ABC, abstractmethod
+import re
+
+
+class UnroutableRecordsError(KeyError):
+    """Raised when some records can't be attributed a domesticator.
+
+    The IDs of all the unroutable records are listed in ``record_ids``.
+    """
+
+    def __init__(self, record_ids):
+        self.record_ids = list(record_ids)
+        KeyError.__init__(self, self.record_ids)
+
+    def __str__(self):
+        ids = self.record_ids
+        return "No domesticator found for %d record(s): %s%s" % (
+            len(ids),
+            ", ".join(ids[:10]),
+            ", ..." if len(ids) > 10 else "",
+        )
+
+
+class RoutingRule(ABC):
+    """Base class for the rules of a RecordsRouter.
+
+    Subclasses implement ``compile`` and ``record_keys``: a record is routed
+    to the slot of its first key found in the compiled table.
+    """
+
+    @abstractmethod
+    def compile(self, domesticators):
+        """Return a dictionary ``{key: slot_name}`` for the domesticators.
+
+        ``domesticators`` is the router's dictionary ``{slot_name:
+        domesticator}``.
+        """
+
+    @abstractmethod
+    def record_keys(self, record):
+        """Return the keys of the record, in order of priority."""
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+
+class IdPrefixRule(RoutingRule):
+    """Route records by the prefix of their ID, e.g. "p7_gfp" to slot "p7".
+
+    Parameters
+    ----------
+
+    separator
+      The prefix is the part of the record ID before the first separator.
+
+    aliases
+      Dictionary ``{prefix: slot_name}`` of prefixes other than the slot
+      names (which are always recognized).
+    """
+
+    def __init__(self, separator="_", aliases=None):
+        self.separator = separator
+        self.aliases = {} if aliases is None else dict(aliases)
+
+    def compile(self, domesticators):
+        table = {slot: slot for slot in domesticators}
+        table.update(self.aliases)
+        return table
+
+    def record_keys(self, record):
+        return [record.id.split(self.separator)[0]]
+
+
+class RegexRule(RoutingRule):
+    """Route records whose ID (or name, or description) matches a regex.
+
+    All the expressions are compiled into a single regular expression, so
+    that each record is matched only once. As with ``re.match``, expressions
+    match at the start of the field (use ".*" to match anywhere). When
+    several expressions match, the first one in ``patterns`` wins.
+
+    Parameters
+    ----------
+
+    patterns
+      Dictionary (or list of pairs) ``{regular_expression: slot_name}``.
+
+    field
+      Attribute of the records which is matched: "id", "name" or
+      "description".
+    """
+
+    def __init__(self, patterns, field="id"):
+        if hasattr(patterns, "items"):
+            patterns = list(patterns.items())
+        self.patterns = list(patterns)
+        self.field = field
+        alternatives = "|".join(
+            ["(?P<_route_%d>%s)" % (i, regex) for i, (regex, _) in enumerate(patterns)]
+        )
+        self.expression = re.compile(alternatives)
+        self._groups = [
+            (self.expression.groupindex["_route_%d" % i], slot)
+            for i, (_, slot) in enumerate(self.patterns)
+        ]
+
+    def compile(self, domesticators):
+        return {slot: slot for _, slot in self.patterns}
+
+    def record_keys(self, record):
+        if not len(self.patterns):
+            return []
+        match = self.expression.match(getattr(record, self.field))
+        if match is None:
+            return []
+        for group, slot in self._groups:
+            if match.start(group) != -1:
+                return [slot]
+        return []
+
+
+class FeatureRule(RoutingRule):
+    """Route records by a qualifier of their features (by default, labels).
+
+    Parameters
+    ----------
+
+    qualifier
+      Name of the qualifier whose values are looked up, e.g. "label" or
+      "note".
+
+    feature_type
+      If provided, only features of this type are considered (e.g.
+      "misc_feature").
+
+    mapping
+      Dictionary ``{qualifier_value: slot_name}`` of the recognized values,
+      in addition to the slot names (which are always recognized).
+    """
+
+    def __init__(self, qualifier="label", feature_type=None, mapping=None):
+        self.qualifier = qualifier
+        self.feature_type = feature_type
+        self.mapping = {} if mapping is None else dict(mapping)
+
+    def compile(self, domesticators):
+        table = {slot: slot for slot in domesticators}
+        table.update(self.mapping)
+        return table
+
+    def record_keys(self, record):
+        keys = []
+        for feature in record.features:
+            if (self.feature_type is not None) and (feature.type != self.feature_type):
+                continue
+            values = feature.qualifiers.get(self.qualifier, [])
+            if isinstance(values, str):
+                values = [values]
+            keys.extend([str(value) for value in values])
+        return keys
+
+
+class OverhangsRule(RoutingRule):
+    """Route records whose sequence already ends with a slot's overhangs.
+
+    A record is routed to the domesticator whose left overhang starts the
+    sequence and whose right overhang ends it (e.g. parts ordered or designed
+    with their overhangs). Only domesticators with ``left_overhang`` and
+    ``right_overhang`` attributes (Golden Gate domesticators) are considered.
+
+    Parameters
+    ----------
+
+    overhang_size
+      Size of the overhangs (4 for all builtin standards).
+    """
+
+    def __init__(self, overhang_size=4):
+        self.overhang_size = overhang_size
+
+    def compile(self, domesticators):
+        table = {}
+        for slot, domesticator in domesticators.items():
+            left = getattr(domesticator, "left_overhang", None)
+            right = getattr(domesticator, "right_overhang", None)
+            if (left is None) or (right is None):
+                continue
+            table.setdefault((str(left).upper(), str(right).upper()), slot)
+        return table
+
+    def record_keys(self, record):
+        sequence = str(record.seq).upper()
+        if len(sequence) < 2 * self.overhang_size:
+            return []
+        return [(sequence[: self.overhang_size], sequence[-self.overhang_size :])]
+
+
+class RecordsRouter:
+    """Attribute one of a set of domesticators to each record, with rules.
+
+    The rules are tried in order, and a record is routed with the first rule
+    giving it a known key. The rules' tables are compiled once into a single
+    dictionary ``{(rule_index, key): domesticator}``.
+
+    Examples
+    --------
+
+    >>> router = RecordsRouter(standard.domesticators, rules=[
+    >>>     IdPrefixRule(),
+    >>>     RegexRule({".*promoter": "p1", ".*terminator": "p9"}),
+    >>>     FeatureRule(qualifier="label"),
+    >>>     OverhangsRule(),
+    >>> ])
+    >>> domesticators = router.route(records)  # raises if some are unroutable
+
+    Parameters
+    ----------
+
+    domesticators
+      Dictionary ``{slot_name: domesticator}``.
+
+    rules
+      List of rules, instances of RoutingRule subclasses. The rules are
+      checked when compiled: a rule routing to an unknown slot raises a
+      ValueError.
+    """
+
+    def __init__(self, domesticators, rules=(IdPrefixRule(),)):
+        self.domesticators = domesticators
+        self.rules = list(rules)
+        self.table = {}
+        for i, rule in enumerate(self.rules):
+            for key, slot in rule.compile(domesticators).items():
+                if slot not in domesticators:
+                    raise ValueError(
+                        "%s routes records to unknown slot %s" % (rule, slot)
+                    )
+                self.table.setdefault((i, key), domesticators[slot])
+
+    def route_record(self, record):
+        """Return the domesticator of the record, or None if unroutable."""
+        table = self.table
+        for i, rule in enumerate(self.rules):
+            for key in rule.record_keys(record):
+                domesticator = table.get((i, key), None)
+                if domesticator is not None:
+                    return domesticator
+        return None
+
+    def route(self, records, unroutable="raise"):
+        """Return the list of the domesticators of the records.
+
+        All records are routed in a single pass, so that unroutable records
+        are reported at once, before any record is domesticated.
+
+        Parameters
+        ----------
+
+        records
+          List of Biopython records.
+
+        unroutable
+          If "raise", an UnroutableRecordsError listing all the unroutable
+          records is raised if any. If "none", the unroutable records'
+          domesticators are None in the returned list.
+        """
+        if unroutable not in ("raise", "none"):
+            raise ValueError("Unknown unroutable option: %s" % unroutable)
+        domesticators = [self.route_record(record) for record in records]
+        if unroutable == "raise":
+            unroutable_ids = [
+                record.id
+                for record, domesticator in zip(records, domesticators)
+                if domesticator is None
+            ]
+            if len(unroutable_ids):
+                raise UnroutableRecordsError(unroutable_ids)
+        return domesticators
+
+    def __repr__(self):
+        return "RecordsRouter(%s)" % ", ".join([str(rule) for rule in self.rules])
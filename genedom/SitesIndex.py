@@ -0,0 +1,171 @@
+"""Defines SitesIndex, to quickly find enzyme sites in sequences, and
+SitesPattern, to avoid all these sites with a single DnaChisel constraint."""
+
+from bisect import bisect_right
+import re
+
+from Bio.Restriction.Restriction_Dictionary import rest_dict
+from Bio.Seq import reverse_complement
+from dnachisel import SequencePattern
+from dnachisel.biotools import NUCLEOTIDE_TO_REGEXPR
+
+
+class SitesIndex:
+    """Precompiled matcher finding the sites of several enzymes at once.
+
+    All sites, and their reverse-complements, are compiled into a single
+    regular expression, so that a sequence is scanned in a single pass
+    whatever the number of enzymes. Sites with degenerate nucleotides (N, W,
+    etc.) are supported.
+
+    Examples
+    --------
+
+    >>> index = SitesIndex(["BsmBI", "BsaI"])
+    >>> index.has_sites("ATGCGTCTCA")  # True
+    >>> index.find_sites("ATGCGTCTCA")  # [("BsmBI", 3, 1)]
+    >>> index.find_sites_in_sequences(["ATGCGTCTCA", "GGTCTCT"])
+
+    The same index can be shared by domesticators avoiding different subsets
+    of its enzymes, see the ``enzymes`` parameter of ``has_sites``.
+
+    Parameters
+    ----------
+
+    enzymes
+      List of enzyme names, as in Biopython's ``Bio.Restriction``.
+    """
+
+    def __init__(self, enzymes):
+        self.enzymes = list(dict.fromkeys(enzymes))
+        self.sites = {enzyme: rest_dict[enzyme]["site"] for enzyme in self.enzymes}
+        self.variants = []  # (enzyme, strand, compiled_expression)
+        for enzyme, site in self.sites.items():
+            strands = [(1, site)]
+            if reverse_complement(site) != site:
+                strands.append((-1, reverse_complement(site)))
+            for strand, variant in strands:
+                expression = "".join([NUCLEOTIDE_TO_REGEXPR[n] for n in variant])
+                self.variants.append((enzyme, strand, re.compile(expression)))
+        alternatives = "|".join([e.pattern for (_, _, e) in self.variants])
+        # The lookahead enables to find overlapping sites.
+        self.expression = re.compile("(?=(?:%s))" % alternatives)
+        self.max_site_length = max([len(s) for s in self.sites.values()] + [0])
+
+    def has_sites(self, sequence, enzymes=None):
+        """Return True if any site is found in the sequence (either strand).
+
+        If a list of ``enzymes`` is provided, only sites from these enzymes
+        are considered.
+        """
+        if not len(self.variants):
+            return False
+        sequence = sequence.upper()
+        if self.expression.search(sequence) is None:
+            return False
+        if (enzymes is None) or set(self.enzymes) <= set(enzymes):
+            return True
+        return any([site[0] in enzymes for site in self.find_sites(sequence)])
+
+    def find_sites(self, sequence):
+        """Return a list [(enzyme, start, strand), ...] of all the sites found.
+
+        The start is the position of the site's first nucleotide, on the
+        forward strand, and the strand is -1 for sites found on the reverse
+        strand (for palindromic sites, the strand is always 1).
+        """
+        if not len(self.variants):
+            return []
+        sequence = sequence.upper()
+        sites = []
+        for match in self.expression.finditer(sequence):
+            start = match.start()
+            # Several sites can start at the same position: test them all.
+            for enzyme, strand, expression in self.variants:
+                if expression.match(sequence, start):
+                    sites.append((enzyme, start, strand))
+        return sites
+
+    def find_sites_in_sequences(self, sequences):
+        """Return the sites found in each sequence, in a single scan.
+
+        The sequences are concatenated (with separators) and scanned at once,
+        which is much faster than separate scans for many short sequences.
+        Records can be provided instead of sequences.
+
+        Returns
+        -------
+
+        sites
+          A list ``[sites_1, sites_2, ...]`` where ``sites_i`` is the list of
+          the sites found in the i-th sequence, as in ``find_sites``.
+        """
+        sequences = [str(getattr(s, "seq", s)).upper() for s in sequences]
+        starts = []
+        position = 0
+        for sequence in sequences:
+            starts.append(position)
+            position += len(sequence) + 1
+        concatenation = "|".join(sequences)  # no site matches a "|"
+        results = [[] for sequence in sequences]
+        if not len(self.variants):
+            return results
+        for match in self.expression.finditer(concatenation):
+            position = match.start()
+            i = bisect_right(starts, position) - 1
+            for enzyme, strand, expression in self.variants:
+                if expression.match(concatenation, position):
+                    results[i].append((enzyme, position - starts[i], strand))
+        return results
+
+    def cache_fingerprint(self):
+        """Return a string representing the index's enzymes, for cache keys."""
+        return "SitesIndex(%s)" % ", ".join(sorted(self.enzymes))
+
+    def __repr__(self):
+        return "SitesIndex(%s)" % ", ".join(self.enzymes)
+
+
+class SitesPattern(SequencePattern):
+    """DnaChisel pattern matching the sites of all the enzymes of an index.
+
+    ``AvoidPattern(SitesPattern(index))`` is equivalent to one
+    ``AvoidPattern(EnzymeSitePattern(enzyme))`` per enzyme of the index, but
+    the sequence is scanned only once (with the index's combined expression)
+    at each evaluation, whatever the number of enzymes. The sites are always
+    searched on both strands.
+
+    Parameters
+    ----------
+
+    sites_index
+      A SitesIndex of the enzymes whose sites should be matched.
+    """
+
+    def __init__(self, sites_index):
+        self.sites_index = sites_index
+        SequencePattern.__init__(
+            self,
+            sites_index.expression.pattern,
+            size=sites_index.max_site_length,
+            name="+".join(sites_index.enzymes),
+            is_palyndromic=True,  # the index already covers both strands.
+        )
+
+    def find_matches_in_string(self, sequence):
+        sites = self.sites_index.sites
+        return [
+            (start, start + len(sites[enzyme]), strand)
+            for (enzyme, start, strand) in self.sites_index.find_sites(sequence)
+        ]
+
+    def __str__(self):
+        sites = self.sites_index.sites.items()
+        return "+".join(["%s(%s)" % (enzyme, site) for enzyme, site in sites])
+
+    def cache_fingerprint(self):
+        """Return a string representing the pattern's enzymes, for cache keys."""
+        return "SitesPattern(%s)" % self.sites_index.cache_fingerprint()
+
+    def __repr__(self):
+        return "SitesPattern(%s)" % ", ".join(self.sites_index.enzymes)
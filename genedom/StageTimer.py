@@ -0,0 +1,61 @@
+"""Defines StageTimer, to measure the time spent in each stage of a task."""
+
+from contextlib import contextmanager
+import time
+
+
+class StageTimer:
+    """Record the wall and CPU times spent in the different stages of a task.
+
+    Examples
+    --------
+
+    >>> timer = StageTimer()
+    >>> with timer.stage("optimize"):
+    >>>     problem.optimize()
+    >>> print(timer.timings)  # {"optimize": (wall_time, cpu_time)}
+
+    Parameters
+    ----------
+
+    hook
+      Optional function ``hook(record_id, stage, wall_time, cpu_time)``
+      called at the end of each stage (for instance to forward the timings to
+      some metrics system). Times are in seconds.
+
+    record_id
+      ID of the record being processed, passed to the hook.
+
+    Attributes
+    ----------
+
+    timings
+      Dictionary ``{stage: (wall_time, cpu_time)}``, in seconds. The times of
+      a stage entered several times are summed.
+    """
+
+    def __init__(self, hook=None, record_id=None):
+        self.hook = hook
+        self.record_id = record_id
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Context manager measuring the times spent in a stage."""
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - wall_start
+            cpu_time = time.process_time() - cpu_start
+            self.add(name, wall_time, cpu_time)
+
+    def add(self, name, wall_time, cpu_time):
+        """Add times measured elsewhere to a stage."""
+        previous_wall_time, previous_cpu_time = self.timings.get(name, (0, 0))
+        self.timings[name] = (
+            previous_wall_time + wall_time,
+            previous_cpu_time + cpu_time,
+        )
+        if self.hook is not None:
+            self.hook(self.record_id, name, wall_time, cpu_time)
@@ -1,6 +1,42 @@
+from .OverhangsCompatibility import OverhangsCompatibility
+from .RecordsRouter import IdPrefixRule, RecordsRouter, UnroutableRecordsError
+from .SitesIndex import SitesIndex
+
+
 class StandardDomesticatorsSet:
-    def __init__(self, domesticators):
+    """Set of domesticators, one per slot of an assembly standard.
+
+    The enzyme sites avoided by the different domesticators are compiled once
+    into a ``sites_index`` shared by all domesticators of the set, which is
+    also used to find sites in whole batches of sequences at once.
+
+    Records are attributed a domesticator by a RecordsRouter, whose rules
+    can be changed with ``set_routing_rules``. By default, records are routed
+    by the prefix of their ID ("p7_gfp" is domesticated by slot "p7").
+
+    Parameters
+    ----------
+
+    domesticators
+      Dictionary ``{slot_name: domesticator}``.
+
+    routing_rules
+      List of routing rules (IdPrefixRule, RegexRule, FeatureRule,
+      OverhangsRule...), see RecordsRouter. Default is ``[IdPrefixRule()]``.
+    """
+
+    def __init__(self, domesticators, routing_rules=None):
         self.domesticators = domesticators
+        self.set_routing_rules(routing_rules)
+        enzymes = [
+            enzyme
+            for domesticator in domesticators.values()
+            for enzyme in getattr(domesticator, "avoided_enzymes", ())
+        ]
+        self.sites_index = SitesIndex(enzymes)
+        for domesticator in domesticators.values():
+            if hasattr(domesticator, "sites_index"):
+                domesticator.sites_index = self.sites_index
 
     def list_overhangs(self):
         domesticators = list(self.domesticators.values())
@@ -11,5 +47,68 @@ class StandardDomesticatorsSet:
                     overhangs.append(o)
         return overhangs
 
+    def evaluate_overhangs(self, compatibility=None, min_mismatches=2):
+        """Return a summary of the possible cross-ligations of the overhangs.
+
+        See ``OverhangsCompatibility.evaluate`` for the summary. Provide an
+        OverhangsCompatibility with ligation frequencies (it is faster to
+        create it once for many standards) to also get the set's fidelity.
+        """
+        if compatibility is None:
+            compatibility = OverhangsCompatibility()
+        return compatibility.evaluate(
+            self.list_overhangs(), min_mismatches=min_mismatches
+        )
+
+    def set_routing_rules(self, routing_rules=None):
+        """Set (and compile) the rules attributing domesticators to records.
+
+        See RecordsRouter for the ``routing_rules``, which default to
+        ``[IdPrefixRule()]``.
+        """
+        if routing_rules is None:
+            routing_rules = [IdPrefixRule()]
+        self.router = RecordsRouter(self.domesticators, routing_rules)
+
     def record_to_domesticator(self, record):
-        return self.domesticators[record.id.split("_")[0]]
+        """Return the domesticator of the record, according to the routing
+        rules. Raises an UnroutableRecordsError (a KeyError) if none."""
+        domesticator = self.router.route_record(record)
+        if domesticator is None:
+            raise UnroutableRecordsError([record.id])
+        return domesticator
+
+    def route(self, records, unroutable="raise"):
+        """Return the list of the domesticators of the records.
+
+        All records are routed in a single pass. If some records are
+        unroutable, an UnroutableRecordsError listing all of them is raised
+        (or, with ``unroutable="none"``, their domesticator is None).
+        """
+        return self.router.route(records, unroutable=unroutable)
+
+    def find_sites(self, sequences):
+        """Return the sites of the standard's enzymes in each sequence.
+
+        Returns a list ``[sites_1, sites_2...]`` where ``sites_i`` is a list
+        ``[(enzyme, start, strand), ...]`` of the sites found in the i-th
+        sequence (or record). All sequences are scanned in a single pass.
+        """
+        return self.sites_index.find_sites_in_sequences(sequences)
+
+    def prescreen(self, records):
+        """Return, for each record, whether it needs no edits at all.
+
+        Each record is attributed a domesticator, and is considered as not
+        needing edits if it has no site from the domesticator's avoided
+        enzymes (and the domesticator has no custom constraints).
+        """
+        sites = self.find_sites(records)
+        return [
+            domesticator.sequence_satisfies_constraints(
+                str(record.seq), sites=record_sites
+            )
+            for record, domesticator, record_sites in zip(
+                records, self.route(records), sites
+            )
+        ]
@@ -1,12 +1,71 @@
 """ geneblocks/__init__.py """
 
-# __all__ = []
+import importlib
+
+# The objects below are imported from their module when first used, so that
+# "import genedom" doesn't parse the builtin standards' spreadsheets or import
+# asyncio. Only modules whose name differs from the object's are lazy, as
+# importing a submodule sets it as an attribute of the package, which would
+# then hide the object of the same name.
+_LAZY_OBJECTS = {
+    "BUILTIN_STANDARDS": "builtin_standards",
+    "bulk_load_records": "records_loader",
+    "abatch_domestication": "async_domestication",
+}
 
 from .PartDomesticator import PartDomesticator, GoldenGateDomesticator
 from .reports import write_pdf_domestication_report
-from .builtin_standards import BUILTIN_STANDARDS
-from .batch_domestication import batch_domestication
+from .batch_domestication import batch_domestication, iter_batch_domestication
+from .triage_batch import triage_batch
 from .biotools import (load_record, load_records, write_record,
                        random_dna_sequence)
 from .BarcodesCollection import BarcodesCollection
+from .KmerIndex import KmerIndex
+from .OverhangsCompatibility import OverhangsCompatibility
+from .results_table import read_results_tables
+from .DomesticationCache import DomesticationCache
+from .DeferredReport import DeferredReport
+from .DomesticationResult import DomesticationResult
+from .RecordsRouter import (RecordsRouter, UnroutableRecordsError, IdPrefixRule,
+                            RegexRule, FeatureRule, OverhangsRule)
 from .version import __version__
+
+__all__ = [
+    "PartDomesticator",
+    "GoldenGateDomesticator",
+    "write_pdf_domestication_report",
+    "batch_domestication",
+    "iter_batch_domestication",
+    "triage_batch",
+    "load_record",
+    "load_records",
+    "write_record",
+    "random_dna_sequence",
+    "BarcodesCollection",
+    "KmerIndex",
+    "OverhangsCompatibility",
+    "read_results_tables",
+    "DomesticationCache",
+    "DeferredReport",
+    "DomesticationResult",
+    "RecordsRouter",
+    "UnroutableRecordsError",
+    "IdPrefixRule",
+    "RegexRule",
+    "FeatureRule",
+    "OverhangsRule",
+    "__version__",
+] + list(_LAZY_OBJECTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_OBJECTS:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    module = importlib.import_module("." + _LAZY_OBJECTS[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_OBJECTS))
@@ -0,0 +1,147 @@
+"""Asyncio entry points for batch domestications (e.g. for web services)."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from .batch_domestication import (
+    _iter_batch_domestication,
+    _open_target,
+    _route_records,
+)
+
+
+async def abatch_domestication(records, target, executor=None, n_jobs=1, **parameters):
+    """Domesticate a batch of parts, without blocking the asyncio event loop.
+
+    This is an asynchronous version of ``batch_domestication``: the batch
+    runs in a thread of its own, not in the event loop's default executor
+    (and the records' domestications in the executor, if any), and the
+    progress of the batch is streamed as an async iterator of events
+    (instead of a progress bar), one per domesticated record, then a last
+    "finished" event.
+
+    Examples
+    --------
+
+    >>> executor = ProcessPoolExecutor(max_workers=8)  # shared by requests
+    >>> events = abatch_domestication(records, "@memory", executor=executor,
+    >>>                               standard=BUILTIN_STANDARDS.EMMA)
+    >>> async for event in events:
+    >>>     if event["event"] == "domesticated":
+    >>>         print(event["record_id"], event["n_done"], event["n_records"])
+    >>>     else:
+    >>>         zip_data = event["zip_data"]
+
+    Yields
+    ------
+
+    events
+      Dictionaries ``{"event": "domesticated", "record_id": record_id,
+      "results": domestication_results, "n_done": n_done, "n_records":
+      n_records}`` for each record, in the order of the records (n_records
+      is None if ``records`` has no length), then ``{"event": "finished",
+      "n_fails": n_fails, "zip_data": zip_data}`` where zip_data is the data
+      of the zip archive if ``target`` is "@memory" (else None).
+
+    Parameters
+    ----------
+
+    records
+      Iterable of Biopython records to be domesticated.
+
+    target
+      Path to a folder, to a zip file, or "@memory".
+
+    executor
+      A ``concurrent.futures`` executor to which the domestication of the
+      records is submitted. A same executor (e.g. a ProcessPoolExecutor) can
+      be shared by many concurrent batches and ``adomesticate`` calls. If
+      None, the records are domesticated in the batch's thread, or in
+      ``n_jobs`` processes.
+
+    n_jobs, parameters
+      Other parameters of ``batch_domestication`` (except ``logger``).
+
+    The batch only advances as the events are consumed: the next record is
+    written once the previous event has been taken. If the iteration is
+    stopped (the task is cancelled, or the iterator is closed), no new
+    record is written, the records submitted to the executor but not
+    started are cancelled, and the target is closed (a zip target then has
+    the records of the events consumed so far, but no report).
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    stop = threading.Event()
+    # Released each time an event is requested (handshake for backpressure).
+    demand = threading.Semaphore(0)
+    n_records = len(records) if hasattr(records, "__len__") else None
+
+    def send(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def run_batch():
+        try:
+            records_domesticators = _route_records(
+                records,
+                parameters.pop("domesticator", None),
+                parameters.pop("standard", None),
+            )
+            root = _open_target(target, parameters.get("resume", False))
+            n_fails = 0
+            batch = _iter_batch_domestication(
+                records_domesticators,
+                root,
+                executor=executor,
+                n_jobs=n_jobs,
+                logger=None,
+                **parameters
+            )
+            try:
+                n_done = 0
+                while True:
+                    demand.acquire()
+                    if stop.is_set():
+                        return
+                    try:
+                        record_id, results = next(batch)
+                    except StopIteration:
+                        break
+                    n_done += 1
+                    n_fails += not results.success
+                    send(
+                        dict(
+                            event="domesticated",
+                            record_id=record_id,
+                            results=results,
+                            n_done=n_done,
+                            n_records=n_records,
+                        )
+                    )
+            finally:
+                batch.close()
+                zip_data = root._close()
+            send(dict(event="finished", n_fails=n_fails, zip_data=zip_data))
+        except Exception as error:
+            send(error)
+
+    # The batch runs for as long as its events are consumed, so it gets its
+    # own thread rather than holding one of the loop's default executor.
+    batch_executor = ThreadPoolExecutor(max_workers=1)
+    batch_thread = loop.run_in_executor(batch_executor, run_batch)
+    try:
+        while True:
+            demand.release()
+            event = await events.get()
+            if isinstance(event, Exception):
+                raise event
+            yield event
+            if event["event"] == "finished":
+                break
+    finally:
+        stop.set()
+        demand.release()  # wakes the batch thread up if it waits for demand.
+        try:
+            await batch_thread
+        finally:
+            batch_executor.shutdown(wait=False)
@@ -1,7 +1,17 @@
-from copy import deepcopy
+from collections import deque
+from copy import copy
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import hashlib
+from io import StringIO
 import itertools
+import json
+import os
+import pickle
+import time
 
 from Bio import SeqIO
+from Bio.SeqRecord import SeqRecord
 import pandas
 import proglog
 
@@ -9,12 +19,17 @@ import flametree
 from sequenticon import sequenticon
 
 from .PartDomesticator import PartDomesticator
+from .DomesticationCache import DomesticationCache
+from .StageTimer import StageTimer
+from .triage_batch import estimate_record_cost
 from .reports import write_pdf_domestication_report
+from .results_table import RESULTS_TABLE_FORMATS, ResultsTableWriter
 from .biotools import (
     sanitize_and_uniquify,
     sequence_to_record,
     annotate_record,
     write_record,
+    write_zip_data,
 )
 
 
@@ -28,6 +43,601 @@ def detect_non_unique_elements(elements):
     return [(e, len(instances)) for e, instances in seen.items() if len(instances) > 1]
 
 
+def _domesticate_record(
+    record,
+    record_domesticator,
+    barcode,
+    report_target,
+    allow_edits,
+    domesticated_suffix,
+    barcode_spacer,
+    include_original_records,
+    cache=None,
+):
+    """Domesticate one record of a batch.
+
+    This function does all the per-record work (domestication, barcoding,
+    Genbank formatting, sequenticons) so that it can be run in a separate
+    process. It returns the domestication results, the row of the report's
+    summary table, and the Genbank contents of the domesticated and original
+    records (the latter is None if ``include_original_records`` is False).
+    """
+    # The record is never modified, so it is not copied.
+    original_id = record.id
+    domesticated_id = record.id + domesticated_suffix
+    if barcode is not None:
+        if not isinstance(barcode, str):
+            barcode_id, barcode = barcode
+            barcode_id = " " + barcode_id
+        else:
+            barcode_id = ""
+        barcode = sequence_to_record(barcode)
+        annotate_record(barcode, label="BARCODE" + barcode_id)
+    domestication_results = record_domesticator.domesticate(
+        record, report_target=report_target, edit=allow_edits, cache=cache
+    )
+    if (report_target == "@deferred") and domestication_results.success:
+        # Only the reports of failures are rendered: the optimized problem
+        # is dropped here, not sent back to the main process.
+        domestication_results.report_data = None
+    if barcode is not None:
+        domestication_results.record_after = (
+            barcode + barcode_spacer + domestication_results.record_after
+        )
+    domestication_results.record_after.original_id = original_id
+    domestication_results.record_after.id = domesticated_id.replace(" ", "_")
+    timer = StageTimer()
+    with timer.stage("genbank_formatting"):
+        domesticated_genbank = StringIO()
+        SeqIO.write(
+            domestication_results.record_after, domesticated_genbank, "genbank"
+        )
+        if include_original_records:
+            original_genbank = StringIO()
+            write_record(record, original_genbank)
+            original_genbank = original_genbank.getvalue()
+        else:
+            original_genbank = None
+    n_edits = domestication_results.number_of_edits()
+    added_bp = len(domestication_results.record_after) - len(record)
+    with timer.stage("sequenticons"):
+        before_seqicon = sequenticon(record, output_format="html_image")
+        if domestication_results.success:
+            after_seqicon = sequenticon(
+                domestication_results.record_after, output_format="html_image"
+            )
+    domestication_results.timings.update(timer.timings)
+    info = {
+        "id": original_id,
+        "Record": before_seqicon + original_id,
+        "Domesticator": record_domesticator.name,
+        "Domesticated Record": ("Failed: " + domestication_results.message)
+        if not domestication_results.success
+        else (after_seqicon + domesticated_id),
+        "Added bp": added_bp,
+        "Edited bp": n_edits,
+    }
+    if barcode is not None:
+        info["Barcode"] = barcode_id
+        info["Barcode sequence"] = str(barcode.seq)
+    return (
+        domestication_results,
+        info,
+        domesticated_genbank.getvalue(),
+        original_genbank,
+    )
+
+
+def _run_task(task):
+    """Return (outcome, (wall_time, cpu_time), cache_counts) for a task.
+
+    The task's cache is used through a copy whose counters start at zero, and
+    ``cache_counts`` is the copy's (hits, misses), so that the counters of the
+    main process's cache can be updated even when the task ran in another
+    process (see ``_count_cache_uses``).
+    """
+    arguments = {k: v for k, v in task.items() if k != "estimated_cost"}
+    cache = arguments.get("cache", None)
+    if cache is not None:
+        cache = arguments["cache"] = copy(cache)
+        cache.hits = cache.misses = 0
+    timer = StageTimer()
+    with timer.stage("total"):
+        outcome = _domesticate_record(**arguments)
+    cache_counts = (0, 0) if cache is None else (cache.hits, cache.misses)
+    return outcome, timer.timings["total"], cache_counts
+
+
+def _count_cache_uses(task, cache_counts):
+    """Add the (hits, misses) of a task's run to the task's cache counters."""
+    cache = task.get("cache", None)
+    if cache is not None:
+        cache.hits += cache_counts[0]
+        cache.misses += cache_counts[1]
+
+
+def _iter_outcomes(tasks, n_jobs=1, executor=None, longest_first=False):
+    """Yield (task, outcome, times) with outcome = _domesticate_record(**task).
+
+    The tasks are computed in the current process, or submitted to an
+    executor (at most a few tasks ahead of the one being yielded, so that
+    ``tasks`` can be a long iterator). Tasks which already have an "outcome"
+    (records domesticated in a previous run) are yielded as they are, with
+    times None (else times is (wall_time, cpu_time) for the whole task).
+
+    If ``longest_first`` is True, all tasks are submitted at once to the
+    executor, by decreasing "estimated_cost", so that the longest tasks don't
+    end up running alone at the end of the batch. The outcomes are still
+    yielded in the order of the tasks.
+    """
+    if (executor is None) and (n_jobs == 1):
+        for task in tasks:
+            if "outcome" in task:
+                yield task, task["outcome"], None
+            else:
+                outcome, times, cache_counts = _run_task(task)
+                _count_cache_uses(task, cache_counts)
+                yield task, outcome, times
+        return
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs)
+    max_workers = getattr(executor, "_max_workers", None) or os.cpu_count()
+
+    def pop_outcome():
+        task, future = pending.popleft()
+        if future is None:
+            return task, task["outcome"], None
+        outcome, times, cache_counts = future.result()
+        _count_cache_uses(task, cache_counts)
+        return task, outcome, times
+
+    pending = deque()
+    try:
+        if longest_first:
+            tasks = list(tasks)
+            futures = {}
+            for i in sorted(
+                range(len(tasks)), key=lambda i: -tasks[i].get("estimated_cost", 0)
+            ):
+                if "outcome" not in tasks[i]:
+                    futures[i] = executor.submit(_run_task, tasks[i])
+            pending = deque([(task, futures.get(i)) for i, task in enumerate(tasks)])
+        else:
+            for task in tasks:
+                if "outcome" in task:
+                    pending.append((task, None))
+                else:
+                    pending.append((task, executor.submit(_run_task, task)))
+                if len(pending) >= 2 * max_workers:
+                    yield pop_outcome()
+        while len(pending):
+            yield pop_outcome()
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+        else:
+            # The batch was interrupted: free the shared executor.
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+
+class _ReportRenderer:
+    """Render deferred optimization reports in a separate process.
+
+    The process is only started when the first report is submitted. Reports
+    are written to their target (a flametree directory) by the current
+    process, when ``write_rendered_reports`` is called.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.pending = deque()
+
+    def submit(self, domestication_results, target):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=1)
+        future = self.executor.submit(domestication_results.write_report, "@memory")
+        self.pending.append((future, target))
+
+    def write_rendered_reports(self, wait=False):
+        while len(self.pending) and (wait or self.pending[0][0].done()):
+            future, target = self.pending.popleft()
+            write_zip_data(future.result(), target)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+
+def _write_timings(timings_file, record_id, timings, hook=None):
+    """Append the rows (record, stage, wall_time, cpu_time) to the timings file.
+
+    The hook, if any, is called as hook(record_id, stage, wall_time, cpu_time).
+    """
+    rows = StringIO()
+    writer = csv.writer(rows, lineterminator="\n")
+    for stage, (wall_time, cpu_time) in timings.items():
+        writer.writerow(
+            [
+                "" if record_id is None else record_id,
+                stage,
+                "%.6f" % wall_time,
+                "" if cpu_time is None else "%.6f" % cpu_time,
+            ]
+        )
+        if hook is not None:
+            hook(record_id, stage, wall_time, cpu_time)
+    timings_file.write(rows.getvalue())
+
+
+def _file_hash(fileobject):
+    """Return the SHA-256 hash of a flametree file's content."""
+    return hashlib.sha256(fileobject.read("rb")).hexdigest()
+
+
+def _read_checkpoints(checkpoints_dir):
+    """Return {record_id: checkpoint} from a batch's checkpoints manifest."""
+    if "manifest.jsonl" not in checkpoints_dir._filenames:
+        return {}
+    checkpoints = {}
+    for line in checkpoints_dir["manifest.jsonl"].read().splitlines():
+        try:
+            checkpoint = json.loads(line)
+        except ValueError:  # the run may have been killed while writing it
+            continue
+        checkpoints[checkpoint["record_id"]] = checkpoint
+    return checkpoints
+
+
+def _load_checkpointed_outcome(checkpoint, input_hash, root, checkpoints_dir):
+    """Return a record's outcome from a previous run, if it is still valid.
+
+    The outcome is valid if the record and the batch parameters are the same
+    (same input hash) and the record's output files are still there and
+    unchanged. Else, None is returned.
+    """
+    if (checkpoint is None) or (checkpoint["input_hash"] != input_hash):
+        return None
+    try:
+        for path, file_hash in checkpoint["files"].items():
+            fileobject = root
+            for name in path.split("/"):
+                fileobject = fileobject[name]
+            if _file_hash(fileobject) != file_hash:
+                return None
+        results_file = checkpoints_dir[checkpoint["record_id"] + ".pickle"]
+        domestication_results = pickle.loads(results_file.read("rb"))
+    except (KeyError, OSError, EOFError, pickle.UnpicklingError):
+        return None
+    return domestication_results, checkpoint["info"], None, None
+
+
+def _route_records(records, domesticator=None, standard=None):
+    """Return the (record, domesticator) pairs of the records of a batch.
+
+    The records of a list are all routed, and their IDs checked, before the
+    batch's target is opened (which replaces its previous content), so that
+    unroutable records and duplicate IDs are reported without erasing the
+    previous outputs. The list of the pairs is then returned. Records from an
+    iterator (e.g. a lazy ``bulk_load_records``) are routed one by one, so
+    that the batch starts on the first record, and a generator is returned.
+    """
+    if not hasattr(records, "__len__"):
+        if standard is not None:
+            return (
+                (record, standard.record_to_domesticator(record))
+                for record in records
+            )
+        if isinstance(domesticator, PartDomesticator):
+            return ((record, domesticator) for record in records)
+        return ((record, domesticator(record)) for record in records)
+    non_unique_record_ids = detect_non_unique_elements([r.id for r in records])
+    if len(non_unique_record_ids):
+        raise ValueError(
+            "The following record IDs have several occurences "
+            "in the provided records, which would lead to "
+            "overwritten record files: "
+            + ", ".join(
+                ["%s (%s)" % (e, instances) for (e, instances) in non_unique_record_ids]
+            )
+        )
+    if standard is not None:
+        return list(zip(records, standard.route(records)))
+    if isinstance(domesticator, PartDomesticator):
+        return [(record, domesticator) for record in records]
+    return [(record, domesticator(record)) for record in records]
+
+
+def _iter_batch_domestication(
+    records_domesticators,
+    root,
+    allow_edits=False,
+    domesticated_suffix="",
+    include_optimization_reports=True,
+    include_original_records=True,
+    barcodes=(),
+    barcode_order="same_as_records",
+    barcode_spacer="AA",
+    n_jobs=1,
+    executor=None,
+    scheduling="longest_first",
+    cache=None,
+    resume=False,
+    timing_hook=None,
+    results_table=None,
+    logger="bar",
+):
+    """Domesticate records one by one, writing the results in a flametree root.
+
+    The records come with their domesticators, see ``_route_records``. Yields
+    (record_id, domestication_results) as records get domesticated, then
+    writes the final report, see ``iter_batch_domestication``.
+    """
+    if scheduling not in ("longest_first", "records_order"):
+        raise ValueError("Unknown scheduling: %s" % scheduling)
+    if (results_table is not None) and (results_table not in RESULTS_TABLE_FORMATS):
+        raise ValueError("Unknown results_table format: %s" % results_table)
+    logger = proglog.default_bar_logger(logger, min_time_interval=0.2)
+    domesticated_dir = root._dir("domesticated_genbanks", replace=not resume)
+    if include_original_records:
+        original_dir = root._dir("original", replace=not resume)
+    if include_optimization_reports:
+        errors_dir = root._dir("error_reports", replace=not resume)
+    if resume:
+        checkpoints_dir = root._dir("checkpoints", replace=False)
+        checkpoints = _read_checkpoints(checkpoints_dir)
+    if hasattr(barcodes, "items"):
+        barcodes = list(barcodes.items())
+    if barcode_order == "by_size":
+        records_domesticators = list(records_domesticators)
+        records = [record for record, _ in records_domesticators]
+        barcodes = [b for b, r in zip(itertools.cycle(barcodes), records)]
+        lengths = [len(r) for r in records]
+        barcodes = [b for _, b in sorted(zip(lengths, barcodes))]
+    barcodes = itertools.cycle(barcodes) if len(barcodes) else None
+
+    parallel = (executor is not None) or (n_jobs != 1)
+    deferred_reports = include_optimization_reports == "failures"
+    domesticators = set()
+    seen_ids = set()
+    input_hashes = {}
+
+    # ATTRIBUTE A DOMESTICATOR AND A BARCODE TO EACH RECORD
+
+    # Costs are only estimated to schedule the records in a pool.
+    longest_first = parallel and (scheduling == "longest_first")
+
+    def iter_tasks():
+        for record, record_domesticator in records_domesticators:
+            if record.id in seen_ids:
+                raise ValueError(
+                    "Record ID %s has several occurences in the provided "
+                    "records, which would lead to overwritten record files."
+                    % record.id
+                )
+            seen_ids.add(record.id)
+            domesticators.add(record_domesticator)
+            barcode = None if barcodes is None else next(barcodes)
+            if resume:
+                input_hash = DomesticationCache.compute_key(
+                    record,
+                    record_domesticator,
+                    barcode,
+                    allow_edits,
+                    domesticated_suffix,
+                    barcode_spacer,
+                    include_optimization_reports,
+                    include_original_records,
+                )
+                input_hashes[record.id] = input_hash
+                outcome = _load_checkpointed_outcome(
+                    checkpoints.get(record.id), input_hash, root, checkpoints_dir
+                )
+                if outcome is not None:
+                    yield dict(record=record, outcome=outcome)
+                    continue
+            if not include_optimization_reports:
+                report_target = None
+            elif deferred_reports:
+                report_target = "@deferred"
+            elif parallel:
+                # Workers can't write in the target, reports come as zip data.
+                report_target = "@memory"
+            else:
+                report_target = errors_dir._dir(record.id)
+            task = dict(
+                record=record,
+                record_domesticator=record_domesticator,
+                barcode=barcode,
+                report_target=report_target,
+                allow_edits=allow_edits,
+                domesticated_suffix=domesticated_suffix,
+                barcode_spacer=barcode_spacer,
+                include_original_records=include_original_records,
+                cache=cache,
+            )
+            if longest_first:
+                task["estimated_cost"] = estimate_record_cost(
+                    record, record_domesticator
+                )
+            yield task
+
+    # DOMESTICATE ALL PARTS, APPEND BARCODE, WRITE THE ORDER FILES AS WE GO
+
+    order_dir = root._dir("sequences_to_order", replace=True)
+    order_ids_file = root._file("order_ids.csv")
+    order_ids_file.write("sequence,order_id\n")
+    timings_file = root._file("timings.csv")
+    timings_file.write("record,stage,wall_time,cpu_time\n")
+    fasta_file = order_dir._file("sequences_to_order.fa")
+    order_ids = set()
+    infos = []
+    sequences_to_order = []
+    outcomes = _iter_outcomes(
+        iter_tasks(),
+        n_jobs=n_jobs,
+        executor=executor,
+        longest_first=longest_first,
+    )
+    if hasattr(records_domesticators, "__len__"):
+        logger(record__total=len(records_domesticators))
+    else:
+        logger(record__total=None)
+    report_renderer = _ReportRenderer()
+    table_writer = None
+    if results_table is not None:
+        table_file = root._file(RESULTS_TABLE_FORMATS[results_table]).open("wb")
+        table_writer = ResultsTableWriter(table_file, table_format=results_table)
+    try:
+        for task, outcome, times in logger.iter_bar(record=outcomes):
+            domestication_results, info = outcome[:2]
+            domesticated_genbank, original_genbank = outcome[2:]
+            record_id = task["record"].id
+            if (times is not None) and ("estimated_cost" in task):
+                logger.log(
+                    "%s: estimated cost %.1f, domesticated in %.3fs"
+                    % (record_id, task["estimated_cost"], times[0])
+                )
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            if "outcome" not in task:
+                if include_optimization_reports:
+                    report_dir = errors_dir._dir(record_id, replace=False)
+                    report_data = domestication_results.report_data
+                    zip_report = parallel and not deferred_reports
+                    if zip_report and (report_data is not None):
+                        write_zip_data(report_data, report_dir)
+                domesticated_file = domesticated_dir._file(
+                    record_id + domesticated_suffix + ".gb"
+                )
+                domesticated_file.write(domesticated_genbank)
+                written_files = [domesticated_file]
+                if include_original_records:
+                    original_file = original_dir._file(record_id + ".gb")
+                    original_file.write(original_genbank)
+                    written_files.append(original_file)
+                if resume:
+                    checkpoints_dir._file(record_id + ".pickle").write(
+                        pickle.dumps(domestication_results), mode="wb"
+                    )
+                    checkpoint = {
+                        "record_id": record_id,
+                        "input_hash": input_hashes.pop(record_id),
+                        "files": {
+                            f._path[len(root._path) + 1 :].replace(os.sep, "/"): (
+                                _file_hash(f)
+                            )
+                            for f in written_files
+                        },
+                        "info": info,
+                    }
+                    checkpoints_dir._file("manifest.jsonl", replace=False).write(
+                        json.dumps(checkpoint) + "\n"
+                    )
+            failed = not domestication_results.success
+            if deferred_reports and failed and domestication_results.report_data:
+                report_dir = errors_dir._dir(record_id, replace=False)
+                if ("outcome" not in task) or not len(report_dir._filenames):
+                    report_renderer.submit(domestication_results, report_dir)
+            report_renderer.write_rendered_reports()
+
+            order_id = sanitize_and_uniquify([record_id], taken=order_ids)[record_id]
+            info["Order ID"] = order_id
+            infos.append(info)
+            order_ids_line = StringIO()
+            csv.writer(order_ids_line, lineterminator="\n").writerow(
+                [record_id, order_id]
+            )
+            order_ids_file.write(order_ids_line.getvalue())
+            record_to_order = SeqRecord(
+                domestication_results.record_after.seq,
+                id=order_id,
+                name="",
+                description="",
+            )
+            SeqIO.write(record_to_order, fasta_file, "fasta")
+            sequences_to_order.append(
+                {
+                    "sequence": str(record_to_order.seq).upper(),
+                    "length": len(record_to_order),
+                    "sequence name": order_id,
+                }
+            )
+            if table_writer is not None:
+                barcode = info.get("Barcode", "").strip()
+                table_writer.add_row(
+                    record_id=record_id,
+                    order_id=order_id,
+                    domesticator=info["Domesticator"],
+                    success=domestication_results.success,
+                    message=domestication_results.message,
+                    added_bp=info["Added bp"],
+                    edited_bp=info["Edited bp"],
+                    barcode=barcode if len(barcode) else None,
+                    barcode_sequence=info.get("Barcode sequence"),
+                    sequence=str(record_to_order.seq).upper(),
+                )
+            if times is not None:
+                timings = dict(domestication_results.timings)
+                timings["write_outputs"] = (
+                    time.perf_counter() - wall_start,
+                    time.process_time() - cpu_start,
+                )
+                timings["total"] = times
+                _write_timings(timings_file, record_id, timings, timing_hook)
+            yield record_id, domestication_results
+        report_renderer.write_rendered_reports(wait=True)
+    finally:
+        report_renderer.shutdown()
+        if table_writer is not None:
+            # Even an interrupted batch leaves a readable (partial) table.
+            table_writer.close()
+            if not hasattr(table_file, "getvalue"):  # zip files stay open
+                table_file.close()
+
+    # WRITE PDF REPORT
+
+    columns = [
+        "Record",
+        "Order ID",
+        "Domesticator",
+        "Domesticated Record",
+        "Added bp",
+        "Edited bp",
+    ]
+    if len(infos) and "Barcode" in infos[0]:
+        columns.append("Barcode")
+    infos_dataframe = pandas.DataFrame(infos, columns=columns)
+    infos_dataframe.sort_values("Order ID", inplace=True)
+    domesticators = sorted(domesticators, key=lambda d: d.name)
+    batch_timer = StageTimer()
+    with batch_timer.stage("pdf_report"):
+        write_pdf_domestication_report(
+            root._file("Report.pdf"), infos_dataframe, domesticators
+        )
+
+    # WRITE THE SEQUENCES TO ORDER AS EXCEL
+
+    with batch_timer.stage("parts_lists"):
+        df = pandas.DataFrame.from_records(
+            sorted(sequences_to_order, key=lambda d: d["sequence name"]),
+            columns=["sequence name", "length", "sequence"],
+        )
+        xls_file = order_dir._file("sequences_to_order.xls")
+        df.to_excel(xls_file.open("wb"), index=False)
+        csv_file = order_dir._file("all_domesticated_parts.csv")
+        df.to_csv(csv_file.open("w"), index=False)
+    _write_timings(timings_file, None, batch_timer.timings, timing_hook)
+
+
+def _open_target(target, resume=False):
+    """Return a flametree root for the target (a folder if ``resume``)."""
+    if resume and ((target == "@memory") or target.lower().endswith(".zip")):
+        raise ValueError("resume=True requires a folder target, not %s" % target)
+    return flametree.file_tree(target, replace=not resume)
+
+
 def batch_domestication(
     records,
     target,
@@ -40,6 +650,13 @@ def batch_domestication(
     barcodes=(),
     barcode_order="same_as_records",
     barcode_spacer="AA",
+    n_jobs=1,
+    executor=None,
+    scheduling="longest_first",
+    cache=None,
+    resume=False,
+    timing_hook=None,
+    results_table=None,
     logger="bar",
 ):
     """Domesticate a batch of parts according to some domesticator/standard.
@@ -76,6 +693,9 @@ def batch_domestication(
     standard
       A StandardDomesticatorsSet object which will be used to attribute a
       specific domesticator to each part. See BUILTIN_STANDARDS for examples.
+      All records are routed before the batch starts (see the standard's
+      ``route``), and an UnroutableRecordsError listing all the records which
+      can't be attributed a domesticator is raised if any.
 
     allow_edits
       If False, sequences cannot be edited by the domesticator, only extended
@@ -90,7 +710,11 @@ def batch_domestication(
     include_optimization_reports
       If yes, some genbanks and pdfs will be produced to show how each part
       was domesticated. This is in particular informative when a domestication
-      fails and you want to understand why.
+      fails and you want to understand why. With "failures", the reports are
+      only rendered for the parts whose domestication failed, in a separate
+      process, while the other parts get domesticated. The other parts'
+      reports can still be rendered on demand from the results yielded by
+      ``iter_batch_domestication`` (``result.write_report(target)``).
 
     include_original_records
       Will include the input records into the final report folder/archive,
@@ -113,172 +737,188 @@ def batch_domestication(
       Sequence to appear between the barcode and the left flank of the
       domesticated part.
 
+    n_jobs
+      Number of processes among which the domestication of the different
+      records will be distributed (-1 for as many processes as there are CPU
+      cores). The default, 1, domesticates all records in the current process.
+      The outputs are the same whatever the number of processes. Note that the
+      domesticators must then be picklable (Golden Gate domesticators are).
+
+    executor
+      A ``concurrent.futures`` executor (for instance a ProcessPoolExecutor
+      shared between several batches) to which the domestication of the
+      different records will be submitted. If provided, ``n_jobs`` is ignored.
+
+    scheduling
+      Order in which the records are submitted to the processes, when
+      ``n_jobs`` or ``executor`` is provided. With "longest_first", the cost
+      of each record's domestication is estimated (from its length, number of
+      forbidden sites, and CDS-ness, see ``triage_batch``) and the most costly
+      records are submitted first, so that no process ends up domesticating a
+      long part alone at the end of the batch. With "records_order", records
+      are submitted in order, a few records ahead of the outputs. In both
+      cases the outputs are written in the order of the records. With
+      "longest_first", the estimated cost and actual domestication time of
+      each record are also logged (see ``logger.logs``), to tune the model.
+      Serial runs (``n_jobs=1`` and no executor) estimate no costs.
+
+    cache
+      A DomesticationCache in which the domestication results are stored, so
+      that parts which were already domesticated in a previous batch (same
+      sequence, domesticator and parameters) are not optimized again.
+
+    resume
+      If True, the ``target`` (which must be a folder) is not emptied, and a
+      checkpoint is written in ``target/checkpoints`` for every domesticated
+      record. If a run with ``resume=True`` gets interrupted, running the same
+      batch again with ``resume=True`` skips the records whose checkpoint is
+      valid (same record and parameters, unchanged output files) and only
+      domesticates the other records, before writing the report and the
+      sequences to order for the whole batch.
+
+    timing_hook
+      Optional function ``hook(record_id, stage, wall_time, cpu_time)``
+      called (in the current process) for every timed stage of the batch, for
+      instance to forward the timings to a metrics system. The same timings
+      are written in ``timings.csv``, next to ``order_ids.csv``: for each
+      domesticated record, the times of the domestication stages (see
+      ``PartDomesticator.domesticate``), of "genbank_formatting" and
+      "sequenticons", of the whole domestication task ("total", in the worker
+      process if any) and of the writing of the record's files
+      ("write_outputs"); then the times of the batch's "pdf_report" and
+      "parts_lists" (with an empty record ID, and record_id=None in the hook).
+      The timings of each record are also in its results' ``timings``.
+
+    results_table
+      Either None, or "parquet" or "arrow" to also write the results in a
+      columnar table (``results.parquet`` or ``results.arrow``, next to
+      ``order_ids.csv``) with one row per record and the columns record_id,
+      order_id, domesticator, success, message, added_bp, edited_bp, barcode
+      (name), barcode_sequence and sequence (the sequence to order). The
+      table is written as the batch progresses and can be read (memory
+      mapped for "arrow") with ``read_results_tables``, e.g. to query the
+      results of many batches at once. Requires the pyarrow library.
+
     logger
       Either "bar" or None for no logger or any Proglog ProgressBarLogger.
     """
-    non_unique_record_ids = detect_non_unique_elements([r.id for r in records])
-    if len(non_unique_record_ids):
-        raise ValueError(
-            "The following record IDs have several occurences "
-            "in the provided records, which would lead to "
-            "overwritten record files: "
-            + ", ".join(
-                ["%s (%s)" % (e, instances) for (e, instances) in non_unique_record_ids]
-            )
-        )
-    logger = proglog.default_bar_logger(logger, min_time_interval=0.2)
-    root = flametree.file_tree(target, replace=True)
-    domesticated_dir = root._dir("domesticated_genbanks")
-    if include_original_records:
-        original_dir = root._dir("original")
-    if include_optimization_reports:
-        errors_dir = root._dir("error_reports")
-    if standard is not None:
-        domesticator = standard.record_to_domesticator
-
-    if hasattr(barcodes, "items"):
-        barcodes = list(barcodes.items())
-    if len(barcodes):
-        barcodes = [b for b, r in zip(itertools.cycle(barcodes), records)]
-    if barcode_order == "by_size":
-        lengths = [len(r) for r in records]
-        barcodes = [b for _, b in sorted(zip(lengths, barcodes))]
-
-    infos = []
-
-    domesticators = set()
+    records_domesticators = _route_records(list(records), domesticator, standard)
+    root = _open_target(target, resume)
     nfails = 0
-    domesticated_records = []
-    columns = [
-        "Record",
-        "Ordering Name",
-        "Domesticator",
-        "Domesticated Record",
-        "Added bp",
-        "Edited bp",
-    ]
-
-    # DOMESTICATE ALL PARTS, APPEND BARCODE, GATHER DATA
-    for i, record in logger.iter_bar(record=list(enumerate(records))):
-        record = deepcopy(record)
-        original_id = record.id
-        domesticated_id = record.id + domesticated_suffix
-        domesticated_file_name = domesticated_id + ".gb"
-        if isinstance(domesticator, PartDomesticator):
-            record_domesticator = domesticator
-        else:
-            record_domesticator = domesticator(record)
-        domesticators.add(record_domesticator)
-        if include_optimization_reports:
-            report_target = errors_dir._dir(record.id)
-        else:
-            report_target = None
-        if len(barcodes):
-            barcode = barcodes[i]
-            if not isinstance(barcode, str):
-                barcode_id, barcode = barcode
-                barcode_id = " " + barcode_id
-            else:
-                barcode_id = ""
-            barcode = sequence_to_record(barcode)
-            annotate_record(barcode, label="BARCODE" + barcode_id)
-        else:
-            barcode = None
-        # final, edits, report, success, msg
-        domestication_results = record_domesticator.domesticate(
-            record, report_target=report_target, edit=allow_edits
-        )
+    for record_id, domestication_results in _iter_batch_domestication(
+        records_domesticators,
+        root,
+        allow_edits=allow_edits,
+        domesticated_suffix=domesticated_suffix,
+        include_optimization_reports=include_optimization_reports,
+        include_original_records=include_original_records,
+        barcodes=barcodes,
+        barcode_order=barcode_order,
+        barcode_spacer=barcode_spacer,
+        n_jobs=n_jobs,
+        executor=executor,
+        scheduling=scheduling,
+        cache=cache,
+        resume=resume,
+        timing_hook=timing_hook,
+        results_table=results_table,
+        logger=logger,
+    ):
         if not domestication_results.success:
             nfails += 1
-        if barcode is not None:
-            domestication_results.record_after = (
-                barcode + barcode_spacer + domestication_results.record_after
-            )
-        domestication_results.record_after.original_id = original_id
-        domestication_results.record_after.id = domesticated_id.replace(" ", "_")
-        SeqIO.write(
-            domestication_results.record_after,
-            domesticated_dir._file(domesticated_file_name),
-            "genbank",
-        )
-        domesticated_records.append(domestication_results.record_after)
-        if include_original_records:
-            write_record(
-                record, original_dir._file(original_id + ".gb"),
-            )
-        n_edits = domestication_results.number_of_edits()
-        added_bp = len(domestication_results.record_after) - len(record)
-        before_seqicon = sequenticon(record, output_format="html_image")
-        after_seqicon = sequenticon(
-            domestication_results.record_after, output_format="html_image"
-        )
+    return nfails, root._close()
 
-        infos.append(
-            {
-                "id": original_id,
-                "Record": before_seqicon + original_id,
-                "Domesticator": record_domesticator.name,
-                "Domesticated Record": ("Failed: " + domestication_results.message)
-                if not domestication_results.success
-                else (after_seqicon + domesticated_id),
-                "Added bp": added_bp,
-                "Edited bp": n_edits,
-            }
-        )
-        if barcode is not None:
-            infos[-1]["Barcode"] = barcode_id
 
-    # WRITE PDF REPORT
+def iter_batch_domestication(
+    records,
+    target,
+    domesticator=None,
+    standard=None,
+    allow_edits=False,
+    domesticated_suffix="",
+    include_optimization_reports=True,
+    include_original_records=True,
+    barcodes=(),
+    barcode_order="same_as_records",
+    barcode_spacer="AA",
+    n_jobs=1,
+    executor=None,
+    scheduling="longest_first",
+    cache=None,
+    resume=False,
+    timing_hook=None,
+    results_table=None,
+    logger="bar",
+):
+    """Domesticate a batch of parts, yielding the results as they come.
 
-    sanitizing_table = sanitize_and_uniquify([info["id"] for info in infos])
-    order_id_dataframe = pandas.DataFrame(
-        list(sanitizing_table.items()), columns=["sequence", "order_id"]
-    )
-    order_id_dataframe.to_csv(root._file("order_ids.csv").open("w"), index=False)
-    for info in infos:
-        info["Order ID"] = sanitizing_table[info["id"]]
-    columns = [
-        "Record",
-        "Order ID",
-        "Domesticator",
-        "Domesticated Record",
-        "Added bp",
-        "Edited bp",
-    ]
-    if "Barcode" in infos[0]:
-        columns.append("Barcode")
-    infos_dataframe = pandas.DataFrame(infos, columns=columns)
-    infos_dataframe.sort_values("Order ID", inplace=True)
-    domesticators = sorted(domesticators, key=lambda d: d.name)
-    write_pdf_domestication_report(
-        root._file("Report.pdf"), infos_dataframe, domesticators
-    )
+    This is a streaming version of ``batch_domestication``, for large batches.
+    The records can be any iterable (for instance a ``SeqIO.parse`` iterator)
+    and are only read as the domestication progresses. Each domesticated part
+    is written to the target as soon as it is done, and appended to
+    ``order_ids.csv`` and ``sequences_to_order/sequences_to_order.fa``, so
+    that an interrupted batch still leaves usable outputs. The PDF report and
+    the Excel/CSV lists of all domesticated parts are written at the end.
 
-    # WRITE THE SEQUENCES TO ORDER AS FASTA
+    Examples
+    --------
 
-    order_dir = root._dir("sequences_to_order", replace=True)
-    for r in domesticated_records:
-        r.id = sanitizing_table[r.original_id]
-        r.name = ""
-        r.description = ""
-    SeqIO.write(domesticated_records, order_dir._file("sequences_to_order.fa"), "fasta")
+    >>> records = SeqIO.parse("parts.fa", "fasta")
+    >>> results = iter_batch_domestication(records, "output_folder",
+    >>>                                    standard=BUILTIN_STANDARDS.EMMA)
+    >>> for record_id, domestication_results in results:
+    >>>     print(record_id, domestication_results.summary())
 
-    # WRITE THE SEQUENCES TO ORDER AS EXCEL
+    Yields
+    ------
+      (record_id, domestication_results)
+        For each record, in the order of the records.
 
-    df = pandas.DataFrame.from_records(
-        sorted(
-            [
-                {
-                    "sequence": str(rec.seq).upper(),
-                    "length": len(rec),
-                    "sequence name": rec.id,
-                }
-                for rec in domesticated_records
-            ],
-            key=lambda d: d["sequence name"],
-        ),
-        columns=["sequence name", "length", "sequence"],
-    )
-    df.to_excel(order_dir._file("sequences_to_order.xls").open("wb"), index=False)
-    df.to_csv(order_dir._file("all_domesticated_parts.csv").open("w"), index=False)
-    return nfails, root._close()
+    Parameters
+    ----------
+
+    records
+      Iterable of Biopython records to be domesticated. A ValueError is raised
+      if a record ID was already encountered in the batch. Note that if
+      ``barcode_order`` is "by_size", or if the domestication is distributed
+      with the "longest_first" ``scheduling``, all records will be read first.
+      With a ``standard``, the records of a list are all routed before the
+      batch starts, while records from an iterator (such as
+      ``bulk_load_records(paths, lazy=True)``) are routed as they are read.
+
+    target
+      Path to a folder or to a zip file (which will be complete once the
+      iteration is over).
+
+    Other parameters are the same as for ``batch_domestication``.
+    """
+    if target == "@memory":
+        raise ValueError(
+            "iter_batch_domestication writes to a folder or a zip file, "
+            "use batch_domestication for in-memory report generation."
+        )
+    records_domesticators = _route_records(records, domesticator, standard)
+    root = _open_target(target, resume)
+    try:
+        for record_id, domestication_results in _iter_batch_domestication(
+            records_domesticators,
+            root,
+            allow_edits=allow_edits,
+            domesticated_suffix=domesticated_suffix,
+            include_optimization_reports=include_optimization_reports,
+            include_original_records=include_original_records,
+            barcodes=barcodes,
+            barcode_order=barcode_order,
+            barcode_spacer=barcode_spacer,
+            n_jobs=n_jobs,
+            executor=executor,
+            scheduling=scheduling,
+            cache=cache,
+            resume=resume,
+            timing_hook=timing_hook,
+            results_table=results_table,
+            logger=logger,
+        ):
+            yield record_id, domestication_results
+    finally:
+        root._close()
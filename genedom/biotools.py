@@ -1,8 +1,14 @@
 import os
 import re
-from copy import deepcopy
+import threading
+from contextlib import contextmanager
+from copy import copy
+from io import BytesIO
+import zipfile
 import numpy as np
 
+import flametree
+
 from snapgene_reader import snapgene_file_to_seqrecord
 
 from Bio.Seq import Seq
@@ -38,21 +44,64 @@ def random_dna_sequence(length, probas=None, seed=None):
       If not specified, all nucleotides are equiprobable (p=0.25).
 
     seed
-      The seed to feed to the random number generator. When a seed is provided
-      the random results depend deterministically on the seed, thus enabling
-      reproducibility.
+      Either an integer seed or a ``numpy.random.Generator``. When a seed is
+      provided the random results depend deterministically on the seed, thus
+      enabling reproducibility (the global ``np.random`` state is then left
+      untouched). An integer seed gives the same sequences as in previous
+      versions (which seeded the global state). If None, the global
+      ``np.random`` generator is used.
     """
-    if seed is not None:
-        np.random.seed(seed)
+    if seed is None:
+        rng = np.random
+    elif isinstance(seed, np.random.Generator):
+        rng = seed
+    else:
+        rng = np.random.RandomState(seed)
     if probas is None:
-        sequence = np.random.choice(list("ATCG"), length)
+        sequence = rng.choice(list("ATCG"), length)
     else:
         bases, probas = zip(*probas.items())
-        sequence = np.random.choice(bases, length, p=probas)
+        sequence = rng.choice(bases, length, p=probas)
     return "".join(sequence)
 
 
-formats_dict = {".fa": "fasta", ".gb": "genbank", ".gbk": "genbank", ".dna": "snapgene"}
+_GLOBAL_RANDOM_STATE_LOCK = threading.Lock()
+
+
+@contextmanager
+def seeded_numpy_random_state(rng):
+    """Temporarily seed the global ``np.random`` state from a Generator.
+
+    This makes third-party code relying on the global ``np.random`` state
+    (such as DnaChisel's solver, which takes no random generator) deterministic.
+    The previous global state is restored on exit. If ``rng`` is None, the
+    global state is left as is.
+
+    The seeded blocks of different threads run one at a time, under a lock.
+    Code of other threads using ``np.random`` outside of this context can
+    still draw from (and advance) the seeded state, which then makes the
+    result irreproducible. Processes each have their own global state.
+    """
+    if rng is None:
+        yield
+        return
+    with _GLOBAL_RANDOM_STATE_LOCK:
+        previous_state = np.random.get_state()
+        np.random.seed(rng.integers(2 ** 32))
+        try:
+            yield
+        finally:
+            np.random.set_state(previous_state)
+
+
+formats_dict = {
+    ".fa": "fasta",
+    ".fasta": "fasta",
+    ".gb": "genbank",
+    ".gbk": "genbank",
+    ".embl": "embl",
+    ".dna": "snapgene",
+}
 
 
 def load_record(filename, linear=True, name="unnamed", capitalize=True):
@@ -157,9 +206,18 @@ def sanitize_string(
 
 
 def sanitize_and_uniquify(
-    strings, max_length=15, replacements=(("'", "p"), ("*", "s"), ("-", "_"))
+    strings,
+    max_length=15,
+    replacements=(("'", "p"), ("*", "s"), ("-", "_")),
+    taken=None,
 ):
-    dejavu = set()
+    """Return a dict {string: sanitized_string} with unique sanitized strings.
+
+    Strings already present in the set ``taken`` (if provided) will not be
+    attributed, and the set is updated with the newly attributed strings, so
+    that strings can be processed incrementally in successive calls.
+    """
+    dejavu = set() if taken is None else taken
     table = {}
     for string in strings:
         newstring = sanitize_string(
@@ -175,13 +233,38 @@ def sanitize_and_uniquify(
 
 
 def write_record(record, target, fmt="genbank"):
-    """Write a record as genbank, fasta, etc. via Biopython, with fixes."""
-    record = deepcopy(record)
+    """Write a record as genbank, fasta, etc. via Biopython, with fixes.
+
+    The record itself is not modified: the fixes are applied to a shallow
+    copy (the sequence and features are shared, not copied).
+    """
+    record = copy(record)
     record.name = record.name[:20]
     if has_dna_alphabet:
         if str(record.seq.alphabet.__class__.__name__) != "DNAAlphabet":
+            record.seq = copy(record.seq)
             record.seq.alphabet = DNAAlphabet()
-    record.annotations["molecule_type"] = "DNA"
+    record.annotations = dict(record.annotations, molecule_type="DNA")
     if hasattr(target, "open"):
         target = target.open("w")
     SeqIO.write(record, target, fmt)
+
+
+def write_zip_data(zip_data, target):
+    """Write the content of zip data (bytes) to a folder, zip file, or
+    flametree directory (for instance zipped optimization reports)."""
+    if isinstance(target, str):
+        if target.lower().endswith(".zip"):
+            with open(target, "wb") as f:
+                f.write(zip_data)
+            return
+        target = flametree.file_tree(target)
+    with zipfile.ZipFile(BytesIO(zip_data)) as archive:
+        for name in archive.namelist():
+            if name.endswith("/"):
+                continue
+            directory = target
+            parts = name.split("/")
+            for dirname in parts[:-1]:
+                directory = directory._dir(dirname, replace=False)
+            directory._file(parts[-1]).write(archive.read(name), mode="wb")
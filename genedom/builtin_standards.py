@@ -5,12 +5,26 @@ from .PartDomesticator import GoldenGateDomesticator
 this_dir = os.path.realpath(__file__)
 standards_dir = os.path.join(os.path.dirname(this_dir), "assembly_standards")
 
-BUILTIN_STANDARDS = Box({})
-for fname in os.listdir(standards_dir):
-    name, ext = os.path.splitext(fname)
-    if ext != ".csv":
-        continue
-    path = os.path.join(standards_dir, fname)
-    BUILTIN_STANDARDS[name] = GoldenGateDomesticator.standard_from_spreadsheet(
-        path, name_prefix=name + "_"
-    )
+
+def load_builtin_standards():
+    """Return a Box {standard_name: standard} of the builtin standards."""
+    standards = Box({})
+    for fname in os.listdir(standards_dir):
+        name, ext = os.path.splitext(fname)
+        if ext != ".csv":
+            continue
+        path = os.path.join(standards_dir, fname)
+        standards[name] = GoldenGateDomesticator.standard_from_spreadsheet(
+            path, name_prefix=name + "_"
+        )
+    return standards
+
+
+def __getattr__(name):
+    # BUILTIN_STANDARDS is only built (spreadsheets parsed, domesticators
+    # created) when it is first used.
+    if name == "BUILTIN_STANDARDS":
+        global BUILTIN_STANDARDS
+        BUILTIN_STANDARDS = load_builtin_standards()
+        return BUILTIN_STANDARDS
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -0,0 +1,229 @@
+"""Bulk loading of records from folders, globs, zip archives and gzip files."""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import gzip
+from io import BytesIO, StringIO
+import itertools
+import os
+import zipfile
+
+from Bio import SeqIO
+from snapgene_reader import snapgene_file_to_seqrecord
+
+from .biotools import formats_dict
+
+
+def sniff_records_format(data, filename=None):
+    """Return the format of a file's data (bytes), from its content.
+
+    Returns "genbank", "fasta", "embl" or "snapgene" if recognized, else the
+    format given by the file's extension (see ``biotools.formats_dict``) or
+    None.
+    """
+    if data[:1] == b"\t" and data[5:13] == b"SnapGene":
+        return "snapgene"
+    head = data[:200].lstrip()
+    if head.startswith(b"LOCUS"):
+        return "genbank"
+    if head.startswith(b">"):
+        return "fasta"
+    if head.startswith(b"ID "):
+        return "embl"
+    if filename is not None:
+        return formats_dict.get(os.path.splitext(filename)[1].lower(), None)
+    return None
+
+
+def parse_records_data(data, name="unnamed", capitalize=True):
+    """Return the list of the records in a file's data (bytes).
+
+    The data can be gzipped, and its format is detected from its content
+    (see ``sniff_records_format``). Records without an ID are given an ID
+    derived from ``name`` (the file's path), as in ``load_records``. Raises a
+    ValueError if the format is not recognized.
+    """
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+        if name.lower().endswith(".gz"):
+            name = name[:-3]
+    fmt = sniff_records_format(data, filename=name)
+    if fmt is None:
+        raise ValueError("Unrecognized records format for %s" % name)
+    if fmt == "snapgene":
+        records = [snapgene_file_to_seqrecord(fileobject=BytesIO(data))]
+    else:
+        records = list(SeqIO.parse(StringIO(data.decode()), fmt))
+    for i, record in enumerate(records):
+        if capitalize:
+            sequence = str(record.seq)
+            if not sequence.isupper():
+                record.seq = record.seq.upper()
+        if str(record.id) in ["None", "", "<unknown id>", ".", " "]:
+            record.id = name.replace("/", "_").replace("\\", "_")
+            if len(records) > 1:
+                record.id += "_%04d" % i
+    return records
+
+
+def _iter_file_sources(path):
+    """Yield (name, path, data) for a file, or for each file of a zip."""
+    if not path.lower().endswith(".zip"):
+        yield path, path, None  # the data is read by the parsing process.
+        return
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            basename = os.path.basename(info.filename.rstrip("/"))
+            if info.is_dir() or basename.startswith(".") or "__MACOSX" in info.filename:
+                continue
+            yield info.filename, None, archive.read(info)
+
+
+def iter_records_sources(paths):
+    """Yield (name, path, data) for each file designated by the paths.
+
+    Paths can be files, folders (whose files are all considered,
+    recursively, in alphabetical order, except hidden files), glob patterns
+    such as "parts/**/*.gb", and zip archives (whose files are all
+    considered, and read in memory). Either ``path`` (for files on disk) or
+    ``data`` (for files of zip archives) is None.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirnames, filenames in os.walk(path):
+                dirnames[:] = sorted([d for d in dirnames if not d.startswith(".")])
+                for filename in sorted(filenames):
+                    if not filename.startswith("."):
+                        yield from _iter_file_sources(os.path.join(root, filename))
+        elif any(character in path for character in "*?["):
+            yield from iter_records_sources(sorted(glob.glob(path, recursive=True)))
+        else:
+            yield from _iter_file_sources(path)
+
+
+def _parse_sources(sources, capitalize=True, skip_unrecognized=False):
+    """Return the list of the records of each source (name, path, data)."""
+    results = []
+    for name, path, data in sources:
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        try:
+            results.append(parse_records_data(data, name, capitalize=capitalize))
+        except ValueError:
+            if not skip_unrecognized:
+                raise
+            results.append([])
+    return results
+
+
+def _iter_records(sources, n_jobs, executor, chunk_size, **parse_parameters):
+    """Yield the records of the sources, parsed by chunks of sources."""
+    if (executor is None) and (n_jobs == 1):
+        for source in sources:
+            for records in _parse_sources([source], **parse_parameters):
+                yield from records
+        return
+    sources = iter(sources)
+    chunks = iter(lambda: list(itertools.islice(sources, chunk_size)), [])
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs)
+    max_workers = getattr(executor, "_max_workers", None) or os.cpu_count()
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(_parse_sources, chunk, **parse_parameters))
+            while len(pending) >= 2 * max_workers:
+                for records in pending.popleft().result():
+                    yield from records
+        while len(pending):
+            for records in pending.popleft().result():
+                yield from records
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+        else:
+            for future in pending:
+                future.cancel()
+
+
+def bulk_load_records(
+    paths,
+    lazy=False,
+    n_jobs=1,
+    executor=None,
+    chunk_size=20,
+    capitalize=True,
+    skip_unrecognized=False,
+):
+    """Load the records of many files, folders, glob patterns, zip archives.
+
+    Unlike ``load_records``, the format of each file is detected from its
+    content (Genbank, FASTA, EMBL, or SnapGene), so files can have any
+    extension (.gb, .gbk, .fasta, no extension...), and gzipped files are
+    decompressed. Files can be parsed in parallel, and the records can be
+    yielded as they are parsed, so that a batch domestication can start on
+    the first records while the next ones are being loaded.
+
+    Examples
+    --------
+
+    >>> records = bulk_load_records(["parts/", "more_parts.zip", "*.gb.gz"])
+    >>> records = bulk_load_records("archive.zip", lazy=True, n_jobs=4)
+    >>> for record_id, results in iter_batch_domestication(
+    >>>         records, "output.zip", standard=BUILTIN_STANDARDS.EMMA):
+    >>>     print(record_id, results.summary())
+
+    Parameters
+    ----------
+
+    paths
+      A path or list of paths to files (possibly gzipped), folders (all
+      files are loaded recursively, except hidden files), glob patterns (such
+      as "parts/**/*.gbk"), or zip archives (all files are loaded).
+
+    lazy
+      If True, an iterator over the records is returned, which parses the
+      files as the records are consumed (a few files ahead when parsing in
+      parallel). Else the list of all records is returned.
+
+    n_jobs
+      Number of processes in which the files are parsed (-1 for as many
+      processes as there are CPU cores). The default, 1, parses the files in
+      the current process.
+
+    executor
+      A ``concurrent.futures`` executor (threads or processes) to which the
+      parsing of the files is submitted. If provided, ``n_jobs`` is ignored.
+
+    chunk_size
+      Number of files parsed in each task submitted to the processes.
+
+    capitalize
+      If True, the records' sequences are converted to upper case (only
+      when they have lower-case nucleotides).
+
+    skip_unrecognized
+      If True, files whose format is not recognized are ignored. Else a
+      ValueError is raised.
+
+    Returns
+    -------
+
+    records
+      The list of the records (or an iterator if ``lazy`` is True), in the
+      order of the files.
+    """
+    records = _iter_records(
+        iter_records_sources(paths),
+        n_jobs=n_jobs,
+        executor=executor,
+        chunk_size=chunk_size,
+        capitalize=capitalize,
+        skip_unrecognized=skip_unrecognized,
+    )
+    return records if lazy else list(records)
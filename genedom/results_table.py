@@ -0,0 +1,137 @@
+"""Columnar (Parquet or Arrow) tables of batch domestication results.
+
+These tables require the optional dependency pyarrow (``pip install pyarrow``).
+"""
+
+RESULTS_TABLE_FORMATS = {"parquet": "results.parquet", "arrow": "results.arrow"}
+RESULTS_TABLE_COLUMNS = [
+    ("record_id", "string"),
+    ("order_id", "string"),
+    ("domesticator", "string"),
+    ("success", "bool_"),
+    ("message", "string"),
+    ("added_bp", "int64"),
+    ("edited_bp", "int64"),
+    ("barcode", "string"),
+    ("barcode_sequence", "string"),
+    ("sequence", "string"),
+]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "Columnar results tables require pyarrow (pip install pyarrow)."
+        )
+    return pyarrow
+
+
+def results_table_schema():
+    """Return the pyarrow schema of the batch results tables."""
+    pyarrow = _import_pyarrow()
+    return pyarrow.schema(
+        [(name, getattr(pyarrow, dtype)()) for name, dtype in RESULTS_TABLE_COLUMNS]
+    )
+
+
+class ResultsTableWriter:
+    """Write the rows of a batch's results table as the batch progresses.
+
+    Rows are buffered and written to the file by chunks of ``chunk_size``
+    rows (one Parquet row group or Arrow record batch per chunk), so that the
+    memory used doesn't grow with the batch. The file is complete once
+    ``close()`` has been called.
+
+    Parameters
+    ----------
+
+    fileobject
+      A file-like object opened in binary mode (it is not closed by the
+      writer).
+
+    table_format
+      Either "parquet" or "arrow" (Arrow IPC file format, which can be memory
+      mapped when read, see ``read_results_tables``).
+
+    chunk_size
+      Number of rows written at once.
+    """
+
+    def __init__(self, fileobject, table_format="parquet", chunk_size=500):
+        if table_format not in RESULTS_TABLE_FORMATS:
+            raise ValueError("Unknown results table format: %s" % table_format)
+        pyarrow = _import_pyarrow()
+        self.schema = results_table_schema()
+        if table_format == "parquet":
+            self.writer = pyarrow.parquet.ParquetWriter(fileobject, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_file(fileobject, self.schema)
+        self.chunk_size = chunk_size
+        self.rows = []
+
+    def add_row(self, **row):
+        """Add a row (keywords are the columns, missing columns are null)."""
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows to the file."""
+        if len(self.rows):
+            pyarrow = _import_pyarrow()
+            batch = pyarrow.RecordBatch.from_pylist(self.rows, schema=self.schema)
+            self.writer.write_batch(batch)
+            self.rows = []
+
+    def close(self):
+        """Write the remaining rows and the end of the file."""
+        self.flush()
+        self.writer.close()
+
+
+def read_results_tables(paths, columns=None):
+    """Return a pyarrow Table of the results in one or several tables files.
+
+    Arrow files are memory-mapped, so only the columns used are actually read
+    from the disk, which makes it fast to query the results of many
+    historical batches.
+
+    Examples
+    --------
+
+    >>> table = read_results_tables(glob("runs/*/results.arrow"))
+    >>> failed = table.filter(pyarrow.compute.invert(table["success"]))
+    >>> dataframe = table.to_pandas()
+
+    Parameters
+    ----------
+
+    paths
+      A path or a list of paths to ``results.parquet`` or ``results.arrow``
+      files written by ``batch_domestication(..., results_table=...)``.
+
+    columns
+      List of the columns to read (default is all columns).
+    """
+    pyarrow = _import_pyarrow()
+    if isinstance(paths, str):
+        paths = [paths]
+    tables = []
+    for path in paths:
+        if path.lower().endswith(".parquet"):
+            table = pyarrow.parquet.read_table(path, columns=columns, memory_map=True)
+        else:
+            table = pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all()
+            if columns is not None:
+                table = table.select(columns)
+        tables.append(table)
+    if not len(tables):
+        schema = results_table_schema()
+        if columns is not None:
+            schema = pyarrow.schema([schema.field(c) for c in columns])
+        return schema.empty_table()
+    return pyarrow.concat_tables(tables)
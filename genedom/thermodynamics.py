@@ -0,0 +1,257 @@
+"""Vectorized melting temperature computations, to screen many primers at once.
+
+The melting temperatures are computed with the nearest-neighbor method, using
+the same thermodynamic table, concentrations and salt correction as
+Biopython's ``Bio.SeqUtils.MeltingTemp.Tm_NN`` defaults (which DnaChisel uses
+when primer3 is not installed), but for thousands of sequences at once.
+"""
+
+import math
+
+import numpy as np
+from Bio.SeqUtils.MeltingTemp import DNA_NN3
+
+from .KmerIndex import NUCLEOTIDE_CODES
+
+R = 1.987  # universal gas constant in Cal/degrees C*Mol
+COMPLEMENTS = {"A": "T", "C": "G", "G": "C", "T": "A"}
+
+
+def _nearest_neighbors_arrays(nn_table):
+    """Return arrays (delta_h, delta_s) indexed by 4 * code_1 + code_2."""
+    delta_h, delta_s = np.zeros(16), np.zeros(16)
+    for i, n1 in enumerate("ACGT"):
+        for j, n2 in enumerate("ACGT"):
+            key = n1 + n2 + "/" + COMPLEMENTS[n1] + COMPLEMENTS[n2]
+            if key not in nn_table:
+                key = key[::-1]
+            delta_h[4 * i + j], delta_s[4 * i + j] = nn_table[key]
+    return delta_h, delta_s
+
+
+def sequences_to_codes(sequences):
+    """Return a (n_sequences, length) array of codes (A:0, C:1, G:2, T:3).
+
+    All sequences must have the same length, and only ATGC characters.
+    """
+    if len(set([len(s) for s in sequences])) > 1:
+        raise ValueError("All sequences must have the same length.")
+    data = b"".join([s.encode() for s in sequences])
+    codes = NUCLEOTIDE_CODES[np.frombuffer(data, dtype=np.uint8)]
+    if (codes < 0).any():
+        raise ValueError("Only ATGC sequences are supported.")
+    return codes.reshape((len(sequences), -1))
+
+
+def _duplex_melting_temperatures(
+    delta_h, delta_s, n_nucleotides, first_codes, last_codes, has_gc, nn_table, Na, k
+):
+    """Return the Tm of duplexes from their nearest-neighbors sums (arrays).
+
+    The initiation terms are computed as in Biopython's Tm_NN.
+    """
+    delta_h = delta_h + nn_table["init"][0]
+    delta_s = delta_s + nn_table["init"][1]
+    for column, key in [(0, "init_oneG/C"), (1, "init_allA/T")]:
+        selected = has_gc if column == 0 else ~has_gc
+        delta_h = delta_h + selected * nn_table[key][0]
+        delta_s = delta_s + selected * nn_table[key][1]
+    n_5t_3a = (first_codes == 3).astype(int) + (last_codes == 0)
+    delta_h = delta_h + n_5t_3a * nn_table["init_5T/A"][0]
+    delta_s = delta_s + n_5t_3a * nn_table["init_5T/A"][1]
+    n_at_ends = np.isin(first_codes, (0, 3)).astype(int) + np.isin(last_codes, (0, 3))
+    delta_h = delta_h + n_at_ends * nn_table["init_A/T"][0]
+    delta_h = delta_h + (2 - n_at_ends) * nn_table["init_G/C"][0]
+    delta_s = delta_s + n_at_ends * nn_table["init_A/T"][1]
+    delta_s = delta_s + (2 - n_at_ends) * nn_table["init_G/C"][1]
+    delta_s = delta_s + 0.368 * (n_nucleotides - 1) * math.log(Na * 1e-3)
+    return (1000 * delta_h) / (delta_s + R * math.log(k)) - 273.15
+
+
+def melting_temperatures(sequences, Na=50, dnac1=25, dnac2=25, nn_table=DNA_NN3):
+    """Return an array of the melting temperatures of the sequences.
+
+    The result is the same as ``Bio.SeqUtils.MeltingTemp.Tm_NN`` with the
+    same parameters (Na in mM, oligonucleotide concentrations dnac1, dnac2 in
+    nM, salt correction method 5), but the computations are vectorized.
+    Sequences of different lengths are supported.
+    """
+    sequences = [s.upper() for s in sequences]
+    result = np.zeros(len(sequences))
+    lengths = np.array([len(s) for s in sequences])
+    delta_h_table, delta_s_table = _nearest_neighbors_arrays(nn_table)
+    k = (dnac1 - dnac2 / 2.0) * 1e-9
+    for length in np.unique(lengths):
+        indices = np.flatnonzero(lengths == length)
+        codes = sequences_to_codes([sequences[i] for i in indices])
+        dinucleotides = 4 * codes[:, :-1] + codes[:, 1:]
+        result[indices] = _duplex_melting_temperatures(
+            delta_h=delta_h_table[dinucleotides].sum(axis=1),
+            delta_s=delta_s_table[dinucleotides].sum(axis=1),
+            n_nucleotides=length,
+            first_codes=codes[:, 0],
+            last_codes=codes[:, -1],
+            has_gc=np.isin(codes, (1, 2)).any(axis=1),
+            nn_table=nn_table,
+            Na=Na,
+            k=k,
+        )
+    return result
+
+
+def heterodimers_melting_temperatures(
+    sequences, other_sequences, Na=50, dnac1=25, dnac2=25, nn_table=DNA_NN3
+):
+    """Return the melting temperatures of heterodimers between sequences.
+
+    For each sequence and each other sequence, all perfectly complementary
+    stretches (ungapped, on antiparallel strands) are considered, and the
+    largest melting temperature of these stretches is returned. This is an
+    approximation (mismatches, loops and dangling ends are not considered)
+    meant to quickly screen thousands of candidate primers against a panel of
+    existing primers.
+
+    Parameters
+    ----------
+
+    sequences
+      List of ATGC sequences, all of the same length.
+
+    other_sequences
+      List of ATGC sequences (e.g. a panel of primers).
+
+    Other parameters are the same as for ``melting_temperatures``.
+
+    Returns
+    -------
+
+    temperatures
+      An array of shape (len(sequences), len(other_sequences)). Sequences
+      without any complementary stretch of 2 nucleotides or more get -inf.
+    """
+    codes = sequences_to_codes([s.upper() for s in sequences])
+    n_sequences, length = codes.shape
+    delta_h_table, delta_s_table = _nearest_neighbors_arrays(nn_table)
+    k = (dnac1 - dnac2 / 2.0) * 1e-9
+    result = np.full((n_sequences, len(other_sequences)), -np.inf)
+    for p, other_sequence in enumerate(other_sequences):
+        # A stretch of the sequence is complementary to an antiparallel
+        # stretch of the other sequence if it is identical to a stretch of the
+        # other sequence's reverse-complement.
+        other_codes = 3 - sequences_to_codes([other_sequence.upper()])[0][::-1]
+        # Row i of "diagonals" is other_codes shifted by offsets[i], padded
+        # with -1 (which matches nothing), so that all alignments of the two
+        # sequences are processed in a single vectorized computation.
+        offsets = np.arange(-(len(other_codes) - 2), length - 1)
+        padded = np.full(len(other_codes) + 2 * length, -1)
+        padded[length : length + len(other_codes)] = other_codes
+        diagonals = np.lib.stride_tricks.sliding_window_view(padded, length)
+        diagonals = diagonals[length - offsets]
+        windows = np.repeat(codes, len(offsets), axis=0)
+        matches = windows == np.tile(diagonals, (n_sequences, 1))
+        temperatures = _best_stretches_melting_temperatures(
+            windows, matches, delta_h_table, delta_s_table, nn_table, Na, k
+        )
+        result[:, p] = temperatures.reshape((n_sequences, len(offsets))).max(axis=1)
+    return result
+
+
+def _best_stretches_melting_temperatures(
+    windows, matches, delta_h_table, delta_s_table, nn_table, Na, k
+):
+    """Return, for each row, the highest Tm of its runs of matches.
+
+    Only maximal runs (of 2 nucleotides or more) are considered, as their
+    sub-stretches are generally less stable. Rows without runs get -inf.
+    """
+    n_rows, width = windows.shape
+    paired = matches[:, :-1] & matches[:, 1:]  # both dinucleotide bases match
+    dinucleotides = 4 * windows[:, :-1] + windows[:, 1:]
+    zero = np.zeros((n_rows, 1))
+    cumulated_h = np.hstack([zero, np.cumsum(paired * delta_h_table[dinucleotides], 1)])
+    cumulated_s = np.hstack([zero, np.cumsum(paired * delta_s_table[dinucleotides], 1)])
+    is_gc = (windows == 1) | (windows == 2)
+    cumulated_gc = np.hstack([zero, np.cumsum(is_gc, axis=1)])
+    # Locate the (row, first dinucleotide, last dinucleotide) of each run.
+    bounded = np.zeros((n_rows, width + 1), dtype=np.int8)
+    bounded[:, 1:-1] = paired
+    changes = np.diff(bounded, axis=1)
+    rows, run_starts = np.nonzero(changes == 1)
+    _, run_ends = np.nonzero(changes == -1)  # exclusive, in dinucleotides
+    temperatures = _duplex_melting_temperatures(
+        delta_h=cumulated_h[rows, run_ends] - cumulated_h[rows, run_starts],
+        delta_s=cumulated_s[rows, run_ends] - cumulated_s[rows, run_starts],
+        n_nucleotides=run_ends - run_starts + 1,
+        first_codes=windows[rows, run_starts],
+        last_codes=windows[rows, run_ends],
+        has_gc=cumulated_gc[rows, run_ends + 1] > cumulated_gc[rows, run_starts],
+        nn_table=nn_table,
+        Na=Na,
+        k=k,
+    )
+    result = np.full(n_rows, -np.inf)
+    if len(rows):
+        # np.nonzero returns the rows sorted, so each row's runs are grouped.
+        row_starts = np.flatnonzero(np.diff(rows, prepend=-1))
+        result[rows[row_starts]] = np.maximum.reduceat(temperatures, row_starts)
+    return result
+
+
+def screen_primers(
+    sequences,
+    tmin=None,
+    tmax=None,
+    gc_min=None,
+    gc_max=None,
+    other_primer_sequences=(),
+    heterodim_tmax=None,
+):
+    """Return a boolean array indicating which sequences pass all criteria.
+
+    This enables to pre-filter thousands of random candidate primers (or
+    barcodes) at once, before finer checks.
+
+    Parameters
+    ----------
+
+    sequences
+      List of ATGC sequences, all of the same length.
+
+    tmin, tmax
+      Interval of acceptable melting temperatures (see
+      ``melting_temperatures``). None for no bound.
+
+    gc_min, gc_max
+      Interval of acceptable GC contents (between 0 and 1). None for no bound.
+
+    other_primer_sequences
+      List of sequences (e.g. lab primers) the sequences should not anneal
+      with (see ``heterodimers_melting_temperatures``).
+
+    heterodim_tmax
+      Maximal melting temperature of the heterodimers between a sequence and
+      any of the other primer sequences.
+    """
+    passing = np.ones(len(sequences), dtype=bool)
+    if not len(sequences):
+        return passing
+    if (tmin is not None) or (tmax is not None):
+        temperatures = melting_temperatures(sequences)
+        if tmin is not None:
+            passing &= temperatures >= tmin
+        if tmax is not None:
+            passing &= temperatures <= tmax
+    if (gc_min is not None) or (gc_max is not None):
+        gc_contents = np.isin(sequences_to_codes(sequences), (1, 2)).mean(axis=1)
+        if gc_min is not None:
+            passing &= gc_contents >= gc_min
+        if gc_max is not None:
+            passing &= gc_contents <= gc_max
+    if not passing.any():
+        return passing  # no survivors left to screen for heterodimers.
+    if len(other_primer_sequences) and (heterodim_tmax is not None):
+        heterodimers_tms = heterodimers_melting_temperatures(
+            [s for s, ok in zip(sequences, passing) if ok], other_primer_sequences
+        )
+        passing[passing] = (heterodimers_tms <= heterodim_tmax).all(axis=1)
+    return passing
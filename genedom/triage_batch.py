@@ -0,0 +1,189 @@
+import pandas
+import proglog
+
+from .PartDomesticator import PartDomesticator
+from .PartDomesticator.PartDomesticator import has_specification_features
+
+
+def estimate_domestication_cost(length, n_breaches, is_cds):
+    """Return a rough estimate of the cost of domesticating a part.
+
+    The cost is in arbitrary units (roughly, milliseconds of optimization
+    time). A part with no constraint breach only costs the evaluation of its
+    sequence, proportional to its length. Each breach requires a local
+    constraint resolution, which is more expensive in CDS parts (where
+    mutations must preserve the translation) and in longer parts (where every
+    mutation triggers the re-evaluation of longer sequences).
+
+    Parameters
+    ----------
+
+    length
+      Length of the part in nucleotides.
+
+    n_breaches
+      Number of constraint breaches in the part (e.g. number of forbidden
+      enzyme sites).
+
+    is_cds
+      Whether the part is a coding sequence (only synonymous mutations).
+    """
+    evaluation_cost = 0.003 * length
+    breach_cost = (20 + 0.01 * length) * (3 if is_cds else 1)
+    return evaluation_cost + n_breaches * breach_cost
+
+
+def count_record_breaches(record, domesticator, sites=None):
+    """Return the number of constraints breaches in a record, as domesticated.
+
+    The breaches are counted from the enzyme sites when possible (``sites``
+    can be provided if already known). Records with custom constraints (in
+    the domesticator or in the record's annotations) are evaluated with
+    DnaChisel, without optimization.
+    """
+    n_breaches = None
+    if not has_specification_features(record):
+        n_breaches = domesticator.count_breaches(str(record.seq).upper(), sites=sites)
+    if n_breaches is None:
+        problem = domesticator.build_problem(
+            record, is_cds=domesticator.cds_by_default, edit=True
+        )
+        n_breaches = sum(
+            [
+                max(1, len(evaluation.locations))
+                for evaluation in problem.constraints_evaluations()
+                if not evaluation.passes
+            ]
+        )
+    return n_breaches
+
+
+def estimate_record_cost(record, domesticator, sites=None):
+    """Return the estimated cost of domesticating a record with a domesticator.
+
+    See ``count_record_breaches`` and ``estimate_domestication_cost``.
+    """
+    n_breaches = count_record_breaches(record, domesticator, sites=sites)
+    return estimate_domestication_cost(
+        len(record), n_breaches, domesticator.cds_by_default
+    )
+
+
+def triage_batch(
+    records, domesticator=None, standard=None, allow_edits=False, logger=None
+):
+    """Assess the domestication of a batch of parts, without optimizing.
+
+    For each part, this tells which domesticator will be used, how many
+    forbidden sites (or other constraints breaches) need to be fixed, whether
+    the domestication will obviously fail, and the estimated cost of the
+    domestication, so that large ``batch_domestication`` runs can be planned.
+
+    The enzyme sites of the domesticators' standard are found in a single
+    scan of all parts. Only parts with custom constraints (in the
+    domesticator or in the record's annotations) are evaluated with DnaChisel,
+    without optimization.
+
+    Examples
+    --------
+
+    >>> triage = triage_batch(records, standard=BUILTIN_STANDARDS.EMMA)
+    >>> print(triage[triage.needs_edits])
+    >>> print(triage.estimated_cost.sum())
+
+    Parameters
+    ----------
+
+    records
+      List of Biopython records of the parts.
+
+    domesticator
+      Either a single domesticator, to be used for all parts in the batch, or
+      a function f(record) => appropriate_domesticator. Note that a "standard"
+      can be provided instead.
+
+    standard
+      A StandardDomesticatorsSet object which will be used to attribute a
+      specific domesticator to each part.
+
+    allow_edits
+      Whether the sequences will be domesticated with edits allowed (see
+      ``batch_domestication``). If not, non-coding parts with sites will be
+      marked as expected failures.
+
+    logger
+      Either "bar" or None for no logger or any Proglog ProgressBarLogger.
+
+    Returns
+    -------
+
+    triage
+      A pandas dataframe with one row per record and columns ``record``,
+      ``domesticator``, ``length``, ``is_cds``, ``sites`` (a string such as
+      "BsmBI@122(+), BsaI@1302(-)"), ``n_sites``, ``n_breaches``,
+      ``needs_edits``, ``expected_failure``, ``estimated_cost``.
+    """
+    logger = proglog.default_bar_logger(logger, min_time_interval=0.2)
+    records = list(records)
+    if standard is not None:
+        domesticators = standard.route(records)
+        sites_index = standard.sites_index
+    elif isinstance(domesticator, PartDomesticator):
+        domesticators = [domesticator for record in records]
+        sites_index = getattr(domesticator, "sites_index", None)
+    else:
+        domesticators = [domesticator(record) for record in records]
+        sites_index = None
+    if sites_index is not None:
+        all_sites = sites_index.find_sites_in_sequences(records)
+    else:
+        all_sites = [
+            d.sites_index.find_sites(str(record.seq))
+            if hasattr(d, "sites_index")
+            else []
+            for record, d in zip(records, domesticators)
+        ]
+
+    rows = []
+    for record, record_domesticator, sites in logger.iter_bar(
+        record=list(zip(records, domesticators, all_sites))
+    ):
+        avoided_enzymes = getattr(record_domesticator, "avoided_enzymes", ())
+        sites = [site for site in sites if site[0] in avoided_enzymes]
+        is_cds = record_domesticator.cds_by_default
+        n_breaches = count_record_breaches(record, record_domesticator, sites)
+        needs_edits = n_breaches > 0
+        rows.append(
+            {
+                "record": record.id,
+                "domesticator": record_domesticator.name,
+                "length": len(record),
+                "is_cds": is_cds,
+                "sites": ", ".join(
+                    [
+                        "%s@%d(%s)" % (enzyme, start, "+" if strand == 1 else "-")
+                        for (enzyme, start, strand) in sites
+                    ]
+                ),
+                "n_sites": len(sites),
+                "n_breaches": n_breaches,
+                "needs_edits": needs_edits,
+                "expected_failure": needs_edits and not (allow_edits or is_cds),
+                "estimated_cost": estimate_domestication_cost(
+                    len(record), n_breaches, is_cds
+                ),
+            }
+        )
+    columns = [
+        "record",
+        "domesticator",
+        "length",
+        "is_cds",
+        "sites",
+        "n_sites",
+        "n_breaches",
+        "needs_edits",
+        "expected_failure",
+        "estimated_cost",
+    ]
+    return pandas.DataFrame(rows, columns=columns)
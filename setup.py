@@ -18,7 +18,7 @@ setup(
     packages=find_packages(exclude="docs"),
     include_package_data=True,
     install_requires=(
-        "dnachisel[reports]",
+        "dnachisel[reports]>=3.2,<4",
         "snapgene_reader",
         "pdf_reports",
         "pandas",
@@ -28,4 +28,5 @@ setup(
         "flametree",
         "sequenticon",
     ),
+    extras_require={"tables": ["pyarrow"], "primers": ["primer3-py"]},
 )
@@ -0,0 +1,102 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import matplotlib
+
+matplotlib.use("Agg")
+from genedom import (
+    load_records,
+    abatch_domestication,
+    batch_domestication,
+    random_dna_sequence,
+    BUILTIN_STANDARDS,
+)
+
+DATA_DIR = os.path.join("tests", "data")
+
+
+def test_adomesticate():
+    domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+    sequences = [random_dna_sequence(500, seed=i) for i in range(4)]
+
+    async def domesticate_all(executor):
+        return await asyncio.gather(
+            *[domesticator.adomesticate(s, executor=executor) for s in sequences]
+        )
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        for results in [
+            asyncio.run(domesticate_all(None)),
+            asyncio.run(domesticate_all(executor)),
+        ]:
+            expected = [domesticator.domesticate(s) for s in sequences]
+            assert [r.sequence_after for r in results] == [
+                r.sequence_after for r in expected
+            ]
+
+
+def test_abatch_domestication(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    reference_target = os.path.join(str(tmpdir), "reference")
+    nfails, _ = batch_domestication(
+        records, reference_target, standard=BUILTIN_STANDARDS.EMMA
+    )
+
+    async def collect_events(target, **parameters):
+        return [
+            event
+            async for event in abatch_domestication(
+                records, target, standard=BUILTIN_STANDARDS.EMMA, **parameters
+            )
+        ]
+
+    target = os.path.join(str(tmpdir), "async")
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        events = asyncio.run(collect_events(target, executor=executor))
+    assert [e["record_id"] for e in events[:-1]] == [r.id for r in records]
+    assert [e["n_done"] for e in events[:-1]] == list(range(1, len(records) + 1))
+    assert events[-1] == dict(event="finished", n_fails=nfails, zip_data=None)
+    for filename in ["order_ids.csv", "timings.csv", "Report.pdf"]:
+        assert os.path.exists(os.path.join(target, filename))
+    with open(os.path.join(target, "order_ids.csv")) as f:
+        with open(os.path.join(reference_target, "order_ids.csv")) as reference:
+            assert f.read() == reference.read()
+
+    events = asyncio.run(collect_events("@memory"))
+    assert events[-1]["zip_data"][:2] == b"PK"
+
+
+def test_abatch_domestication_cancellation(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    target = os.path.join(str(tmpdir), "cancelled")
+
+    async def stop_after_two_records():
+        events = abatch_domestication(records, target, standard=BUILTIN_STANDARDS.EMMA)
+        async for event in events:
+            if event["n_done"] == 2:
+                break
+        await events.aclose()
+
+    asyncio.run(stop_after_two_records())
+    with open(os.path.join(target, "order_ids.csv")) as f:
+        assert len(f.read().splitlines()) == 3
+    assert not os.path.exists(os.path.join(target, "Report.pdf"))
+
+
+def test_abatch_domestication_leaves_default_executor_free(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+
+    async def use_default_executor_during_batch():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+        events = abatch_domestication(
+            records, "@memory", standard=BUILTIN_STANDARDS.EMMA
+        )
+        async for event in events:
+            # The (paused) batch doesn't hold the only default thread.
+            task = loop.run_in_executor(None, lambda: event["record_id"])
+            assert await asyncio.wait_for(task, timeout=10) == records[0].id
+            break
+        await events.aclose()
+
+    asyncio.run(use_default_executor_during_batch())
@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from genedom import BarcodesCollection, random_dna_sequence
+from genedom.KmerIndex import KmerIndex
+from genedom.thermodynamics import (
+    melting_temperatures,
+    heterodimers_melting_temperatures,
+    screen_primers,
+)
+from Bio.Seq import reverse_complement
+from Bio.SeqUtils import gc_fraction
+from Bio.SeqUtils.MeltingTemp import Tm_NN
+from dnachisel import NoSolutionError
+
+
+def test_KmerIndex():
+    index = KmerIndex(k=10)
+    index.add("ATGCTGCATGCTAGTCGTAGC", label="B_001")
+    # Homology with the reverse-complement of the indexed sequence.
+    assert index.find_homologies("TTGCTAGCATGCAGC") == [
+        (3, 13, "B_001"),
+        (4, 14, "B_001"),
+        (5, 15, "B_001"),
+    ]
+    assert index.find_homologies("ATGCTGCATTTTTTTTTT") == []
+
+
+def test_barcodes_designed_by_blocks():
+    barcodes = BarcodesCollection.from_specs(
+        n_barcodes=30, block_size=10, include_spacers=False
+    )
+    assert len(barcodes) == 30
+    index = KmerIndex(k=10)
+    for name, barcode in barcodes.items():
+        assert len(barcode) == 20
+        assert 0.4 <= gc_fraction(barcode) <= 0.6
+        assert index.find_homologies(barcode) == []
+        index.add(barcode, label=name)
+
+
+def test_barcodes_check_compatibility_and_extend():
+    barcodes = BarcodesCollection.from_specs(n_barcodes=10)
+    assert barcodes.spacer == "AA"
+    assert barcodes.check_compatibility() == []
+    first_barcodes = list(barcodes.items())
+    barcodes.extend(12, block_size=6)
+    assert list(barcodes.items())[:10] == first_barcodes
+    assert list(barcodes)[-1] == "B_022"
+    assert all([b.endswith("AA") for b in barcodes.values()])
+    assert barcodes.check_compatibility() == []
+
+    # Introduce a homology (on the other strand) and a repeat.
+    barcodes["B_005"] = reverse_complement(barcodes["B_002"][:-2]) + "AA"
+    barcodes["B_007"] = "ATGCATGCATTTTTATGCATGCAT"
+    incompatibilities = barcodes.check_compatibility()
+    assert ("B_002", "B_005") in incompatibilities
+    assert ("B_007", "B_007") in incompatibilities
+
+    # New barcodes use the collection's spacer by default.
+    barcodes = BarcodesCollection.from_specs(n_barcodes=4, spacer="TT", seed=1)
+    barcodes.extend(4, seed=2)
+    assert all([b.endswith("TT") for b in barcodes.values()])
+    assert len(set([len(b) for b in barcodes.values()])) == 1
+
+
+def test_vectorized_melting_temperatures():
+    sequences = ["ATGCGTAGCTAGCTAGGCTA", "AAAATTTTAAAATTTTAATA", "TGCA", "GCGCGCGCGC"]
+    temperatures = melting_temperatures(sequences)
+    for sequence, temperature in zip(sequences, temperatures):
+        assert abs(temperature - Tm_NN(sequence)) < 1e-6
+
+    primer = "ATGCGTAGCTAGCTAGGCTAGCTAGCAT"
+    candidates = [
+        reverse_complement(primer[3:23]),  # anneals over 20 nucleotides
+        "AAAAAAAAAA" + reverse_complement(primer[5:15]),  # over 10 nucleotides
+        "ATATATATATATATATATAT",
+    ]
+    heterodimers_tms = heterodimers_melting_temperatures(candidates, [primer])[:, 0]
+    assert abs(heterodimers_tms[0] - Tm_NN(primer[3:23])) < 1e-6
+    assert abs(heterodimers_tms[1] - Tm_NN(primer[5:15])) < 1e-6
+    assert heterodimers_tms[2] < 0
+    passing = screen_primers(candidates, other_primer_sequences=[primer])
+    assert passing.all()  # no heterodim_tmax, no screening
+    passing = screen_primers(
+        candidates, other_primer_sequences=[primer], heterodim_tmax=10
+    )
+    assert list(passing) == [False, False, True]
+
+
+def test_barcodes_avoid_heterodimers_with_other_primers():
+    pytest.importorskip("primer3")
+    other_primers = ["ATGCGTAGCTAGCTAGGCTAGCTAGCAT", "TTGACCGATCGATTGCAGCTAG"]
+    barcodes = BarcodesCollection.from_specs(
+        n_barcodes=10, other_primer_sequences=other_primers, include_spacers=False
+    )
+    heterodimers_tms = heterodimers_melting_temperatures(
+        list(barcodes.values()), other_primers
+    )
+    assert (heterodimers_tms <= 5).all()
+
+
+def test_barcodes_design_is_reproducible_with_seed():
+    global_state = np.random.get_state()
+    barcodes_1 = BarcodesCollection.from_specs(n_barcodes=12, block_size=6, seed=42)
+    barcodes_2 = BarcodesCollection.from_specs(n_barcodes=12, block_size=6, seed=42)
+    barcodes_3 = BarcodesCollection.from_specs(
+        n_barcodes=12, block_size=6, seed=np.random.default_rng(42)
+    )
+    assert barcodes_1 == barcodes_2 == barcodes_3
+    barcodes_1.extend(6, seed=1)
+    barcodes_2.extend(6, seed=1)
+    assert barcodes_1 == barcodes_2
+    assert random_dna_sequence(50, seed=3) == random_dna_sequence(50, seed=3)
+    # The global random state was not modified.
+    assert np.random.get_state()[1].tolist() == global_state[1].tolist()
+    # Seeded designs running in parallel threads are still reproducible.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        threaded_barcodes = list(
+            executor.map(
+                lambda seed: BarcodesCollection.from_specs(
+                    n_barcodes=12, block_size=6, seed=seed
+                ),
+                [42, 42],
+            )
+        )
+    assert threaded_barcodes[0] == threaded_barcodes[1] == barcodes_3
+
+
+def test_screen_primers_without_survivors():
+    other_primers = ["ATGCGTAGCTAGCTAGGCTAGCTAGCAT"]
+    candidates = ["ATGCATGCATGC", "GGCATGCAATCG"]
+    passing = screen_primers(
+        candidates,
+        tmin=75,
+        tmax=90,
+        other_primer_sequences=other_primers,
+        heterodim_tmax=5,
+    )
+    assert list(passing) == [False, False]
+
+
+def test_barcodes_with_unreachable_tm_and_other_primers():
+    # No random candidate passes the screening: the solver reports the failure.
+    pytest.importorskip("primer3")
+    with pytest.raises(NoSolutionError):
+        BarcodesCollection.from_specs(
+            n_barcodes=4,
+            barcode_length=12,
+            barcode_tmin=75,
+            barcode_tmax=90,
+            other_primer_sequences=["ATGCGTAGCTAGCTAGGCTAGCTAGCAT"],
+            seed=1,
+        )
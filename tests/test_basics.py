@@ -1,4 +1,6 @@
 import os
+import subprocess
+import sys
 import matplotlib
 
 matplotlib.use("Agg")
@@ -81,3 +83,16 @@ def test_that_constraints_in_records_are_accounted_for():
         result.record_after[len(p7.left_flank) : -len(p7.right_flank)].seq
     )
     assert translate(seq_after) == translate(sequence)
+
+
+def test_lazy_objects():
+    code = "import sys, genedom; print(' '.join(sorted(sys.modules)))"
+    modules = subprocess.check_output([sys.executable, "-c", code]).decode().split()
+    for module in ["genedom.builtin_standards", "box", "asyncio"]:
+        assert module not in modules
+    import genedom
+    import genedom.batch_domestication
+
+    assert "EMMA" in genedom.BUILTIN_STANDARDS
+    assert callable(genedom.batch_domestication)
+    assert "abatch_domestication" in dir(genedom)
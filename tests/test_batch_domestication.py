@@ -0,0 +1,246 @@
+import importlib
+import os
+import zipfile
+import matplotlib
+import pandas
+import proglog
+import pytest
+
+matplotlib.use("Agg")
+from Bio import SeqIO
+from genedom import (
+    load_records,
+    batch_domestication,
+    iter_batch_domestication,
+    BUILTIN_STANDARDS,
+    DomesticationCache,
+    read_results_tables,
+)
+
+DATA_DIR = os.path.join("tests", "data")
+
+
+def read_outputs(folder):
+    return [
+        open(os.path.join(folder, *path)).read()
+        for path in [
+            ("order_ids.csv",),
+            ("sequences_to_order", "sequences_to_order.fa"),
+            ("sequences_to_order", "all_domesticated_parts.csv"),
+        ]
+    ]
+
+
+def test_parallel_batch_domestication(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    serial_target = os.path.join(str(tmpdir), "serial")
+    parallel_target = os.path.join(str(tmpdir), "parallel")
+    serial_nfails, _ = batch_domestication(
+        records, serial_target, standard=BUILTIN_STANDARDS.EMMA, allow_edits=True
+    )
+    parallel_nfails, _ = batch_domestication(
+        records,
+        parallel_target,
+        standard=BUILTIN_STANDARDS.EMMA,
+        allow_edits=True,
+        n_jobs=2,
+    )
+    assert serial_nfails == parallel_nfails == 0
+    assert read_outputs(serial_target) == read_outputs(parallel_target)
+    assert sorted(os.listdir(os.path.join(parallel_target, "error_reports"))) == (
+        sorted(os.listdir(os.path.join(serial_target, "error_reports")))
+    )
+
+
+def test_batch_domestication_scheduling(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    outputs = []
+    for scheduling in ["longest_first", "records_order"]:
+        target = os.path.join(str(tmpdir), scheduling)
+        logger = proglog.ProgressBarLogger()
+        batch_domestication(
+            records,
+            target,
+            standard=BUILTIN_STANDARDS.EMMA,
+            allow_edits=True,
+            n_jobs=2,
+            scheduling=scheduling,
+            logger=logger,
+        )
+        outputs.append(read_outputs(target))
+        estimates = [log for log in logger.logs if "estimated cost" in log]
+        assert len(estimates) == (len(records) if scheduling == "longest_first" else 0)
+    assert outputs[0] == outputs[1]
+
+
+def test_serial_batch_domestication_estimates_no_costs(tmpdir, monkeypatch):
+    def estimate_record_cost(record, domesticator):
+        raise AssertionError("Costs estimated in a serial run")
+
+    module = importlib.import_module("genedom.batch_domestication")
+    monkeypatch.setattr(module, "estimate_record_cost", estimate_record_cost)
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))[:3]
+    logger = proglog.ProgressBarLogger()
+    batch_domestication(
+        records,
+        os.path.join(str(tmpdir), "serial"),
+        standard=BUILTIN_STANDARDS.EMMA,
+        scheduling="longest_first",
+        logger=logger,
+    )
+    assert not [log for log in logger.logs if "estimated cost" in log]
+
+
+def test_iter_batch_domestication(tmpdir):
+    path = os.path.join(DATA_DIR, "example_sequences.fa")
+    batch_target = os.path.join(str(tmpdir), "batch")
+    stream_target = os.path.join(str(tmpdir), "stream")
+    batch_domestication(
+        load_records(path), batch_target, standard=BUILTIN_STANDARDS.EMMA
+    )
+    results = iter_batch_domestication(
+        SeqIO.parse(path, "fasta"), stream_target, standard=BUILTIN_STANDARDS.EMMA
+    )
+    record_ids = []
+    for record_id, domestication_results in results:
+        record_ids.append(record_id)
+        with open(os.path.join(stream_target, "order_ids.csv")) as f:
+            assert len(f.read().splitlines()) == len(record_ids) + 1
+    assert record_ids == [r.id for r in SeqIO.parse(path, "fasta")]
+    assert read_outputs(batch_target) == read_outputs(stream_target)
+
+
+def test_resumed_batch_domestication(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    reference_target = os.path.join(str(tmpdir), "reference")
+    target = os.path.join(str(tmpdir), "resumed")
+    batch_domestication(records, reference_target, standard=BUILTIN_STANDARDS.EMMA)
+
+    # Simulate a run interrupted after 4 records
+    results = iter_batch_domestication(
+        records, target, standard=BUILTIN_STANDARDS.EMMA, resume=True
+    )
+    for i, _ in zip(range(4), results):
+        pass
+    results.close()
+
+    # Only the 5 remaining records get domesticated when resuming
+    cache = DomesticationCache(os.path.join(str(tmpdir), "cache"))
+    nfails, _ = batch_domestication(
+        records, target, standard=BUILTIN_STANDARDS.EMMA, resume=True, cache=cache
+    )
+    assert cache.misses == len(records) - 4
+    assert read_outputs(reference_target) == read_outputs(target)
+
+    # A record modified since the last run gets domesticated again
+    records[0] = records[0][:-3]
+    cache = DomesticationCache(os.path.join(str(tmpdir), "cache_2"))
+    batch_domestication(
+        records, target, standard=BUILTIN_STANDARDS.EMMA, resume=True, cache=cache
+    )
+    assert cache.misses == 1
+
+
+def test_batch_domestication_with_deferred_reports(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    target = os.path.join(str(tmpdir), "deferred")
+    results = dict(
+        iter_batch_domestication(
+            records,
+            target,
+            standard=BUILTIN_STANDARDS.EMMA,
+            include_optimization_reports="failures",
+        )
+    )
+    failed = [r for r, result in results.items() if not result.success]
+    assert len(failed)
+    # Successful results don't keep their optimized problems.
+    edited_results = iter_batch_domestication(
+        records,
+        os.path.join(str(tmpdir), "edited"),
+        standard=BUILTIN_STANDARDS.EMMA,
+        allow_edits=True,
+        include_optimization_reports="failures",
+    )
+    edited_results = [result for _, result in edited_results]
+    assert any([result.number_of_edits() for result in edited_results])
+    for result in edited_results:
+        assert (result.report_data is None) == result.success
+    errors_dir = os.path.join(target, "error_reports")
+    for record_id in failed:
+        report_files = os.listdir(os.path.join(errors_dir, record_id))
+        assert "plots.pdf" in report_files
+    rendered = [
+        r for r in os.listdir(errors_dir) if os.listdir(os.path.join(errors_dir, r))
+    ]
+    assert sorted(rendered) == sorted(failed)
+
+    # Reports of successful domestications can be rendered on demand.
+    record = [r for r in records if r.id == failed[0]][0]
+    domesticator = BUILTIN_STANDARDS.EMMA.record_to_domesticator(record)
+    result = domesticator.domesticate(record, edit=True, report_target="@deferred")
+    assert result.success and not os.path.exists(os.path.join(str(tmpdir), "new"))
+    result.write_report(os.path.join(str(tmpdir), "new"))
+    assert "Report.pdf" in os.listdir(os.path.join(str(tmpdir), "new"))
+
+
+def test_batch_domestication_timings(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    target = os.path.join(str(tmpdir), "timed")
+    spans = []
+    batch_domestication(
+        records,
+        target,
+        standard=BUILTIN_STANDARDS.EMMA,
+        allow_edits=True,
+        timing_hook=lambda *span: spans.append(span),
+    )
+    timings = pandas.read_csv(os.path.join(target, "timings.csv"))
+    assert len(timings) == len(spans)
+    assert set(timings.record.dropna()) == set([r.id for r in records])
+    stages = set(timings.stage)
+    for stage in ["resolve_constraints", "optimize", "report", "to_record"]:
+        assert stage in stages
+    for stage in ["sequenticons", "total", "pdf_report", "parts_lists"]:
+        assert stage in stages
+    batch_stages = timings[timings.record.isnull()]
+    assert list(batch_stages.stage) == ["pdf_report", "parts_lists"]
+    assert (timings.wall_time >= 0).all()
+
+
+def test_batch_domestication_results_table(tmpdir):
+    pytest.importorskip("pyarrow")
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    barcodes = {"B%d" % i: "ATGCTGTAGCTACGTC" + "ACGT"[i] for i in range(3)}
+    folder_target = os.path.join(str(tmpdir), "folder")
+    zip_target = os.path.join(str(tmpdir), "batch.zip")
+    for target, table_format in [(folder_target, "arrow"), (zip_target, "parquet")]:
+        batch_domestication(
+            records,
+            target,
+            standard=BUILTIN_STANDARDS.EMMA,
+            barcodes=barcodes,
+            results_table=table_format,
+        )
+    with zipfile.ZipFile(zip_target) as archive:
+        archive.extract("results.parquet", str(tmpdir))
+    paths = [
+        os.path.join(folder_target, "results.arrow"),
+        os.path.join(str(tmpdir), "results.parquet"),
+    ]
+    table = read_results_tables(paths)
+    assert table.num_rows == 2 * len(records)
+    dataframe = table.to_pandas()
+    order_ids = pandas.read_csv(os.path.join(folder_target, "order_ids.csv"))
+    assert list(dataframe.record_id[: len(records)]) == list(order_ids.sequence)
+    assert list(dataframe.order_id[: len(records)]) == list(order_ids.order_id)
+    assert list(dataframe.barcode[:4]) == ["B0", "B1", "B2", "B0"]
+    for row in dataframe.itertuples():
+        assert row.sequence.startswith(row.barcode_sequence + "AA")
+    fasta = SeqIO.parse(
+        os.path.join(folder_target, "sequences_to_order", "sequences_to_order.fa"),
+        "fasta",
+    )
+    assert [str(r.seq) for r in fasta] == list(dataframe.sequence[: len(records)])
+    table = read_results_tables(paths[0], columns=["record_id", "success"])
+    assert table.column_names == ["record_id", "success"]
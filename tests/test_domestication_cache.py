@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import matplotlib
+import pytest
+
+matplotlib.use("Agg")
+from genedom import (
+    load_records,
+    batch_domestication,
+    BUILTIN_STANDARDS,
+    DomesticationCache,
+    GoldenGateDomesticator,
+    random_dna_sequence,
+)
+from genedom.DomesticationCache import fingerprint
+
+DATA_DIR = os.path.join("tests", "data")
+
+
+def test_domestication_cache(tmpdir):
+    cache = DomesticationCache(os.path.join(str(tmpdir), "cache"))
+    sequence = random_dna_sequence(2000, seed=123)
+    domesticator = GoldenGateDomesticator("ATTC", "ATCG")
+    result = domesticator.domesticate(sequence, edit=True, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    cached_result = domesticator.domesticate(sequence, edit=True, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert str(cached_result.record_after.seq) == str(result.record_after.seq)
+    assert cached_result.number_of_edits() == result.number_of_edits()
+
+    # Different parameters or domesticators don't use the same cached result
+    domesticator.domesticate(sequence, edit=False, cache=cache)
+    GoldenGateDomesticator("ATTC", "ATCA").domesticate(
+        sequence, edit=True, cache=cache
+    )
+    # The name is in the reports: renamed domesticators don't share results.
+    GoldenGateDomesticator("ATTC", "ATCG", name="other_name").domesticate(
+        sequence, edit=True, cache=cache
+    )
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert len(cache) == 4
+
+    cache.evict(max_size=cache.size() - 1)
+    assert len(cache) == 3
+
+
+def test_batch_domestication_with_cache(tmpdir):
+    cache = DomesticationCache(os.path.join(str(tmpdir), "cache"))
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    targets = [os.path.join(str(tmpdir), name) for name in ("first", "second")]
+    for target in targets:
+        batch_domestication(
+            records,
+            target,
+            standard=BUILTIN_STANDARDS.EMMA,
+            allow_edits=True,
+            cache=cache,
+        )
+    assert (cache.hits, cache.misses) == (len(records), len(records))
+
+    # The hits of the domestications done in other processes are counted.
+    batch_domestication(
+        records,
+        os.path.join(str(tmpdir), "parallel"),
+        standard=BUILTIN_STANDARDS.EMMA,
+        allow_edits=True,
+        cache=cache,
+        n_jobs=2,
+    )
+    assert (cache.hits, cache.misses) == (2 * len(records), len(records))
+    for path in ["order_ids.csv", os.path.join("error_reports", "p18_seq_005")]:
+        first, second = [os.path.join(target, path) for target in targets]
+        if os.path.isdir(first):
+            assert sorted(os.listdir(first)) == sorted(os.listdir(second))
+        else:
+            assert open(first).read() == open(second).read()
+
+
+def test_cache_keys_are_the_same_in_other_processes():
+    # Keys must not depend on memory addresses (as in default reprs), else
+    # caches and resumed batches would miss in every new session.
+    code = (
+        "from genedom import BUILTIN_STANDARDS, GoldenGateDomesticator\n"
+        "from genedom import DomesticationCache, random_dna_sequence\n"
+        "domesticators = [\n"
+        "    GoldenGateDomesticator('ATTC', 'ATCG', extra_avoided_sites=['BsaI']),\n"
+        "    BUILTIN_STANDARDS.EMMA.domesticators['p1'],\n"
+        "]\n"
+        "sequence = random_dna_sequence(500, seed=123)\n"
+        "for domesticator in domesticators:\n"
+        "    print(DomesticationCache.compute_key(domesticator, sequence, True))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+    ).stdout.split()
+    domesticators = [
+        GoldenGateDomesticator("ATTC", "ATCG", extra_avoided_sites=["BsaI"]),
+        BUILTIN_STANDARDS.EMMA.domesticators["p1"],
+    ]
+    sequence = random_dna_sequence(500, seed=123)
+    keys = [
+        DomesticationCache.compute_key(domesticator, sequence, True)
+        for domesticator in domesticators
+    ]
+    assert output[-2:] == keys
+
+
+def test_fingerprint_warns_about_memory_addresses():
+    class Specification:
+        pass
+
+    with pytest.warns(UserWarning, match="memory address"):
+        fingerprint([Specification()])
@@ -0,0 +1,64 @@
+import os
+import numpy as np
+import pandas
+import pytest
+from Bio.Seq import reverse_complement
+from genedom import BUILTIN_STANDARDS, OverhangsCompatibility
+
+
+def test_overhangs_compatibility():
+    compatibility = OverhangsCompatibility()
+    assert len(compatibility.overhangs) == 256
+    assert compatibility.palindromic.sum() == 16
+    assert compatibility.distance_matrix(["ATGG", "ATGC", "CCAT"]).tolist() == [
+        [0, 1, 0],
+        [1, 0, 1],
+        [0, 1, 0],
+    ]
+    evaluation = compatibility.evaluate(["ATGG", "ATGC", "GATC", "TTAC"])
+    assert evaluation["palindromic"] == ["GATC"]
+    assert evaluation["conflicts"] == [("ATGG", "ATGC", 1)]
+    assert evaluation["min_distance"] == 1
+    assert evaluation["fidelity"] is None
+    with pytest.raises(ValueError):
+        compatibility.encode(["ATGN"])
+    ytk = BUILTIN_STANDARDS.YTK.evaluate_overhangs(compatibility)
+    assert ytk["conflicts"] == []
+    assert ytk["min_distance"] == 2
+
+
+def test_overhangs_sets_search():
+    compatibility = OverhangsCompatibility()
+    overhangs = compatibility.find_overhangs_set(20, fixed=["ATGG", "GCTT"])
+    assert len(overhangs) == 20
+    assert overhangs[:2] == ["ATGG", "GCTT"]
+    evaluation = compatibility.evaluate(overhangs)
+    assert evaluation["conflicts"] == evaluation["palindromic"] == []
+    assert compatibility.find_overhangs_set(60) is None
+    with pytest.raises(ValueError, match="ATGG-ATGC"):
+        compatibility.find_overhangs_set(5, fixed=["ATGG", "ATGC"])
+    with pytest.raises(ValueError, match="GATC"):
+        compatibility.find_overhangs_set(5, fixed=["ATGG", "GATC"])
+    substitutes = compatibility.find_substitutes(["ATGG", "ATGC", "GATC", "TTAC"])
+    assert len(substitutes) == 2
+    assert "GATC" in substitutes
+    new_overhangs = [substitutes.get(o, o) for o in ["ATGG", "ATGC", "GATC", "TTAC"]]
+    assert compatibility.evaluate(new_overhangs)["conflicts"] == []
+    assert compatibility.find_substitutes(new_overhangs) == {}
+
+
+def test_ligation_fidelity(tmpdir):
+    overhangs = OverhangsCompatibility().overhangs
+    # Perfect ligations, except some crosstalk between ATGG and GCAT.
+    frequencies = np.zeros((256, 256))
+    for i, overhang in enumerate(overhangs):
+        frequencies[i, overhangs.index(reverse_complement(overhang))] = 100
+    frequencies[overhangs.index("ATGG"), overhangs.index("GCAT")] = 100
+    path = os.path.join(str(tmpdir), "frequencies.csv")
+    pandas.DataFrame(frequencies, index=overhangs, columns=overhangs).to_csv(path)
+    compatibility = OverhangsCompatibility.from_ligation_frequencies_file(path)
+    assert compatibility.fidelity(["ATGG", "TTAC"]) == 1
+    assert compatibility.fidelity(["ATGG", "ATGC", "TTAC"]) < 0.5
+    overhangs = compatibility.find_overhangs_set(10, fixed=["ATGG"])
+    assert "ATGC" not in overhangs
+    assert compatibility.fidelity(overhangs) == 1
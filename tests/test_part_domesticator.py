@@ -0,0 +1,288 @@
+import os
+import pickle
+from io import StringIO
+import matplotlib
+import numpy as np
+
+matplotlib.use("Agg")
+from Bio import SeqIO
+from dnachisel import AvoidPattern, DnaOptimizationProblem, translate
+from genedom import (
+    BUILTIN_STANDARDS,
+    DomesticationResult,
+    GoldenGateDomesticator,
+    load_record,
+    random_dna_sequence,
+    write_record,
+)
+from genedom.builtin_standards import load_builtin_standards
+from genedom.SitesIndex import SitesIndex
+
+PARTS_DIR = os.path.join("tests", "data", "example_parts")
+
+
+def random_cds_without_sites(n_codons, domesticator):
+    """Return a random CDS in which the domesticator finds no breaches."""
+    codons = ["ATG"]
+    for i in range(100 * n_codons):
+        codon = random_dna_sequence(3, seed=i)
+        stitched = "".join(codons[-2:]) + codon
+        if (codon not in ("TAA", "TAG", "TGA")) and (
+            domesticator.count_breaches(stitched) == 0
+        ):
+            codons.append(codon)
+        if len(codons) == n_codons - 1:
+            break
+    return codons + ["TAA"]
+
+
+def genbank(record):
+    output = StringIO()
+    SeqIO.write(record, output, "genbank")
+    return output.getvalue().splitlines()[1:]  # first line has a date
+
+
+def test_SitesIndex():
+    index = SitesIndex(["BsmBI", "BsaI", "NotI"])
+    sequence = "ATGCGTCTCAGAGACCTTGCGGCCGCAA"
+    assert index.has_sites(sequence)
+    assert not index.has_sites("ATATATATAT")
+    assert index.find_sites(sequence) == [
+        ("BsmBI", 3, 1),
+        ("BsaI", 10, -1),
+        ("NotI", 18, 1),
+    ]
+    sequences = [random_dna_sequence(1000, seed=i) for i in range(10)]
+    assert index.find_sites_in_sequences(sequences) == [
+        index.find_sites(sequence) for sequence in sequences
+    ]
+
+
+def test_domestication_prescreen():
+    domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+    sequences = [random_dna_sequence(300, seed=i) for i in range(20)]
+    sequences += [sequence.lower() for sequence in sequences[:5]]
+    records = [
+        load_record(os.path.join(PARTS_DIR, f), name=f) for f in os.listdir(PARTS_DIR)
+    ]
+    n_clean = 0
+    for sequence in sequences + records:
+        for edit in (True, False):
+            parameters = dict(edit=edit, report_target="@deferred")
+            fast_result = domesticator.domesticate(sequence, **parameters)
+            domesticator.prescreen_sequences = False
+            result = domesticator.domesticate(sequence, **parameters)
+            domesticator.prescreen_sequences = True
+            dna_sequence = str(getattr(sequence, "seq", sequence))
+            if domesticator.sequence_satisfies_constraints(dna_sequence):
+                n_clean += 1
+            assert fast_result.success == result.success
+            assert fast_result.message == result.message
+            assert fast_result.record_before == result.record_before
+            assert fast_result.sequence_after == result.sequence_after
+            assert genbank(fast_result.record_after) == genbank(result.record_after)
+            assert genbank(fast_result.edits_record) == genbank(result.edits_record)
+    assert n_clean > 0
+
+
+def test_prescreen_with_constraints_added_after_creation():
+    domesticator = GoldenGateDomesticator("ATGC", "GCTT")
+    sequence = random_dna_sequence(100, seed=1) + 10 * "A"
+    sequence += random_dna_sequence(100, seed=2)
+    assert domesticator.count_breaches(sequence) == 0
+    domesticator.constraints.append(AvoidPattern("AAAAAAAA"))
+    assert domesticator.count_breaches(sequence) is None
+    np.random.seed(123)
+    result = domesticator.domesticate(sequence, edit=True)
+    assert result.success
+    assert "AAAAAAAA" not in result.sequence_after
+
+
+def test_problem_template():
+    domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+    template = domesticator.problem_template(is_cds=True)
+    assert domesticator.problem_template(is_cds=True) is template
+    for i, is_cds in enumerate([True, False, True]):
+        sequence = "ATG" + random_dna_sequence(297, seed=i)
+        problem = domesticator.build_problem(sequence, is_cds=is_cds, edit=True)
+        # Same problem as created by DnaChisel from the concatenated records.
+        reference = DnaOptimizationProblem(
+            domesticator.left_flank + sequence + domesticator.right_flank,
+            constraints=problem.constraints,
+            objectives=problem.objectives,
+            logger=None,
+        )
+        assert problem.sequence == reference.sequence
+        features, reference_features = [
+            [(f.type, str(f.location), f.qualifiers) for f in p.record.features]
+            for p in (problem, reference)
+        ]
+        assert features == reference_features
+        mutation_space = problem.mutation_space.string_representation()
+        assert mutation_space == reference.mutation_space.string_representation()
+        assert problem.all_constraints_pass() == reference.all_constraints_pass()
+
+
+def test_lazy_edits_record():
+    domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+    sequence = "ATGCGTCTCAAAT" + random_dna_sequence(200, seed=1) + "GAGACGTTA"
+    np.random.seed(123)
+    result = domesticator.domesticate(sequence, edit=True)
+    assert result.number_of_edits() > 0
+    np.random.seed(123)
+    problem = domesticator.build_problem(sequence, edit=True)
+    problem.resolve_constraints()
+    problem.optimize()
+    edits_record = problem.to_record(
+        with_constraints=False, with_objectives=False, with_sequence_edits=True
+    )
+    assert genbank(result.edits_record) == genbank(edits_record)
+    assert result.number_of_edits() == sum(
+        [len(f) for f in edits_record.features if f.qualifiers.get("is_edit")]
+    )
+    # Changing the final record doesn't change the edits record.
+    result.record_after = "AAAA" + result.record_after
+    assert genbank(result.edits_record) == genbank(edits_record)
+    assert result.sequence_after == str(result.record_after.seq)
+    assert result.sequence_after.startswith("AAAA")
+
+    # Writing a record doesn't modify it.
+    record = load_record(os.path.join(PARTS_DIR, os.listdir(PARTS_DIR)[0]))
+    record.name = 30 * "a"
+    record.annotations = {}
+    write_record(record, StringIO())
+    assert record.name == 30 * "a"
+    assert record.annotations == {}
+
+
+def test_results_file(tmpdir):
+    domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+    sequences = [
+        "ATGCGTCTCAAAT" + random_dna_sequence(200, seed=2) + "GAGACGTTA",
+        random_dna_sequence(300, seed=3),
+    ]
+    results = [domesticator.domesticate(s, edit=True) for s in sequences]
+    results[0].report_data = b"zip data"
+    assert results[0].number_of_edits() > 0
+    results.append(domesticator.domesticate(sequences[0], edit=True))
+    results[2].record_after = "TTGCA" + results[2].record_after  # "barcode"
+    assert repr(results[2]).endswith("%d bp)" % (len(results[0].sequence_after) + 5))
+    path = os.path.join(str(tmpdir), "results.npz")
+    DomesticationResult.write_results_file(results, path)
+    loaded_results = DomesticationResult.read_results_file(path)
+    pickled_results = [pickle.loads(pickle.dumps(r)) for r in results]
+    for result, loaded in zip(2 * results, loaded_results + pickled_results):
+        assert loaded.record_before == result.record_before
+        assert loaded.sequence_after == result.sequence_after
+        assert genbank(loaded.record_after) == genbank(result.record_after)
+        assert genbank(loaded.edits_record) == genbank(result.edits_record)
+        assert loaded.number_of_edits() == result.number_of_edits()
+        assert (loaded.success, loaded.message) == (result.success, result.message)
+        assert loaded.timings == result.timings
+    assert loaded_results[0].report_data == b"zip data"
+    assert loaded_results[1].report_data is None
+
+
+def test_windowed_domestication():
+    domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+    codons = [random_dna_sequence(3, seed=i) for i in range(3000)]
+    codons = ["ATG"] + [c for c in codons if c not in ("TAA", "TAG", "TGA")][:998]
+    codons[200:202] = ["CGT", "CTC"]  # BsmBI sites
+    codons[800:802] = ["GAG", "ACG"]
+    sequence = "".join(codons) + "TAA"
+    sites = domesticator.sites_index.find_sites(sequence)
+    assert len(sites) >= 2
+    results = []
+    for windowed in (False, True):
+        np.random.seed(123)
+        results.append(
+            domesticator.domesticate(
+                sequence.lower(),
+                is_cds=True,
+                windowed=windowed,
+                report_target="@deferred",
+            )
+        )
+    whole, result = results
+    assert result.success
+    assert "optimize_windows" in result.timings
+    assert result.message == whole.message
+    assert result.record_before == whole.record_before
+    assert result.sequence_after.isupper()
+    start = len(domesticator.left_flank)
+    insert = result.sequence_after[start : start + len(sequence)]
+    assert translate(insert) == translate(sequence)
+    assert domesticator.count_breaches(insert) == 0
+    # All edits are in the windows around the sites.
+    padding = domesticator.window_padding + 3
+    for edit_start, edit_end in (result.edit_intervals - start).tolist():
+        assert any(
+            [
+                (site_start - padding <= edit_start)
+                and (edit_end <= site_start + 6 + padding)
+                for _, site_start, _ in sites
+            ]
+        )
+
+    # Windows which can't be solved: the whole sequence is optimized.
+    result = domesticator.domesticate(sequence, windowed=True)
+    reference = domesticator.domesticate(sequence)
+    assert not result.success
+    assert result.message == reference.message
+
+
+def test_windowed_domestication_optimizes_objectives_without_breaches():
+    domesticator = BUILTIN_STANDARDS.EMMA.domesticators["p7"]
+    sequence = "".join(random_cds_without_sites(300, domesticator))
+    assert domesticator.count_breaches(sequence) == 0
+    results = []
+    for windowed in (False, True):
+        np.random.seed(123)
+        results.append(
+            domesticator.domesticate(
+                sequence, is_cds=True, codon_optimization="e_coli", windowed=windowed
+            )
+        )
+    whole, windowed = results
+    assert windowed.success
+    assert windowed.number_of_edits() > 0
+    assert windowed.number_of_edits() == whole.number_of_edits()
+
+
+def test_golden_gate_domesticator_pickling_keeps_attributes():
+    standard = load_builtin_standards().EMMA
+    domesticator = standard.domesticators["p7"]
+    domesticator.minimize_edits = False
+    domesticator.simultaneous_mutations = 5
+    domesticator.window_padding = 30
+    unpickled = pickle.loads(pickle.dumps(domesticator))
+    assert unpickled.minimize_edits is False
+    assert unpickled.simultaneous_mutations == 5
+    assert unpickled.window_padding == 30
+    assert unpickled.sites_index.enzymes == standard.sites_index.enzymes
+    assert unpickled.cache_fingerprint() == domesticator.cache_fingerprint()
+    # The avoided sites constraint was rebuilt.
+    codons = random_cds_without_sites(100, unpickled)
+    codons[50:52] = ["CGT", "CTC"]  # BsmBI site
+    sequence = "".join(codons)
+    assert unpickled.count_breaches(sequence) == 1
+    np.random.seed(123)
+    result = unpickled.domesticate(sequence, is_cds=True)
+    assert result.success
+    start = len(unpickled.left_flank)
+    insert = result.sequence_after[start : start + len(sequence)]
+    assert unpickled.count_breaches(insert) == 0
+
+    # Constraints added after the domesticator's creation are pickled too.
+    domesticator.constraints.append(AvoidPattern("AAAAAAAA"))
+    unpickled = pickle.loads(pickle.dumps(domesticator))
+    assert len(unpickled.constraints) == 2
+    assert unpickled.constraints[1].pattern.expression == "AAAAAAAA"
+    assert unpickled.count_breaches(sequence) is None
+    np.random.seed(123)
+    sequence = "".join(codons[:50] + ["AAA", "AAA", "AAA"] + codons[53:])
+    result = unpickled.domesticate(sequence, is_cds=True)
+    assert result.success
+    insert = result.sequence_after[start : start + len(sequence)]
+    assert "AAAAAAAA" not in insert
+    assert unpickled.constraints[0] is unpickled._sites_constraint
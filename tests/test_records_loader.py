@@ -0,0 +1,90 @@
+import gzip
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+import pytest
+
+matplotlib.use("Agg")
+from genedom import (
+    BUILTIN_STANDARDS,
+    bulk_load_records,
+    iter_batch_domestication,
+    load_record,
+    load_records,
+)
+
+DATA_DIR = os.path.join("tests", "data")
+PARTS_DIR = os.path.join("tests", "data", "example_parts")
+
+
+def summary(records):
+    return [(str(r.seq), len(r.features)) for r in records]
+
+
+def test_bulk_load_records(tmpdir):
+    folder = os.path.join(str(tmpdir), "parts")
+    os.mkdir(folder)
+    fasta_path = os.path.join(DATA_DIR, "example_sequences.fa")
+    shutil.copy(fasta_path, os.path.join(folder, "a_sequences.fasta"))
+    parts = sorted(os.listdir(PARTS_DIR))
+    for i, part in enumerate(parts):
+        with open(os.path.join(PARTS_DIR, part), "rb") as f:
+            data = f.read()
+        if i % 2:
+            with gzip.open(os.path.join(folder, "b_part_%d.gbk.gz" % i), "wb") as f:
+                f.write(data)
+        else:
+            with open(os.path.join(folder, "b_part_%d" % i), "wb") as f:
+                f.write(data)
+    with open(os.path.join(folder, ".hidden"), "w") as f:
+        f.write("not a record")
+    fasta_records = load_records(fasta_path)
+    expected = summary(
+        fasta_records + [load_record(os.path.join(PARTS_DIR, p)) for p in parts]
+    )
+
+    records = bulk_load_records(folder)
+    assert summary(records) == expected
+    assert all(str(r.seq).isupper() for r in records)
+    # Records without IDs get an ID from their file's path.
+    assert [r.id for r in records[: len(fasta_records)]] == [
+        r.id for r in fasta_records
+    ]
+    assert records[len(fasta_records)].id.endswith("parts_b_part_0")
+    assert records[len(fasta_records) + 1].id.endswith("parts_b_part_1.gbk")
+
+    # Glob, zip archive, lazy iterator, parallel parsing.
+    assert summary(bulk_load_records(os.path.join(folder, "*"))) == expected
+    zip_path = os.path.join(str(tmpdir), "parts.zip")
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        for filename in sorted(os.listdir(folder)):
+            if not filename.startswith("."):
+                archive.write(os.path.join(folder, filename), "parts/" + filename)
+    iterator = bulk_load_records(zip_path, lazy=True, n_jobs=2, chunk_size=2)
+    assert not isinstance(iterator, list)
+    assert summary(iterator) == expected
+    with ThreadPoolExecutor(2) as executor:
+        records = bulk_load_records([folder], executor=executor, chunk_size=3)
+        assert summary(records) == expected
+
+    # Unrecognized files.
+    with open(os.path.join(folder, "notes.txt"), "w") as f:
+        f.write("not a record")
+    with pytest.raises(ValueError):
+        bulk_load_records(folder)
+    records = bulk_load_records(folder, skip_unrecognized=True)
+    assert summary(records) == expected
+
+
+def test_lazy_records_in_streamed_batch(tmpdir):
+    records = bulk_load_records(os.path.join(DATA_DIR, "*.fa"), lazy=True)
+    target = os.path.join(str(tmpdir), "batch")
+    results = iter_batch_domestication(
+        records, target, standard=BUILTIN_STANDARDS.EMMA, logger=None
+    )
+    record_id, domestication_results = next(results)
+    assert record_id == "p8_seq_000"
+    assert len(list(results)) == 8
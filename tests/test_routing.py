@@ -0,0 +1,123 @@
+import os
+import matplotlib
+
+matplotlib.use("Agg")
+import pytest
+from Bio.SeqFeature import SeqFeature, FeatureLocation
+from dnachisel import sequence_to_biopython_record
+from genedom import (
+    BUILTIN_STANDARDS,
+    FeatureRule,
+    IdPrefixRule,
+    OverhangsRule,
+    RecordsRouter,
+    RegexRule,
+    UnroutableRecordsError,
+    batch_domestication,
+    iter_batch_domestication,
+    load_records,
+    random_dna_sequence,
+)
+from genedom.RecordsRouter import RoutingRule
+from genedom.builtin_standards import load_builtin_standards
+from genedom.StandardDomesticatorsSet import StandardDomesticatorsSet
+
+DATA_DIR = os.path.join("tests", "data")
+
+
+def record(record_id, sequence=None, labels=()):
+    if sequence is None:
+        sequence = random_dna_sequence(100, seed=1)
+    result = sequence_to_biopython_record(sequence, id=record_id)
+    result.features = [
+        SeqFeature(FeatureLocation(0, 10), qualifiers={"label": [label]})
+        for label in labels
+    ]
+    return result
+
+
+def test_default_routing_by_id_prefix():
+    emma = BUILTIN_STANDARDS.EMMA
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    assert emma.route(records) == [
+        emma.domesticators[r.id.split("_")[0]] for r in records
+    ]
+    unroutable = [record("x_1"), records[0], record("y_2")]
+    with pytest.raises(UnroutableRecordsError) as error:
+        emma.route(unroutable)
+    assert error.value.record_ids == ["x_1", "y_2"]
+    assert emma.route(unroutable, unroutable="none")[::2] == [None, None]
+    with pytest.raises(KeyError):
+        emma.record_to_domesticator(unroutable[0])
+
+
+def test_routing_rules():
+    # Fresh domesticators, as a new set gives them its own sites index.
+    domesticators = load_builtin_standards().EMMA.domesticators
+    standard = StandardDomesticatorsSet(
+        domesticators,
+        routing_rules=[
+            IdPrefixRule(aliases={"promoter": "p1"}),
+            RegexRule({".*terminator": "p9", "CDS\\d+": "p3"}),
+            FeatureRule(mapping={"my_tag": "p12"}),
+            OverhangsRule(),
+        ],
+    )
+    insert = random_dna_sequence(100, seed=2)
+    records = [
+        record("p2_part"),
+        record("promoter_abc"),
+        record("bGH_terminator"),
+        record("CDS12_gfp"),
+        record("part_a", labels=["other", "p7"]),
+        record("part_b", labels=["my_tag"]),
+        record("part_c", sequence="GGAC" + insert + "TCCG"),
+        record("part_d"),
+    ]
+    routes = standard.route(records, unroutable="none")
+    expected = ["p2", "p1", "p9", "p3", "p7", "p12", "p4", None]
+    assert routes == [domesticators.get(slot) for slot in expected]
+    standard.set_routing_rules()
+    assert standard.route(records[:1]) == [domesticators["p2"]]
+    with pytest.raises(ValueError):
+        StandardDomesticatorsSet(domesticators, [RegexRule({"a": "unknown"})])
+
+
+def test_custom_routing_rule():
+    class LengthRule(RoutingRule):
+        def compile(self, domesticators):
+            return {"short": "p2"}
+
+        def record_keys(self, record):
+            return ["short"] if len(record) < 200 else []
+
+    class IncompleteRule(RoutingRule):
+        def compile(self, domesticators):
+            return {}
+
+    with pytest.raises(TypeError):
+        IncompleteRule()
+    domesticators = BUILTIN_STANDARDS.EMMA.domesticators
+    router = RecordsRouter(domesticators, rules=[LengthRule()])
+    records = [record("part_a"), record("part_b", random_dna_sequence(300))]
+    assert router.route(records, unroutable="none") == [domesticators["p2"], None]
+
+
+def test_unroutable_records_are_reported_before_the_batch(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    records = records[:2] + [record("unknown_part")]
+    target = os.path.join(str(tmpdir), "batch")
+    batch_domestication(records[:2], target, standard=BUILTIN_STANDARDS.EMMA)
+    domesticated_dir = os.path.join(target, "domesticated_genbanks")
+    previous_outputs = sorted(os.listdir(domesticated_dir))
+    assert len(previous_outputs) == 2
+    with pytest.raises(UnroutableRecordsError) as error:
+        batch_domestication(records, target, standard=BUILTIN_STANDARDS.EMMA)
+    assert error.value.record_ids == ["unknown_part"]
+    with pytest.raises(UnroutableRecordsError):
+        next(iter_batch_domestication(records, target, standard=BUILTIN_STANDARDS.EMMA))
+    with pytest.raises(ValueError):
+        duplicates = records[:2] + records[:1]
+        batch_domestication(duplicates, target, standard=BUILTIN_STANDARDS.EMMA)
+    # The outputs of the previous batch were not erased.
+    assert sorted(os.listdir(domesticated_dir)) == previous_outputs
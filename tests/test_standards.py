@@ -0,0 +1,75 @@
+import os
+import pandas
+from dnachisel import AvoidPattern
+from genedom import (
+    BUILTIN_STANDARDS,
+    GoldenGateDomesticator,
+    load_records,
+    random_dna_sequence,
+)
+from genedom.SitesIndex import SitesIndex
+
+DATA_DIR = os.path.join("tests", "data")
+
+
+def test_standard_sites_index():
+    emma = BUILTIN_STANDARDS.EMMA
+    assert emma.sites_index.enzymes == ["BsmBI"]
+    assert all(
+        domesticator.sites_index is emma.sites_index
+        for domesticator in emma.domesticators.values()
+    )
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    sites = emma.find_sites(records)
+    assert sites == [emma.sites_index.find_sites(str(r.seq)) for r in records]
+    assert emma.prescreen(records) == [
+        emma.record_to_domesticator(r).sequence_satisfies_constraints(str(r.seq))
+        for r in records
+    ]
+
+
+def test_shared_sites_index_with_different_enzymes():
+    dataframe = pandas.DataFrame(
+        [
+            ["a", "ATTC", "GCTA", "BsmBI", "", "", "BsaI", "slot a"],
+            ["b", "GCTA", "CCAT", "BsmBI", "", "", None, "slot b"],
+        ],
+        columns=[
+            "slot_name",
+            "left_overhang",
+            "right_overhang",
+            "enzyme",
+            "left_addition",
+            "right_addition",
+            "extra_avoided_sites",
+            "description",
+        ],
+    )
+    standard = GoldenGateDomesticator.standard_from_spreadsheet(dataframe=dataframe)
+    assert standard.sites_index.enzymes == ["BsmBI", "BsaI"]
+    sequence = "ATTGGTCTCTTA"  # has a BsaI site
+    assert not standard.domesticators["a"].sequence_satisfies_constraints(sequence)
+    assert standard.domesticators["b"].sequence_satisfies_constraints(sequence)
+
+
+def test_extra_avoided_sites_are_enforced():
+    domesticator = GoldenGateDomesticator("ATTC", "GCTA", extra_avoided_sites=["BsaI"])
+    index = SitesIndex(["BsmBI", "BsaI"])
+    sequence = random_dna_sequence(500, seed=1)
+    sequence = sequence[:100] + "GGTCTC" + sequence[100:300] + "GAGACC" + sequence[300:]
+    assert [site[0] for site in index.find_sites(sequence)] == ["BsaI", "BsaI"]
+    assert not domesticator.domesticate(sequence, edit=False).success
+    sequence = sequence[:400] + "CGTCTC" + sequence[400:]
+    result = domesticator.domesticate(sequence, edit=True)
+    assert result.success
+    insert = result.sequence_after[len(domesticator.left_flank) :][: len(sequence)]
+    assert index.find_sites(insert) == []
+    # A single constraint avoids the sites of both enzymes.
+    problem = domesticator.build_problem(sequence, edit=False)
+    evaluations = [
+        evaluation
+        for evaluation in problem.constraints_evaluations().evaluations
+        if isinstance(evaluation.specification, AvoidPattern)
+    ]
+    assert len(evaluations) == 1
+    assert len(evaluations[0].locations) == 3
@@ -0,0 +1,41 @@
+import os
+import matplotlib
+
+matplotlib.use("Agg")
+from genedom import (
+    load_records,
+    batch_domestication,
+    triage_batch,
+    BUILTIN_STANDARDS,
+    GoldenGateDomesticator,
+)
+from dnachisel import AvoidPattern
+
+DATA_DIR = os.path.join("tests", "data")
+
+
+def test_triage_batch(tmpdir):
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    triage = triage_batch(records, standard=BUILTIN_STANDARDS.EMMA)
+    assert list(triage.record) == [r.id for r in records]
+    assert (triage.n_breaches == triage.n_sites).all()
+    assert triage.needs_edits.sum() > 0
+    nfails, _ = batch_domestication(
+        records,
+        os.path.join(str(tmpdir), "report"),
+        standard=BUILTIN_STANDARDS.EMMA,
+        allow_edits=False,
+    )
+    assert triage.expected_failure.sum() == nfails
+    costs = triage.set_index("record").estimated_cost
+    assert (costs[triage.needs_edits.values] > costs.min()).all()
+
+
+def test_triage_batch_with_custom_constraints():
+    records = load_records(os.path.join(DATA_DIR, "example_sequences.fa"))
+    domesticator = GoldenGateDomesticator(
+        "ATTC", "ATCG", constraints=[AvoidPattern("ATATAT")]
+    )
+    triage = triage_batch(records, domesticator=domesticator, allow_edits=True)
+    assert (triage.n_breaches >= triage.n_sites).all()
+    assert not triage.expected_failure.any()